@@ -0,0 +1,290 @@
+# BlueCarbon Ledger - AI Microservice
+# Admission control: per-API-key token buckets, a global in-flight cap with a bounded FIFO
+# wait queue, a separate pool for long-held requests (job long-polls, exports, downloads) and
+# reserved slots for /health and /metrics so overload never starves them
+
+import os
+import math
+import time
+import asyncio
+import hashlib
+import threading
+import logging
+from collections import OrderedDict, deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', 2))  # requests waiting for a slot
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', 5))
+ADMISSION_RESERVED_SLOTS = int(os.getenv('ADMISSION_RESERVED_SLOTS', 2))  # /health and /metrics only
+ADMISSION_LONG_SLOTS = int(os.getenv('ADMISSION_LONG_SLOTS', 4))  # job long-polls, exports, report downloads
+# Under gunicorn every admitted or queued request holds one of its worker's threads, so by default
+# the work slots, the queue, the long-held slots and the reserved slots together fit in GUNICORN_THREADS
+# (limits are per worker; see gunicorn.conf.py for the node-wide numbers)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv(
+    'ADMISSION_MAX_IN_FLIGHT',
+    max(1, int(os.getenv('GUNICORN_THREADS', 12)) - ADMISSION_MAX_QUEUE - ADMISSION_LONG_SLOTS - ADMISSION_RESERVED_SLOTS)
+))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv('ADMISSION_RETRY_AFTER_SECONDS', 2))  # hint sent with 503s
+RATE_LIMIT_PER_SECOND = float(os.getenv('RATE_LIMIT_PER_SECOND', 20))  # per API key; 0 = no rate limit
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', 40))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', 10000))  # buckets kept (least recently used dropped)
+
+# Pools a request can be admitted to: work (capped and queued), long (long-held, capped, never
+# queued) and reserved (/health and /metrics: not rate limited)
+ADMISSION_POOLS = ('work', 'long', 'reserved')
+REJECTION_REASONS = ('rate_limited', 'queue_full', 'queue_timeout', 'long_full', 'reserved_full')
+
+# status is 429 (this client is over its rate) or 503 (the node is over capacity)
+Rejection = namedtuple('Rejection', ['status', 'reason', 'retry_after', 'message'])
+
+
+def client_key(auth_header, remote_addr=None):
+    """
+    Rate limit key: a digest of the bearer token, else the client address. Only pass a
+    header that has been validated; otherwise every made-up token would get a fresh bucket.
+    """
+    if auth_header:
+        return 'key:' + hashlib.sha256(auth_header.encode('utf-8')).hexdigest()[:16]
+    return f'addr:{remote_addr or "unknown"}'
+
+
+class TokenBucketLimiter:
+    """One token bucket per client: `rate` requests per second sustained, up to `burst` at once"""
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, burst=RATE_LIMIT_BURST, max_clients=RATE_LIMIT_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, client):
+        """Spend one token; returns 0 when allowed, else the seconds until a token is available"""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[client] = (tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return 0 if allowed else (1 - tokens) / self.rate
+
+    def stats(self):
+        with self._lock:
+            clients = len(self._buckets)
+        return {'rate_per_second': self.rate, 'burst': self.burst, 'tracked_clients': clients}
+
+
+class Ticket:
+    """An admitted request's slot; release() is idempotent"""
+
+    __slots__ = ('_controller', '_pool', '_released')
+
+    def __init__(self, controller, pool):
+        self._controller = controller
+        self._pool = pool
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(self._pool)
+
+
+class _ThreadWaiter:
+    __slots__ = ('granted', 'event')
+
+    def __init__(self):
+        self.granted = False
+        self.event = threading.Event()
+
+    def notify(self):
+        self.event.set()
+
+
+class _LoopWaiter:
+    __slots__ = ('granted', 'loop', 'future')
+
+    def __init__(self, loop):
+        self.granted = False
+        self.loop = loop
+        self.future = loop.create_future()
+
+    def notify(self):
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            pass  # loop closed; the waiter is gone
+
+    def _wake(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Gate in front of request handling. Work requests pass the client's token bucket
+    (429 when empty), then take one of max_in_flight slots or wait FIFO in a queue of
+    max_queue for up to queue_timeout (503 when full or timed out). A released slot
+    passes straight to the oldest waiter. Long-held requests (job long-polls, exports,
+    downloads) are rate limited but take one of long_slots instead, so they never crowd
+    out work; they are not queued (503 when full). Reserved requests (/health,
+    /metrics) use their own reserved_slots and are never rate limited or queued.
+    """
+
+    def __init__(self, max_in_flight=ADMISSION_MAX_IN_FLIGHT, max_queue=ADMISSION_MAX_QUEUE,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS, reserved_slots=ADMISSION_RESERVED_SLOTS,
+                 long_slots=ADMISSION_LONG_SLOTS, retry_after=ADMISSION_RETRY_AFTER_SECONDS, limiter=None,
+                 enabled=ADMISSION_ENABLED):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.reserved_slots = reserved_slots
+        self.long_slots = long_slots
+        self.retry_after = retry_after
+        self.limiter = limiter or TokenBucketLimiter()
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._long_in_flight = 0
+        self._reserved_in_flight = 0
+        self._waiters = deque()
+        self._counters = {'admitted': 0, 'waited': 0, **{reason: 0 for reason in REJECTION_REASONS}}
+
+    def admit(self, client, pool='work'):
+        """Admit a request to pool, blocking in the wait queue if needed; returns (ticket, rejection)"""
+        ticket, waiter, rejection = self._enter(client, pool, _ThreadWaiter)
+        if waiter is None:
+            return ticket, rejection
+        waiter.event.wait(self.queue_timeout)
+        return self._settle(waiter)
+
+    async def admit_async(self, client, pool='work'):
+        """admit() for the event loop: queued requests wait without holding a thread"""
+        loop = asyncio.get_running_loop()
+        ticket, waiter, rejection = self._enter(client, pool, lambda: _LoopWaiter(loop))
+        if waiter is None:
+            return ticket, rejection
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            ticket, _ = self._settle(waiter)
+            if ticket is not None:
+                ticket.release()
+            raise
+        return self._settle(waiter)
+
+    def _enter(self, client, pool, make_waiter):
+        """Admit now, queue, or reject; returns (ticket, waiter, rejection) with one of them set"""
+        if pool not in ADMISSION_POOLS:
+            raise ValueError(f'Unknown admission pool: {pool}')
+        if not self.enabled:
+            return _UNLIMITED, None, None
+
+        if pool == 'reserved':
+            with self._lock:
+                if self._reserved_in_flight >= self.reserved_slots:
+                    self._counters['reserved_full'] += 1
+                    return None, None, self._rejection('reserved_full', 503, self.retry_after)
+                self._reserved_in_flight += 1
+            return Ticket(self, pool), None, None
+
+        wait_seconds = self.limiter.take(client)
+        if wait_seconds:
+            return None, None, self._reject('rate_limited', 429, wait_seconds)
+
+        if pool == 'long':
+            with self._lock:
+                if self._long_in_flight >= self.long_slots:
+                    self._counters['long_full'] += 1
+                    return None, None, self._rejection('long_full', 503, self.retry_after)
+                self._long_in_flight += 1
+                self._counters['admitted'] += 1
+            return Ticket(self, pool), None, None
+
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self._counters['admitted'] += 1
+                return Ticket(self, pool), None, None
+            if len(self._waiters) >= self.max_queue:
+                self._counters['queue_full'] += 1
+                return None, None, self._rejection('queue_full', 503, self.retry_after)
+            waiter = make_waiter()
+            self._waiters.append(waiter)
+            self._counters['waited'] += 1
+        return None, waiter, None
+
+    def _settle(self, waiter):
+        """After a queued request woke up or timed out: take its slot or leave the queue"""
+        with self._lock:
+            if waiter.granted:
+                self._counters['admitted'] += 1
+                return Ticket(self, 'work'), None
+            self._waiters.remove(waiter)
+        return None, self._reject('queue_timeout', 503, self.retry_after)
+
+    def _release(self, pool):
+        with self._lock:
+            if pool == 'reserved':
+                self._reserved_in_flight -= 1
+                return
+            if pool == 'long':
+                self._long_in_flight -= 1
+                return
+            if not self._waiters:
+                self._in_flight -= 1
+                return
+            # The slot passes straight to the oldest waiter (in_flight is unchanged)
+            waiter = self._waiters.popleft()
+            waiter.granted = True
+        waiter.notify()
+
+    def _reject(self, reason, status, retry_after):
+        with self._lock:
+            self._counters[reason] += 1
+        return self._rejection(reason, status, retry_after)
+
+    @staticmethod
+    def _rejection(reason, status, retry_after):
+        message = 'Rate limit exceeded' if status == 429 else 'Service overloaded, retry later'
+        return Rejection(status, reason, max(1, math.ceil(retry_after)), message)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+                'queued': len(self._waiters),
+                'max_queue': self.max_queue,
+                'long_in_flight': self._long_in_flight,
+                'long_slots': self.long_slots,
+                'reserved_in_flight': self._reserved_in_flight,
+                'reserved_slots': self.reserved_slots,
+                'rate_limit': self.limiter.stats(),
+                **self._counters
+            }
+
+
+class _UnlimitedTicket:
+    __slots__ = ()
+
+    def release(self):
+        pass
+
+
+_UNLIMITED = _UnlimitedTicket()
+
+admission = AdmissionController()
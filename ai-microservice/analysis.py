@@ -0,0 +1,305 @@
+# BlueCarbon Ledger - AI Microservice
+# Mock analysis tables and the vectorized batch engine built on them
+#
+# The per-project helpers in app.py and the batch functions below read the same
+# tables, so a project scored alone or inside a batch follows the same rules.
+# Batch functions take columnar NumPy arrays and a numpy Generator; per-project
+# dicts are only built at the edge by the *_records helpers.
+
+import json
+import hashlib
+
+import numpy as np
+
+PROJECT_TYPES = (
+    'mangrove_restoration',
+    'seagrass_conservation',
+    'salt_marsh_restoration',
+    'coastal_wetland_protection',
+    'blue_carbon_afforestation'
+)
+
+# Code used for project types the tables do not know about
+UNKNOWN_PROJECT_TYPE_CODE = len(PROJECT_TYPES)
+PROJECT_TYPE_CODES = {project_type: code for code, project_type in enumerate(PROJECT_TYPES)}
+
+# Vegetation density range per project type (unknown types get a flat 0.7)
+VEGETATION_DENSITY_RANGES = {
+    'mangrove_restoration': (0.7, 0.9),
+    'seagrass_conservation': (0.6, 0.8),
+    'salt_marsh_restoration': (0.65, 0.85),
+    'coastal_wetland_protection': (0.75, 0.95),
+    'blue_carbon_afforestation': (0.5, 0.8)
+}
+DEFAULT_VEGETATION_DENSITY_RANGE = (0.7, 0.7)
+
+SPECIES_BY_TYPE = {
+    'mangrove_restoration': ['Rhizophora mangle', 'Avicennia germinans', 'Laguncularia racemosa'],
+    'seagrass_conservation': ['Zostera marina', 'Posidonia oceanica', 'Thalassia testudinum'],
+    'salt_marsh_restoration': ['Spartina alterniflora', 'Salicornia europaea', 'Limonium vulgare'],
+    'coastal_wetland_protection': ['Phragmites australis', 'Typha latifolia', 'Scirpus maritimus'],
+    'blue_carbon_afforestation': ['Rhizophora apiculata', 'Bruguiera gymnorrhiza', 'Ceriops tagal']
+}
+
+# CO2 sequestration rates (tons per hectare per year)
+SEQUESTRATION_RATES = {
+    'mangrove_restoration': 15.5,
+    'seagrass_conservation': 12.8,
+    'salt_marsh_restoration': 8.2,
+    'coastal_wetland_protection': 10.5,
+    'blue_carbon_afforestation': 18.3
+}
+DEFAULT_SEQUESTRATION_RATE = 12.0
+SEQUESTRATION_VARIATION = (0.8, 1.2)
+CONFIDENCE_INTERVAL = (0.8, 1.2)
+VERIFICATION_CONFIDENCE_RANGE = (0.7, 0.95)
+
+# Health assessment: density strictly above each cutoff moves up one level
+HEALTH_LEVELS = ('poor', 'fair', 'good', 'excellent')
+HEALTH_CUTOFFS = (0.5, 0.7, 0.8)
+
+# Degradation simulation: every check draws the base amount, and some re-verification
+# types add an extra amount with the given probability (order: ndvi, co2, area)
+DEGRADATION_METRICS = ('ndvi', 'co2', 'area')
+BASE_DEGRADATION_LIMITS = (0.1, 0.08, 0.05)
+EXTRA_DEGRADATION = {
+    'THRESHOLD_BREACH': {'probability': 1.0, 'limits': (0.15, 0.12, 0.08)},
+    'ALERT_TRIGGERED': {'probability': 1.0, 'limits': (0.08, 0.06, 0.04)},
+    'MANUAL': {'probability': 0.3, 'limits': (0.12, 0.10, 0.06)}
+}
+
+REVERIFICATION_TYPE_CODES = {'SCHEDULED': 0, 'MANUAL': 1, 'ALERT_TRIGGERED': 2, 'THRESHOLD_BREACH': 3}
+
+# Compliance flags: max degradation (percent) strictly above each cutoff moves up one level
+COMPLIANCE_FLAGS = ('COMPLIANT', 'MINOR_DEGRADATION', 'SIGNIFICANT_DEGRADATION', 'CRITICAL_DEGRADATION')
+DEGRADATION_CUTOFFS = (5, 15, 25)
+
+# Array forms of the tables, indexed by project type code / reverification type code
+_DENSITY_LOW = np.array([VEGETATION_DENSITY_RANGES[t][0] for t in PROJECT_TYPES] + [DEFAULT_VEGETATION_DENSITY_RANGE[0]])
+_DENSITY_HIGH = np.array([VEGETATION_DENSITY_RANGES[t][1] for t in PROJECT_TYPES] + [DEFAULT_VEGETATION_DENSITY_RANGE[1]])
+_SEQUESTRATION_RATES = np.array([SEQUESTRATION_RATES[t] for t in PROJECT_TYPES] + [DEFAULT_SEQUESTRATION_RATE])
+_BASE_DEGRADATION = np.array(BASE_DEGRADATION_LIMITS)
+_EXTRA_DEGRADATION = np.zeros((len(REVERIFICATION_TYPE_CODES), len(DEGRADATION_METRICS)))
+_EXTRA_PROBABILITY = np.zeros(len(REVERIFICATION_TYPE_CODES))
+for _name, _extra in EXTRA_DEGRADATION.items():
+    _EXTRA_DEGRADATION[REVERIFICATION_TYPE_CODES[_name]] = _extra['limits']
+    _EXTRA_PROBABILITY[REVERIFICATION_TYPE_CODES[_name]] = _extra['probability']
+
+
+# Request fields that influence an analysis and therefore its seed
+SEED_FIELDS = (
+    'project_id', 'project_type', 'coordinates',
+    'baseline_ndvi', 'baseline_co2_tons', 'baseline_area_hectares', 'reverification_type'
+)
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def canonical_digest(value):
+    """SHA-256 hex digest of a JSON value with sorted keys and no insignificant whitespace"""
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def analysis_seed(project_data, model_version, purpose):
+    """64-bit seed derived from the inputs that drive an analysis, plus the model version"""
+    fields = {field: project_data.get(field) for field in SEED_FIELDS}
+    fields['project_area_hectares'] = (project_data.get('additional_data') or {}).get('project_area_hectares')
+    fields['model_version'] = model_version
+    fields['purpose'] = purpose
+    return int(canonical_digest(fields)[:16], 16)
+
+
+def _splitmix64(values):
+    # uint64 arithmetic wraps, which is what the mixer relies on
+    values = values + _GOLDEN_GAMMA
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class ProjectStreams:
+    """
+    Counter-based random source with one independent stream per project.
+    Exposes the subset of the numpy Generator API the batch functions use
+    (uniform/random) but every row only depends on its own seed, so a project
+    draws the same numbers whichever batch it arrives in.
+    """
+
+    def __init__(self, seeds):
+        self.seeds = np.array(seeds, dtype=np.uint64)
+        self.counter = 0
+
+    def _unit(self, shape):
+        n = len(self.seeds)
+        if shape[0] != n:
+            raise ValueError(f'ProjectStreams draws need a leading dimension of {n}, got {shape}')
+        columns = int(np.prod(shape[1:], dtype=np.int64))
+        offsets = (np.arange(columns, dtype=np.uint64) + np.uint64(self.counter)) * _GOLDEN_GAMMA
+        self.counter += columns
+        bits = _splitmix64(self.seeds[:, None] + offsets[None, :])
+        # Top 53 bits -> float in [0, 1)
+        return ((bits >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))).reshape(shape)
+
+    def random(self, size=None):
+        return self._unit((len(self.seeds),) if size is None else np.atleast_1d(size))
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        if size is None:
+            size = np.broadcast(np.asarray(low), np.asarray(high)).shape or (len(self.seeds),)
+        return low + (np.asarray(high) - low) * self._unit(tuple(np.atleast_1d(size)))
+
+
+def health_assessment(vegetation_density):
+    """Map one density to its health label"""
+    level = 0
+    for cutoff in HEALTH_CUTOFFS:
+        if vegetation_density > cutoff:
+            level += 1
+    return HEALTH_LEVELS[level]
+
+
+def compliance_flag(max_degradation_percent):
+    """Map one max degradation (percent) to its compliance flag"""
+    level = 0
+    for cutoff in DEGRADATION_CUTOFFS:
+        if max_degradation_percent > cutoff:
+            level += 1
+    return COMPLIANCE_FLAGS[level]
+
+
+def compliance_flag_codes(max_degradation_percent):
+    """Vectorized compliance_flag; returns indexes into COMPLIANCE_FLAGS"""
+    return np.searchsorted(DEGRADATION_CUTOFFS, max_degradation_percent, side='left')
+
+
+def encode_project_types(project_types):
+    return np.fromiter(
+        (PROJECT_TYPE_CODES.get(project_type, UNKNOWN_PROJECT_TYPE_CODE) for project_type in project_types),
+        dtype=np.int8, count=len(project_types)
+    )
+
+
+def encode_reverification_types(reverification_types):
+    # Unknown types get no extra degradation, same as SCHEDULED
+    return np.fromiter(
+        (REVERIFICATION_TYPE_CODES.get(reverification_type, 0) for reverification_type in reverification_types),
+        dtype=np.int8, count=len(reverification_types)
+    )
+
+
+def project_columns(projects):
+    """Turn a list of project request dicts into the columnar arrays the batch engine takes"""
+    return {
+        'project_ids': [project.get('project_id') for project in projects],
+        'type_codes': encode_project_types([project.get('project_type', 'mangrove_restoration') for project in projects]),
+        'areas': np.array([(project.get('additional_data') or {}).get('project_area_hectares', 10)
+                           for project in projects], dtype=np.float64),
+        'baseline_ndvi': np.array([project.get('baseline_ndvi', 0.8) for project in projects], dtype=np.float64),
+        'baseline_co2_tons': np.array([project.get('baseline_co2_tons', 100) for project in projects], dtype=np.float64),
+        'baseline_area_hectares': np.array([project.get('baseline_area_hectares', 10) for project in projects], dtype=np.float64),
+        'reverification_codes': encode_reverification_types([project.get('reverification_type', 'SCHEDULED')
+                                                             for project in projects])
+    }
+
+
+def analyze_batch(type_codes, areas, rng):
+    """
+    Score N projects at once: vegetation density, health, sequestration with its
+    confidence interval, and a verification confidence score. Returns a dict of arrays.
+    """
+    n = len(type_codes)
+    vegetation_density = rng.uniform(_DENSITY_LOW[type_codes], _DENSITY_HIGH[type_codes])
+    sequestration_rate = _SEQUESTRATION_RATES[type_codes] * rng.uniform(*SEQUESTRATION_VARIATION, size=n)
+    annual_co2_tons = areas * sequestration_rate
+
+    return {
+        'vegetation_density': vegetation_density,
+        'health_codes': np.searchsorted(HEALTH_CUTOFFS, vegetation_density, side='left'),
+        'sequestration_rate_per_hectare': sequestration_rate,
+        'estimated_annual_co2_tons': annual_co2_tons,
+        'co2_lower_bound': annual_co2_tons * CONFIDENCE_INTERVAL[0],
+        'co2_upper_bound': annual_co2_tons * CONFIDENCE_INTERVAL[1],
+        'confidence_score': rng.uniform(*VERIFICATION_CONFIDENCE_RANGE, size=n)
+    }
+
+
+def simulate_degradation_batch(reverification_codes, rng):
+    """Vectorized simulate_degradation; returns an (N, 3) array of ndvi/co2/area factors"""
+    n = len(reverification_codes)
+    degradation = rng.uniform(0, 1, size=(n, 3)) * _BASE_DEGRADATION
+
+    applies = rng.random(n) < _EXTRA_PROBABILITY[reverification_codes]
+    extra = rng.uniform(0, 1, size=(n, 3)) * _EXTRA_DEGRADATION[reverification_codes]
+    return degradation + extra * applies[:, None]
+
+
+def reverify_batch(baseline_ndvi, baseline_co2_tons, baseline_area_hectares, reverification_codes, rng):
+    """
+    Vectorized re-verification: apply simulated degradation to the baselines and
+    derive change percentages, confidence and compliance flags for N projects
+    """
+    degradation = simulate_degradation_batch(reverification_codes, rng)
+
+    current_ndvi = np.maximum(0.1, baseline_ndvi * (1 - degradation[:, 0]))
+    current_co2_tons = np.maximum(10, baseline_co2_tons * (1 - degradation[:, 1]))
+    current_area_hectares = np.maximum(1, baseline_area_hectares * (1 - degradation[:, 2]))
+
+    ndvi_change_percent = (current_ndvi - baseline_ndvi) / baseline_ndvi * 100
+    co2_change_percent = (current_co2_tons - baseline_co2_tons) / baseline_co2_tons * 100
+    area_change_percent = (current_area_hectares - baseline_area_hectares) / baseline_area_hectares * 100
+
+    max_degradation = np.max(np.abs([ndvi_change_percent, co2_change_percent, area_change_percent]), axis=0)
+
+    return {
+        'current_ndvi': current_ndvi,
+        'current_co2_tons': current_co2_tons,
+        'current_area_hectares': current_area_hectares,
+        'ndvi_change_percent': ndvi_change_percent,
+        'co2_change_percent': co2_change_percent,
+        'area_change_percent': area_change_percent,
+        'ai_confidence_score': np.maximum(0.5, 0.95 - max_degradation / 100),
+        'compliance_codes': compliance_flag_codes(max_degradation)
+    }
+
+
+def verification_records(project_ids, result):
+    """Build per-project verification summaries from analyze_batch output"""
+    confidence = np.round(result['confidence_score'], 4).tolist()
+    co2 = np.round(result['estimated_annual_co2_tons'], 2).tolist()
+    density = np.round(result['vegetation_density'], 4).tolist()
+    health = result['health_codes'].tolist()
+
+    return [
+        {
+            'project_id': project_id,
+            'confidence_score': confidence[i],
+            'estimated_co2_tons': co2[i],
+            'vegetation_density': density[i],
+            'health_assessment': HEALTH_LEVELS[health[i]]
+        }
+        for i, project_id in enumerate(project_ids)
+    ]
+
+
+def reverification_records(project_ids, result):
+    """Build per-project re-verification summaries from reverify_batch output"""
+    columns = {
+        'current_ndvi': np.round(result['current_ndvi'], 4).tolist(),
+        'current_co2_tons': np.round(result['current_co2_tons'], 2).tolist(),
+        'current_area_hectares': np.round(result['current_area_hectares'], 2).tolist(),
+        'ai_confidence_score': np.round(result['ai_confidence_score'], 4).tolist(),
+        'ndvi_change_percent': np.round(result['ndvi_change_percent'], 2).tolist(),
+        'co2_change_percent': np.round(result['co2_change_percent'], 2).tolist(),
+        'area_change_percent': np.round(result['area_change_percent'], 2).tolist()
+    }
+    flags = result['compliance_codes'].tolist()
+
+    return [
+        {
+            'project_id': project_id,
+            'compliance_flag': COMPLIANCE_FLAGS[flags[i]],
+            **{name: values[i] for name, values in columns.items()}
+        }
+        for i, project_id in enumerate(project_ids)
+    ]
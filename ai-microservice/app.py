@@ -1,168 +1,180 @@
 # BlueCarbon Ledger - AI Microservice
 # Placeholder for AI MRV verification - ready for your AI model integration
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
 import os
 import time
 import random
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
+from functools import partial
+from concurrent.futures import wait, FIRST_COMPLETED
+
+import numpy as np
+
+from analysis import PROJECT_TYPES, COMPLIANCE_FLAGS, project_columns, verification_records, analysis_seed, ProjectStreams
+from cache import ResultCache, completed_future
+from metrics_store import MetricsStore
+from model_backend import ModelHolder, LazyModule
+from batcher import MicroBatcher
+from summary_store import tile_summaries
+from serialization import FastJSONProvider, StaticList, dumps, parse_view, shape_payload
+from results_log import results_log, gzip_stream
+from jobs import job_manager, get_batch_executor, JOB_MAX_WAIT_SECONDS, JOB_STORE_POLL_SECONDS, FINAL_JOB_STATUSES
+from admission import admission, client_key, REJECTION_REASONS
+from profiling import STAGES, PROFILE_HEADER, new_timings, merge_timings, request_profiler
+from scheduler import reverification_scheduler, normalize_queue_fields, DEFAULT_PRIORITY, DEFAULT_MAX_RETRIES
+from work_queue import work_queue, QueuedJob
+from change_detection import ndvi_series, change_columns
+from reports import report_store, REPORT_FORMATS, DEFAULT_REPORT_FORMAT
+from compliance import (
+    compliance_thresholds, record_columns, compliance_columns, compliance_record,
+    COMPLIANCE_LEGEND, COMPLIANCE_STATUSES, COMPLIANCE_MAX_RECORDS
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)  # orjson when installed, pre-encoded static fragments
 CORS(app)
 
 # Configuration
 AI_SERVICE_KEY = os.getenv('AI_SERVICE_KEY', 'dev-key-12345')
 MODEL_VERSION = os.getenv('MODEL_VERSION', 'placeholder-v1.0.0')
 PROCESSING_NODE_ID = os.getenv('PROCESSING_NODE_ID', 'node-1')
+DETERMINISTIC_ANALYSIS = os.getenv('DETERMINISTIC_ANALYSIS', 'false').lower() == 'true'
+BATCH_MAX_PROJECTS = int(os.getenv('BATCH_MAX_PROJECTS', 5000))
+CHANGE_MAX_OBSERVATIONS = int(os.getenv('CHANGE_MAX_OBSERVATIONS', 500000))  # acquisitions per bulk upload
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 16))  # in-flight items per batch request
+SIMULATED_LATENCY = os.getenv('SIMULATED_LATENCY', 'true').lower() == 'true'  # false: skip the mock model sleeps
+
+# Polygon and imagery handling (shapely, rasterio when installed) and the compiled request
+# schemas (jsonschema) are imported with the model
+geometry = LazyModule('geometry')
+imagery = LazyModule('imagery')
+schemas = LazyModule('schemas')
+
+# Model backend chosen by MODEL_VERSION, loaded at import (before fork under gunicorn preload_app)
+# unless MODEL_LOAD defers it to a warmup thread or to the first request that needs it
+model = ModelHolder(MODEL_VERSION, modules=(geometry, imagery, schemas))
+if model.load_mode == 'preload':
+    model.load()
+
+# Result cache in front of verify, reverify and batch items
+result_cache = ResultCache(MODEL_VERSION)
+
+# Fixed parts of responses, built (and encoded) once
+SUPPORTED_PROJECT_TYPES = StaticList([
+    'mangrove_restoration',
+    'seagrass_conservation',
+    'salt_marsh_restoration',
+    'coastal_wetland_protection',
+    'blue_carbon_afforestation'
+])
+MODEL_CAPABILITIES = StaticList([
+    'Satellite imagery analysis',
+    'Vegetation coverage assessment',
+    'Carbon sequestration estimation',
+    'Species identification',
+    'Environmental factor analysis',
+    'Change detection',
+    'Threat assessment'
+])
+MODEL_LIMITATIONS = StaticList([
+    'Mock/placeholder implementation',
+    'Requires real AI model integration',
+    'Ground-truth validation recommended',
+    'Seasonal variations not captured',
+    'Resolution limited to satellite imagery'
+])
+SATELLITE_DATA_SOURCES = StaticList(['Sentinel-2', 'Landsat-8'])
+REVERIFY_ALGORITHMS = StaticList(['NDVI Analysis', 'Change Detection', 'Carbon Estimation'])
+AVAILABLE_ENDPOINTS = StaticList([
+    'GET /health',
+    'GET /metrics',
+    'GET /metrics/prometheus',
+    'POST /api/mrv/verify',
+    'POST /api/mrv/batch-verify',
+    'POST /api/mrv/reverify',
+    'GET /api/mrv/jobs/<job_id>',
+    'GET /api/mrv/model-info',
+    'GET /api/mrv/results/export',
+    'POST /api/mrv/change-detection/observations',
+    'GET /api/mrv/change-detection/scan',
+    'POST /api/mrv/compliance/evaluate',
+    'GET /api/mrv/compliance/thresholds',
+    'GET /api/mrv/reports/<report_id>'
+])
+
+# Global metrics - per-thread shards, summed across gunicorn workers when METRICS_MULTIPROC_DIR is set
+START_TIME = datetime.now()
+JOB_TYPES = ('verify', 'reverify', 'batch-verify')
+CONTROL_ENDPOINTS = ('health_check', 'get_metrics', 'get_prometheus_metrics')  # reserved admission capacity
+LONG_ENDPOINTS = ('export_results', 'get_report')  # streamed downloads; job long-polls also use the long pool
+STAGE_JOB_TYPES = {'verify_project': 'verify', 'reverify_project': 'reverify', 'batch_verify_projects': 'batch-verify'}
 
-# Global metrics (in production, use Redis or database)
-metrics = {
-    'total_verifications': 0,
-    'successful_verifications': 0,
-    'failed_verifications': 0,
-    'total_processing_time': 0,
-    'start_time': datetime.now()
-}
+metrics_store = MetricsStore()
+metrics_store.counter('verifications_total', 'Verifications started (cache hits and coalesced requests excluded)')
+metrics_store.counter('verifications_successful_total', 'Verifications that produced a result')
+metrics_store.counter('verifications_failed_total', 'Verifications that raised')
+metrics_store.counter('verification_processing_seconds_total', 'Model processing time of successful verify/reverify calls')
+metrics_store.histogram('analysis_duration_seconds', 'Model processing time per project',
+                        labels=[('job_type', JOB_TYPES), ('project_type', PROJECT_TYPES)])
+metrics_store.gauge('reverification_queue_depth', 'Re-verifications waiting in the scheduler')
+metrics_store.gauge('reverification_running', 'Re-verifications currently executing')
+metrics_store.gauge('imagery_tile_cache_resident_bytes', 'Bytes of decoded imagery tiles held in memory')
+metrics_store.gauge('imagery_tile_cache_hits', 'Tile lookups served from the decoded tile cache')
+metrics_store.gauge('imagery_tile_cache_lookups', 'Tile lookups (hits / lookups = hit ratio)')
+metrics_store.counter('microbatch_batches_total', 'Batched model calls', labels=[('batcher', ('verify', 'reverify'))])
+metrics_store.counter('microbatch_items_total', 'Requests served by batched model calls', labels=[('batcher', ('verify', 'reverify'))])
+metrics_store.counter('microbatch_slots_total', 'Batch capacity offered (max batch size per call); items / slots = fill ratio',
+                      labels=[('batcher', ('verify', 'reverify'))])
+metrics_store.counter('admission_rejected_total', 'Requests turned away by admission control (429/503)',
+                      labels=[('reason', REJECTION_REASONS)])
+metrics_store.histogram('stage_duration_seconds', 'Time per processing stage (decode, validate, fetch_imagery, inference, postprocess, serialize)',
+                        labels=[('job_type', JOB_TYPES), ('stage', STAGES)])
+metrics_store.histogram('microbatch_wait_seconds', 'Time the oldest request in a batch waited for the batch to fill',
+                        labels=[('batcher', ('verify', 'reverify'))])
 
 def authenticate_request():
     """Validate API key from request headers"""
-    auth_header = request.headers.get('Authorization')
+    return valid_service_key(request.headers.get('Authorization'))
+
+def valid_service_key(auth_header):
+    """Check an Authorization header value against AI_SERVICE_KEY"""
     if not auth_header or not auth_header.startswith('Bearer '):
         return False
     
     token = auth_header.split(' ')[1]
     return token == AI_SERVICE_KEY
 
-def generate_mock_analysis(project_data):
-    """Generate realistic mock AI analysis results"""
-    project_type = project_data.get('project_type', 'mangrove_restoration')
-    area_hectares = project_data.get('additional_data', {}).get('project_area_hectares', 10)
-    
-    # Mock vegetation coverage based on project type
-    vegetation_densities = {
-        'mangrove_restoration': random.uniform(0.7, 0.9),
-        'seagrass_conservation': random.uniform(0.6, 0.8),
-        'salt_marsh_restoration': random.uniform(0.65, 0.85),
-        'coastal_wetland_protection': random.uniform(0.75, 0.95),
-        'blue_carbon_afforestation': random.uniform(0.5, 0.8)
-    }
-    
-    vegetation_density = vegetation_densities.get(project_type, 0.7)
-    
-    # Mock species identification
-    species_by_type = {
-        'mangrove_restoration': ['Rhizophora mangle', 'Avicennia germinans', 'Laguncularia racemosa'],
-        'seagrass_conservation': ['Zostera marina', 'Posidonia oceanica', 'Thalassia testudinum'],
-        'salt_marsh_restoration': ['Spartina alterniflora', 'Salicornia europaea', 'Limonium vulgare'],
-        'coastal_wetland_protection': ['Phragmites australis', 'Typha latifolia', 'Scirpus maritimus'],
-        'blue_carbon_afforestation': ['Rhizophora apiculata', 'Bruguiera gymnorrhiza', 'Ceriops tagal']
-    }
-    
-    species = species_by_type.get(project_type, species_by_type['mangrove_restoration'])
-    selected_species = random.sample(species, min(len(species), random.randint(2, 4)))
-    
-    # Mock CO2 sequestration rates (tons per hectare per year)
-    sequestration_rates = {
-        'mangrove_restoration': 15.5,
-        'seagrass_conservation': 12.8,
-        'salt_marsh_restoration': 8.2,
-        'coastal_wetland_protection': 10.5,
-        'blue_carbon_afforestation': 18.3
-    }
-    
-    base_rate = sequestration_rates.get(project_type, 12.0)
-    variation_factor = random.uniform(0.8, 1.2)
-    annual_co2_tons = area_hectares * base_rate * variation_factor
-    
-    # Health assessment based on vegetation density
-    if vegetation_density > 0.8:
-        health = 'excellent'
-    elif vegetation_density > 0.7:
-        health = 'good'
-    elif vegetation_density > 0.5:
-        health = 'fair'
-    else:
-        health = 'poor'
-    
-    # Generate mock satellite image dates
-    image_dates = []
-    for i in range(random.randint(3, 6)):
-        days_ago = random.randint(1, 180)
-        date = (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
-        image_dates.append(date)
-    image_dates.sort()
-    
-    return {
-        'vegetation_coverage': {
-            'total_area_hectares': area_hectares,
-            'vegetation_density': round(vegetation_density, 4),
-            'species_identified': selected_species,
-            'health_assessment': health
-        },
-        'carbon_sequestration': {
-            'estimated_annual_co2_tons': round(annual_co2_tons, 2),
-            'sequestration_rate_per_hectare': round(base_rate * variation_factor, 2),
-            'confidence_interval': {
-                'lower_bound': round(annual_co2_tons * 0.8, 2),
-                'upper_bound': round(annual_co2_tons * 1.2, 2)
-            }
-        },
-        'environmental_factors': {
-            'water_quality_index': round(random.uniform(70, 100), 1),
-            'soil_composition': {
-                'organic_matter': round(random.uniform(15, 35), 1),
-                'clay': round(random.uniform(20, 40), 1),
-                'silt': round(random.uniform(25, 45), 1),
-                'sand': round(random.uniform(15, 35), 1)
-            },
-            'biodiversity_score': round(random.uniform(80, 100), 1),
-            'threat_assessment': random.sample([
-                'Coastal erosion', 'Sea level rise', 'Pollution runoff', 
-                'Invasive species', 'Climate change', 'Human disturbance'
-            ], random.randint(1, 3))
-        },
-        'satellite_analysis': {
-            'image_dates': image_dates,
-            'resolution_meters': 10,
-            'cloud_coverage_percent': round(random.uniform(5, 20), 1),
-            'change_detection': {
-                'area_change_percent': round(random.uniform(-5, 10), 2),
-                'vegetation_change_percent': round(random.uniform(5, 20), 2)
-            }
-        },
-        'recommendations': [
-            'Implement regular water quality monitoring',
-            'Establish buffer zones to prevent coastal development',
-            'Monitor species diversity and health quarterly',
-            'Develop community-based management programs'
-        ],
-        'limitations': [
-            'Analysis based on satellite imagery with 10m resolution',
-            'Ground-truth validation recommended for final verification',
-            'Seasonal variations not fully captured in current analysis',
-            'Long-term monitoring required for accurate carbon sequestration rates'
-        ]
-    }
-
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    uptime_seconds = (datetime.now() - metrics['start_time']).total_seconds()
+    """Health check endpoint - 503 until the model warmup has finished in this worker"""
+    payload, status = health_payload()
+    return jsonify(payload), status
+
+def health_payload():
+    """Health check body and status code (shared by the WSGI and ASGI apps)"""
+    uptime_seconds = (datetime.now() - START_TIME).total_seconds()
+    serving = model.serving()
     
-    return jsonify({
-        'status': 'healthy',
+    return {
+        'status': 'healthy' if serving else 'warming',
         'version': MODEL_VERSION,
+        'model_backend': model.describe()[0],
+        'model_load_mode': model.load_mode,
+        'model_loaded': model.loaded,
+        'model_ready': model.is_ready(),
+        'model_warmup_error': model.warmup_error,
         'uptime_seconds': round(uptime_seconds, 2),
         'processing_node_id': PROCESSING_NODE_ID,
         'timestamp': datetime.now().isoformat()
-    })
+    }, 200 if serving else 503
 
 @app.route('/metrics', methods=['GET'])
 def get_metrics():
@@ -170,97 +182,449 @@ def get_metrics():
     if not authenticate_request():
         return jsonify({'error': 'Unauthorized'}), 401
     
-    uptime_seconds = (datetime.now() - metrics['start_time']).total_seconds()
+    return jsonify(metrics_payload())
+
+def metrics_payload():
+    """JSON metrics snapshot (shared by the WSGI and ASGI apps)"""
+    uptime_seconds = (datetime.now() - START_TIME).total_seconds()
+    scheduler_stats = reverification_scheduler.stats()
+    refresh_state_gauges(scheduler_stats)
+    
+    totals = metrics_store.totals()
+    total_verifications = int(metrics_store.value('verifications_total', totals))
+    successful_verifications = int(metrics_store.value('verifications_successful_total', totals))
+    failed_verifications = int(metrics_store.value('verifications_failed_total', totals))
     
     success_rate = 0
-    if metrics['total_verifications'] > 0:
-        success_rate = metrics['successful_verifications'] / metrics['total_verifications']
+    if total_verifications > 0:
+        success_rate = successful_verifications / total_verifications
     
     avg_processing_time = 0
-    if metrics['successful_verifications'] > 0:
-        avg_processing_time = metrics['total_processing_time'] / metrics['successful_verifications']
+    if successful_verifications > 0:
+        avg_processing_time = metrics_store.value('verification_processing_seconds_total', totals) / successful_verifications
     
-    return jsonify({
-        'total_verifications': metrics['total_verifications'],
-        'successful_verifications': metrics['successful_verifications'],
-        'failed_verifications': metrics['failed_verifications'],
+    return {
+        'total_verifications': total_verifications,
+        'successful_verifications': successful_verifications,
+        'failed_verifications': failed_verifications,
         'success_rate': round(success_rate, 4),
         'average_processing_time_seconds': round(avg_processing_time, 2),
         'uptime_seconds': round(uptime_seconds, 2),
         'model_version': MODEL_VERSION,
         'processing_node_id': PROCESSING_NODE_ID,
-        'queue_length': random.randint(0, 5),  # Mock queue length
+        'queue_length': scheduler_stats['queue_depth'],
+        'in_flight_requests': {
+            labels['endpoint']: int(totals[offset])
+            for labels, offset in metrics_store.series('requests_in_flight', totals) if totals[offset]
+        },
+        'latency': {
+            'requests': metrics_store.histogram_summary('request_duration_seconds', totals),
+            'analysis': metrics_store.histogram_summary('analysis_duration_seconds', totals),
+            'stages': metrics_store.histogram_summary('stage_duration_seconds', totals)
+        },
+        'profiler': request_profiler.stats(),
+        'admission': admission.stats(),
+        'reverification_queue': scheduler_stats,
+        'work_queue': work_queue.stats(),
+        'micro_batching': {
+            'verify': verify_batcher.stats(),
+            'reverify': reverify_batcher.stats()
+        },
+        'result_cache': result_cache.stats(),
+        'imagery': {
+            'enabled': imagery.imagery_catalog.enabled,
+            'tiles': len(imagery.imagery_catalog.tiles()),
+            'tile_cache': imagery.tile_cache.stats(),
+            'project_footprints': geometry.project_footprints.stats(),
+            'tile_summaries': tile_summaries.stats()
+        },
+        'geometry': geometry.project_polygons.stats(),
+        'model': model.stats(),
+        'change_detection': ndvi_series.stats(),
+        'compliance': compliance_thresholds.stats(),
+        'reports': report_store.stats(),
+        'results_log': results_log.stats(),
+        'jobs': job_manager.stats(),
         'last_updated': datetime.now().isoformat()
-    })
+    }
 
-@app.route('/api/mrv/verify', methods=['POST'])
-def verify_project():
-    """
-    Main AI verification endpoint
-    This is where your AI model will be integrated
-    """
-    # Authenticate request
+@app.route('/metrics/prometheus', methods=['GET'])
+def get_prometheus_metrics():
+    """Get AI service metrics in the Prometheus text exposition format"""
     if not authenticate_request():
         return jsonify({'error': 'Unauthorized'}), 401
     
+    refresh_state_gauges(reverification_scheduler.stats())
+    
+    return Response(metrics_store.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def refresh_state_gauges(scheduler_stats):
+    """Copy this worker's scheduler and tile cache state into the shared gauges"""
+    metrics_store.set('reverification_queue_depth', scheduler_stats['queue_depth'])
+    metrics_store.set('reverification_running', scheduler_stats['running'])
+    
+    if not imagery.loaded:
+        return  # nothing cached yet; scrapes should not import the imagery stack
+    tile_stats = imagery.tile_cache.stats()
+    metrics_store.set('imagery_tile_cache_resident_bytes', tile_stats['resident_bytes'])
+    metrics_store.set('imagery_tile_cache_hits', tile_stats['hits'])
+    metrics_store.set('imagery_tile_cache_lookups', tile_stats['hits'] + tile_stats['misses'])
+
+@app.before_request
+def ensure_model_warm():
+    # gunicorn warms each worker in post_worker_init; other servers warm on the first request
+    # (with MODEL_LOAD=lazy the model loads in the first request that uses it instead)
+    if not model.is_ready() and model.load_mode != 'lazy':
+        model.warm_up_in_background()
+    work_queue.start()
+
+@app.before_request
+def admit_request():
+    # Rate limit and cap concurrent work; /health and /metrics use their own reserved slots
+    if request.method == 'OPTIONS':
+        return None
+    ticket, rejection = admission.admit(
+        admission_client(request.headers.get('Authorization'), request.remote_addr),
+        admission_pool(request.endpoint, request.args)
+    )
+    if rejection is not None:
+        return admission_rejected_response(rejection)
+    g.admission_ticket = ticket
+
+def admission_client(auth_header, remote_addr):
+    """Rate limit key: the API key once it checks out, else the client address (made-up tokens share it)"""
+    return client_key(auth_header if valid_service_key(auth_header) else None, remote_addr)
+
+def admission_pool(endpoint, args):
+    """
+    Admission pool of a request: reserved for /health and /metrics, long for downloads and
+    job long-polls (held for up to JOB_MAX_WAIT_SECONDS without doing work), else work
+    """
+    if endpoint in CONTROL_ENDPOINTS:
+        return 'reserved'
+    if endpoint in LONG_ENDPOINTS:
+        return 'long'
+    if endpoint == 'get_job':
+        try:
+            return 'long' if float(args.get('wait', 0)) > 0 else 'work'
+        except ValueError:
+            return 'work'  # get_job answers the 400
+    return 'work'
+
+def admission_rejected_response(rejection):
+    """Fast 429/503 with Retry-After for a request admission control turned away"""
+    payload, status, headers = admission_rejection(rejection)
+    return jsonify(payload), status, headers
+
+def admission_rejection(rejection):
+    """Body, status and headers of an admission rejection (shared by the WSGI and ASGI apps)"""
+    metrics_store.inc('admission_rejected_total', reason=rejection.reason)
+    return {
+        'success': False,
+        'message': rejection.message,
+        'reason': rejection.reason,
+        'retry_after_seconds': rejection.retry_after
+    }, rejection.status, {'Retry-After': str(rejection.retry_after)}
+
+@app.teardown_request
+def release_admission(error=None):
+    if g.get('admission_ticket') is not None:
+        g.pop('admission_ticket').release()
+
+def hold_admission(response):
+    """Keep this request's admission slot until the server closes a streamed response"""
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        response.call_on_close(ticket.release)
+    return response
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.timings = new_timings()
+    metrics_store.inc('requests_in_flight', endpoint=request.endpoint)
+
+@app.before_request
+def start_profiling():
+    # Sampled 1-in-N, or on 'X-Profile: 1' from an authenticated caller; no-op unless PROFILE_DIR is set
+    if request_profiler.enabled:
+        requested = request.headers.get(PROFILE_HEADER) == '1' and authenticate_request()
+        g.profile = request_profiler.start(requested)
+
+@app.after_request
+def count_request(response):
+    metrics_store.inc('requests_total', endpoint=request.endpoint, status=f'{response.status_code // 100}xx')
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # Streamed responses are timed to the first byte; their body is produced after teardown
+    if 'request_started' not in g:
+        return
+    metrics_store.dec('requests_in_flight', endpoint=request.endpoint)
+    metrics_store.observe('request_duration_seconds', time.perf_counter() - g.request_started,
+                          endpoint=request.endpoint)
+    record_stage_timings(STAGE_JOB_TYPES.get(request.endpoint), g.timings)
+    
+    if g.get('profile') is not None:
+        request_profiler.finish(g.pop('profile'), request.endpoint or 'unknown')
+
+def record_stage_timings(job_type, timings):
+    """Add the spans of one request or computation to the stage latency histograms"""
+    if job_type is None:
+        return
+    for stage, seconds in timings.spans.items():
+        metrics_store.observe('stage_duration_seconds', seconds, job_type=job_type, stage=stage)
+
+def wants_timings(args=None):
+    """Check whether the caller asked for the per-stage timings field (?timings=true)"""
+    args = request.args if args is None else args
+    return args.get('timings', '').lower() in ('1', 'true', 'yes')
+
+def with_timings(payload, response_data, timings, include):
+    """
+    Add (include) or drop the 'timings' field of a verify/reverify response. Computation
+    stages come from the run that produced response_data, which for a cache hit is an
+    earlier request; decode/validate/serialize are this request's. Never mutates payload.
+    """
+    if include:
+        return {**payload, 'timings': merge_timings(response_data.get('timings', {}), timings.spans)}
+    if 'timings' in payload:
+        return {field: value for field, value in payload.items() if field != 'timings'}
+    return payload
+
+def analysis_rng(project_data, purpose):
+    """
+    Random source for one analysis. In deterministic mode it is a private
+    random.Random seeded from the project inputs and MODEL_VERSION, so identical
+    requests give identical results whatever else runs concurrently.
+    """
+    if DETERMINISTIC_ANALYSIS:
+        return random.Random(analysis_seed(project_data, MODEL_VERSION, purpose))
+    return random
+
+def record_micro_batch(name, batch_size, max_batch_size, oldest_wait_seconds):
+    """Update micro-batching metrics after each batched model call"""
+    metrics_store.inc('microbatch_batches_total', batcher=name)
+    metrics_store.inc('microbatch_items_total', batch_size, batcher=name)
+    metrics_store.inc('microbatch_slots_total', max_batch_size, batcher=name)
+    metrics_store.observe('microbatch_wait_seconds', oldest_wait_seconds, batcher=name)
+
+def predict_verifications(items):
+    """One model call for a micro-batch of (project_data, rng) verify items"""
+    return model.backend.predict_batch([project_data for project_data, _ in items], [rng for _, rng in items])
+
+def assess_reverifications(items):
+    """One model call for a micro-batch of (project_data, rng, observation) reverify items"""
+    return model.backend.reverify_batch(
+        [project_data for project_data, _, _ in items],
+        [rng for _, rng, _ in items],
+        [observation for _, _, observation in items]
+    )
+
+# Concurrent single-project requests share one model call per batch
+verify_batcher = MicroBatcher('verify', predict_verifications, on_batch=record_micro_batch)
+reverify_batcher = MicroBatcher('reverify', assess_reverifications, on_batch=record_micro_batch)
+
+def simulate_model_latency(low, high):
+    """Sleep for a mock model latency in [low, high] seconds and return it (0 when SIMULATED_LATENCY is off)"""
+    if not SIMULATED_LATENCY:
+        return 0.0
+    delay = random.uniform(low, high)
+    time.sleep(delay)
+    return delay
+
+def wants_async_job(args=None, headers=None):
+    """Check whether the caller asked for job mode (?async=true or Prefer: respond-async)"""
+    args = request.args if args is None else args
+    headers = request.headers if headers is None else headers
+    if args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'respond-async' in headers.get('Prefer', '')
+
+def record_verification_success(job_type, project_data, response_data):
+    """Update success metrics and append the result to the results log once it is available"""
+    project_type = project_data.get('project_type')
+    processing_time = response_data['processing_time_seconds']
+    metrics_store.inc('verifications_successful_total')
+    if job_type != 'batch-verify':
+        metrics_store.inc('verification_processing_seconds_total', processing_time)
+    metrics_store.observe('analysis_duration_seconds', processing_time, job_type=job_type, project_type=project_type)
+    results_log.append(job_type, project_data.get('project_id'), project_type, response_data)
+
+def record_verification_failure(error):
+    """Update failure metrics for a verification that raised"""
+    metrics_store.inc('verifications_failed_total')
+
+def accepted_job_response(job, cache_status='MISS'):
+    """Return a 202 pointing at a queued job"""
+    payload, headers = accepted_job_payload(job, cache_status)
+    return jsonify(payload), 202, headers
+
+def accepted_job_payload(job, cache_status='MISS'):
+    """Body and headers of the 202 for a queued job"""
+    status_url = f"/api/mrv/jobs/{job['job_id']}"
+
+    return {
+        'success': True,
+        'job_id': job['job_id'],
+        'job_type': job['job_type'],
+        'status': job['status'],
+        'status_url': status_url,
+        'processing_node_id': PROCESSING_NODE_ID,
+        'timestamp': datetime.now().isoformat()
+    }, {'Location': status_url, 'X-Cache': cache_status}
+
+def submit_verification_job(job_type, fn, project_data):
+    """Queue a verification on the job pool (unless cached) and return a 202 pointing at the job"""
+    job, cache_status = start_verification_job(job_type, fn, project_data)
+    return accepted_job_response(job, cache_status)
+
+def start_verification_job(job_type, fn, project_data):
+    """Queue a verification on the job pool (unless cached) and track it; returns (job, cache_status)"""
+    queued = {}
+    
+    def submit():
+        if not work_queue.enabled:
+            return job_manager.executor.submit(fn, project_data)
+        # Verifications are on-demand work: MANUAL at the default priority on the shared queue
+        queued['entry'] = work_queue.submit(
+            job_type, project_data, DEFAULT_PRIORITY, 'MANUAL', max_retries=DEFAULT_MAX_RETRIES,
+            dedup_key=result_cache.key_for(job_type, project_data)
+        )
+        return queued['entry'].future
+    
+    future, cache_status = result_cache.get_or_submit(job_type, project_data, submit)
+    counted = cache_status == 'MISS'
+    if counted:
+        metrics_store.inc('verifications_total')
+    
+    job = job_manager.track(
+        job_type,
+        project_data,
+        future,
+        on_success=partial(record_verification_success, job_type, project_data) if counted else None,
+        on_failure=record_verification_failure if counted else None,
+        details=queued['entry'].snapshot if 'entry' in queued else None,
+        job_id=queued['entry'].queue_id if 'entry' in queued else None
+    )
+
+    return job, cache_status
+
+def project_request_error(project_data, schema='verify'):
+    """Validation message for a verify (or schema='reverify') body, or None when it is usable"""
+    if not project_data:
+        return 'No project data provided'
+    
+    # Validate required fields and their types
+    error = schemas.request_error(schema, project_data)
+    if error:
+        return error
+    
+    # Validate the project polygon (closed rings, no self-intersections, vertex limit)
     try:
-        # Get request data
-        project_data = request.get_json()
-        
-        if not project_data:
-            return jsonify({
-                'success': False,
-                'message': 'No project data provided'
-            }), 400
-        
-        # Validate required fields
-        required_fields = ['project_id', 'coordinates', 'project_type']
-        for field in required_fields:
-            if field not in project_data:
-                return jsonify({
-                    'success': False,
-                    'message': f'Missing required field: {field}'
-                }), 400
-        
-        project_id = project_data['project_id']
-        logger.info(f"Starting AI verification for project: {project_id}")
-        
-        # Update metrics
-        metrics['total_verifications'] += 1
-        
-        # Simulate processing time (2-10 seconds for demo)
-        processing_start = time.time()
-        processing_time = random.uniform(2, 10)
-        time.sleep(processing_time)
-        processing_end = time.time()
-        
-        actual_processing_time = processing_end - processing_start
-        
-        # TODO: Replace this section with your actual AI model
-        # ========================================================
-        # Your AI model integration goes here:
-        # 1. Load your trained model
-        # 2. Process the coordinates and project data
-        # 3. Analyze satellite imagery
-        # 4. Generate MRV report
-        # 5. Calculate confidence scores
-        # ========================================================
-        
-        # For now, generate mock analysis
-        analysis_result = generate_mock_analysis(project_data)
-        
-        # Generate confidence score (0.7 to 0.95 for realistic results)
-        confidence_score = random.uniform(0.7, 0.95)
+        geometry.project_polygons.get(project_data['coordinates'])
+    except ValueError as e:
+        return f'Invalid coordinates: {str(e)}'
+    
+    return None
+
+def reverification_queue_fields(project_data):
+    """Queue fields of a re-verification request, with the ai_reverification_queue defaults"""
+    return {
+        'priority': project_data.get('priority', DEFAULT_PRIORITY),
+        'reverification_type': project_data.get('reverification_type', 'SCHEDULED'),
+        'scheduled_for': project_data.get('scheduled_for'),
+        'max_retries': project_data.get('max_retries', DEFAULT_MAX_RETRIES)
+    }
+
+def schedule_reverification(project_data):
+    """Place a re-verification on the shared work queue, or else the in-process scheduler"""
+    if work_queue.enabled:
+        return work_queue.submit(
+            'reverify',
+            project_data,
+            dedup_key=result_cache.key_for('reverify', project_data),
+            **reverification_queue_fields(project_data)
+        )
+    return reverification_scheduler.submit(
+        perform_reverification,
+        project_data,
+        **reverification_queue_fields(project_data)
+    )
+
+def submit_reverification(project_data):
+    """
+    Schedule a re-verification (unless cached or already running); returns
+    (future, cache_status, scheduler entry or None). Raises TypeError/ValueError
+    for bad queue fields.
+    """
+    scheduled = {}
+    
+    def submit():
+        scheduled['entry'] = schedule_reverification(project_data)
+        return scheduled['entry'].future
+    
+    # Reject bad queue fields before the cache can answer for them
+    normalize_queue_fields(**reverification_queue_fields(project_data))
+    future, cache_status = result_cache.get_or_submit('reverify', project_data, submit)
+    
+    # Update metrics (cache hits and coalesced requests are not new verifications)
+    if cache_status == 'MISS':
+        metrics_store.inc('verifications_total')
+    
+    return future, cache_status, scheduled.get('entry')
+
+def track_reverification_job(project_data, future, cache_status, entry=None):
+    """Register a submitted re-verification as an async job"""
+    counted = cache_status == 'MISS'
+    return job_manager.track(
+        'reverify',
+        project_data,
+        future,
+        on_success=partial(record_verification_success, 'reverify', project_data) if counted else None,
+        on_failure=record_verification_failure if counted else None,
+        details=entry.snapshot if entry is not None else None,
+        job_id=entry.queue_id if isinstance(entry, QueuedJob) else None
+    )
+
+def perform_verification(project_data):
+    """
+    Run the AI verification for one project and build the response payload
+    Runs either on the request thread or on the job pool
+    """
+    project_id = project_data['project_id']
+    logger.info(f"Starting AI verification for project: {project_id}")
+    timings = new_timings()
+    
+    # Simulate processing time (2-10 seconds for demo)
+    processing_start = time.time()
+    with timings.span('inference'):
+        simulate_model_latency(2, 10)
+    processing_end = time.time()
+    
+    actual_processing_time = processing_end - processing_start
+    
+    # Verified area is the geodesic area of the project polygon, not the declared project_area_hectares
+    with timings.span('validate'):
+        area_hectares = round(geometry.project_polygons.get(project_data['coordinates']).area_hectares, 4)
+    analysis_input = {
+        **project_data,
+        'additional_data': {**(project_data.get('additional_data') or {}), 'project_area_hectares': area_hectares}
+    }
+    
+    # Run the model backend, batched with concurrent requests (see model_backend.py to plug in a real model)
+    rng = analysis_rng(project_data, 'verify')
+    with timings.span('inference'):
+        prediction = verify_batcher.submit((analysis_input, rng)).result()
+    
+    with timings.span('postprocess'):
+        analysis_result = with_series_change_detection(project_id, prediction['analysis_result'])
+        confidence_score = prediction['confidence_score']
         
         # Calculate estimated CO2 from analysis
         estimated_co2_tons = analysis_result['carbon_sequestration']['estimated_annual_co2_tons']
         
-        # Get project area
-        area_hectares = project_data.get('additional_data', {}).get('project_area_hectares', 10)
-        
-        # Generate mock report URL (in production, this would be a real PDF report)
-        report_url = f"https://ai-reports.bluecarbon.com/{project_id}/mrv-report-{int(time.time())}.pdf"
-        
         # Generate unique MRV ID
         mrv_id = f"mrv-{int(time.time())}-{str(uuid.uuid4())[:8]}"
         
@@ -268,28 +632,90 @@ def verify_project():
         response_data = {
             'success': True,
             'mrv_id': mrv_id,
+            'project_id': project_id,
             'confidence_score': round(confidence_score, 4),
             'estimated_co2_tons': round(estimated_co2_tons, 2),
             'verified_area_hectares': area_hectares,
-            'report_url': report_url,
+            'report_url': None,
             'analysis_result': analysis_result,
             'processing_time_seconds': round(actual_processing_time, 2),
             'model_version': MODEL_VERSION,
             'processing_node_id': PROCESSING_NODE_ID,
             'timestamp': datetime.now().isoformat()
         }
+    
+    record_stage_timings('verify', timings)
+    if timings.spans:
+        response_data['timings'] = timings.as_dict()
+    
+    # The report renders on a background thread; until it is written its URL answers 202
+    response_data['report_url'] = report_store.submit(mrv_id, 'verify', project_id, dict(response_data))
+    
+    logger.info(f"AI verification completed for project: {project_id}, confidence: {confidence_score:.4f}")
+    
+    return response_data
+
+@app.route('/api/mrv/verify', methods=['POST'])
+def verify_project():
+    """
+    Main AI verification endpoint
+    This is where your AI model will be integrated
+    Pass ?async=true to get a job id back immediately instead of waiting,
+    ?view=summary or ?fields=a,b.c to receive only part of the result,
+    ?timings=true to add the seconds spent per stage
+    """
+    # Authenticate request
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Response shaping: ?view=summary or ?fields=a,b.c
+    try:
+        fields, view = parse_view(request.args)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    cache_status = 'MISS'
+    try:
+        # Get request data
+        with g.timings.span('decode'):
+            project_data = request.get_json()
         
-        # Update success metrics
-        metrics['successful_verifications'] += 1
-        metrics['total_processing_time'] += actual_processing_time
+        with g.timings.span('validate'):
+            error = project_request_error(project_data)
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 400
         
-        logger.info(f"AI verification completed for project: {project_id}, confidence: {confidence_score:.4f}")
+        if wants_async_job():
+            return submit_verification_job('verify', perform_verification, project_data)
         
-        return jsonify(response_data)
+        future, cache_status = result_cache.get_or_submit(
+            'verify', project_data, lambda: completed_future(perform_verification, project_data)
+        )
+        
+        # Update metrics (cache hits and coalesced requests are not new verifications)
+        if cache_status == 'MISS':
+            metrics_store.inc('verifications_total')
+        
+        response_data = future.result()
+        
+        # Update success metrics
+        if cache_status == 'MISS':
+            record_verification_success('verify', project_data, response_data)
+        
+        payload = with_timings(shape_payload(response_data, 'verify', fields, view), response_data, g.timings, wants_timings())
+        with g.timings.span('serialize'):
+            return jsonify(payload), 200, {'X-Cache': cache_status}
         
     except Exception as e:
         # Update failure metrics
-        metrics['failed_verifications'] += 1
+        if cache_status == 'MISS':
+            record_verification_failure(e)
         
         logger.error(f"AI verification failed: {str(e)}")
         
@@ -300,81 +726,272 @@ def verify_project():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+def shared_job(job_id):
+    """
+    The view of a job accepted by another worker or node, or None: work queue jobs
+    (whose job_id is their queue_id) from their queue row and result, others from the job store
+    """
+    job = work_queue.describe(job_id) if work_queue.enabled else None
+    return job if job is not None else job_manager.stored(job_id)
+
+def find_job(job_id, wait_seconds=0):
+    """
+    A job accepted by this process (long-polled on its future) or elsewhere (polled
+    through shared_job), waiting up to wait_seconds for it to finish
+    """
+    if job_manager.future_for(job_id) is not None:
+        return job_manager.get(job_id, wait_seconds=wait_seconds)
+    
+    deadline = time.time() + min(wait_seconds, JOB_MAX_WAIT_SECONDS)
+    job = shared_job(job_id)
+    while job is not None and job['status'] not in FINAL_JOB_STATUSES and time.time() < deadline:
+        time.sleep(JOB_STORE_POLL_SECONDS)
+        job = shared_job(job_id)
+    return job
+
+@app.route('/api/mrv/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Fetch the status/result of an async verification job
+    Pass ?wait=<seconds> to long-poll until the job finishes, ?view=summary or ?fields= to trim the result
+    """
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Response shaping: ?view=summary or ?fields=a,b.c
+    try:
+        fields, view = parse_view(request.args)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    try:
+        wait_seconds = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'wait must be a number of seconds'
+        }), 400
+    
+    job = find_job(job_id, wait_seconds=max(0, wait_seconds))
+    
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': f'Job not found: {job_id}'
+        }), 404
+    
+    if 'result' in job:
+        job['result'] = with_timings(shape_payload(job['result'], job['job_type'], fields, view),
+                                     job['result'], g.timings, wants_timings())
+    
+    return jsonify({
+        'success': True,
+        **job
+    })
+
+def perform_batch_item(item):
+    """Simulate model latency for one batch item whose analysis was already computed"""
+    # Simulate processing
+    processing_time = simulate_model_latency(1, 3)
+    
+    return {
+        'project_id': item['project_id'],
+        'success': True,
+        'confidence_score': item['confidence_score'],
+        'estimated_co2_tons': item['estimated_co2_tons'],
+        'processing_time_seconds': round(processing_time, 2)
+    }
+
+def analyze_batch_projects(projects, seed=None):
+    """
+    Validate every batch item in one pass, then score the valid ones in one vectorized pass
+    Returns ({index: error message}, {index: record})
+    """
+    errors = schemas.item_errors('batch-item', projects)
+    valid = [(index, project_data) for index, project_data in enumerate(projects) if index not in errors]
+    if not valid:
+        return errors, {}
+    
+    valid_projects = [project_data for _, project_data in valid]
+    columns = project_columns(valid_projects)
+    project_ids = [project_id or f'batch-{uuid.uuid4()}' for project_id in columns['project_ids']]
+    
+    if DETERMINISTIC_ANALYSIS:
+        # One independent stream per project, so a project scores the same in any batch
+        rng = ProjectStreams([analysis_seed(project_data, MODEL_VERSION, 'batch-verify')
+                              for project_data in valid_projects])
+    else:
+        rng = np.random.default_rng(seed)
+    
+    result = model.backend.score_batch(columns, rng)
+    records = verification_records(project_ids, result)
+    
+    return errors, {index: record for (index, _), record in zip(valid, records)}
+
+def submit_batch_item(executor, project_data, analyzed_item, seed=None):
+    """Run one analyzed batch item on executor (unless cached); returns (future, cache_status)"""
+    return result_cache.get_or_submit(
+        'batch-verify',
+        {'project': project_data, 'seed': seed},
+        lambda: executor.submit(perform_batch_item, analyzed_item)
+    )
+
+def invalid_batch_item_result(project_data, error):
+    """Result (and failure metrics) for a batch entry that failed validation"""
+    metrics_store.inc('verifications_total')
+    record_verification_failure(None)
+    project_id = project_data.get('project_id') if isinstance(project_data, dict) else None
+    return {
+        'project_id': project_id if isinstance(project_id, str) and project_id else 'unknown',
+        'success': False,
+        'error': error
+    }
+
+def batch_item_result(future, project_data, cache_status):
+    """Result of a finished batch item future, updating metrics for items this batch computed"""
+    try:
+        result = future.result()
+        if cache_status == 'MISS':
+            metrics_store.inc('verifications_total')
+            record_verification_success('batch-verify', project_data, result)
+    except Exception as e:
+        result = {
+            'project_id': project_data.get('project_id', 'unknown'),
+            'success': False,
+            'error': str(e)
+        }
+        if cache_status == 'MISS':
+            metrics_store.inc('verifications_total')
+            record_verification_failure(e)
+    return result
+
+def iter_batch_results(projects, seed=None, concurrency=BATCH_CONCURRENCY):
+    """
+    Run batch items on the shared batch pool and yield (index, result) as each one finishes
+    At most `concurrency` items of this batch are in flight at once
+    """
+    executor = get_batch_executor()
+    errors, analyzed = analyze_batch_projects(projects, seed)
+    
+    # Invalid items are answered first and never reach the pool
+    for index, error in errors.items():
+        yield index, invalid_batch_item_result(projects[index], error)
+    items = ((index, projects[index]) for index in analyzed)
+    pending = {}  # future -> [(index, project_data, cache_status)]; duplicates share one future
+    
+    try:
+        while True:
+            for index, project_data in items:
+                future, cache_status = submit_batch_item(executor, project_data, analyzed[index], seed)
+                pending.setdefault(future, []).append((index, project_data, cache_status))
+                if len(pending) >= concurrency:
+                    break
+            
+            if not pending:
+                return
+            
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for index, project_data, cache_status in pending.pop(future):
+                    yield index, batch_item_result(future, project_data, cache_status)
+    finally:
+        # Client went away or the generator was closed early - drop work that has not started
+        # (items already running still finish and land in the result cache)
+        for future in pending:
+            future.cancel()
+
+def stream_batch_results(projects, seed=None):
+    """Yield NDJSON lines, one per project as it completes, then a summary line"""
+    successful = 0
+    for index, result in iter_batch_results(projects, seed):
+        successful += 1 if result['success'] else 0
+        yield dumps({'index': index, **result}) + b'\n'
+    
+    yield batch_summary_line(len(projects), successful)
+
+def batch_summary_line(total, successful):
+    """Final NDJSON line of a streamed batch"""
+    return dumps({
+        'summary': True,
+        'success': True,
+        'total_processed': total,
+        'successful': successful,
+        'failed': total - successful,
+        'timestamp': datetime.now().isoformat()
+    }) + b'\n'
+
+def batch_request_error(batch_data):
+    """Validation message for a batch-verify body, or None when it is usable"""
+    if not batch_data or 'projects' not in batch_data:
+        return 'No projects data provided'
+    
+    # Items are validated one by one (see analyze_batch_projects), so one bad item fails alone
+    error = schemas.request_error('batch-verify', batch_data)
+    if error:
+        return error
+    
+    if len(batch_data['projects']) > BATCH_MAX_PROJECTS:  # Limit batch size
+        return f'Batch size cannot exceed {BATCH_MAX_PROJECTS} projects'
+    
+    return None
+
+def wants_ndjson_stream(args=None, headers=None):
+    """Check whether the caller asked for streamed results (?stream=true or Accept: application/x-ndjson)"""
+    args = request.args if args is None else args
+    headers = request.headers if headers is None else headers
+    if args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'application/x-ndjson' in headers.get('Accept', '')
+
 @app.route('/api/mrv/batch-verify', methods=['POST'])
 def batch_verify_projects():
     """
     Batch verification endpoint for multiple projects
-    Useful for processing multiple projects efficiently
+    Items run concurrently on a shared pool; pass ?stream=true (or Accept: application/x-ndjson)
+    to receive each result as an NDJSON line as soon as it finishes
     """
     if not authenticate_request():
         return jsonify({'error': 'Unauthorized'}), 401
     
     try:
-        batch_data = request.get_json()
+        with g.timings.span('decode'):
+            batch_data = request.get_json()
         
-        if not batch_data or 'projects' not in batch_data:
+        with g.timings.span('validate'):
+            error = batch_request_error(batch_data)
+        if error:
             return jsonify({
                 'success': False,
-                'message': 'No projects data provided'
+                'message': error
             }), 400
         
         projects = batch_data['projects']
-        if not isinstance(projects, list) or len(projects) == 0:
-            return jsonify({
-                'success': False,
-                'message': 'Projects must be a non-empty array'
-            }), 400
-        
-        if len(projects) > 10:  # Limit batch size
-            return jsonify({
-                'success': False,
-                'message': 'Batch size cannot exceed 10 projects'
-            }), 400
+        seed = batch_data.get('seed')  # optional, makes the batch analysis reproducible
         
-        results = []
+        if wants_ndjson_stream():
+            return hold_admission(Response(stream_batch_results(projects, seed), mimetype='application/x-ndjson'))
         
-        for project_data in projects:
-            try:
-                # Process each project (simplified version)
-                project_id = project_data.get('project_id', f'batch-{uuid.uuid4()}')
-                
-                # Simulate processing
-                processing_time = random.uniform(1, 3)
-                time.sleep(processing_time)
-                
-                analysis_result = generate_mock_analysis(project_data)
-                confidence_score = random.uniform(0.7, 0.95)
-                estimated_co2_tons = analysis_result['carbon_sequestration']['estimated_annual_co2_tons']
-                
-                results.append({
-                    'project_id': project_id,
-                    'success': True,
-                    'confidence_score': round(confidence_score, 4),
-                    'estimated_co2_tons': round(estimated_co2_tons, 2),
-                    'processing_time_seconds': round(processing_time, 2)
-                })
-                
-                metrics['successful_verifications'] += 1
-                
-            except Exception as e:
-                results.append({
-                    'project_id': project_data.get('project_id', 'unknown'),
-                    'success': False,
-                    'error': str(e)
-                })
-                
-                metrics['failed_verifications'] += 1
-        
-        metrics['total_verifications'] += len(projects)
+        results = [None] * len(projects)
+        with g.timings.span('inference'):
+            for index, result in iter_batch_results(projects, seed):
+                results[index] = result
         
-        return jsonify({
+        payload = {
             'success': True,
             'batch_results': results,
             'total_processed': len(projects),
             'successful': len([r for r in results if r['success']]),
             'failed': len([r for r in results if not r['success']]),
             'timestamp': datetime.now().isoformat()
-        })
+        }
+        if wants_timings():
+            payload['timings'] = g.timings.as_dict()
+        
+        with g.timings.span('serialize'):
+            return jsonify(payload)
         
     except Exception as e:
         logger.error(f"Batch verification failed: {str(e)}")
@@ -388,188 +1005,151 @@ def batch_verify_projects():
 @app.route('/api/mrv/model-info', methods=['GET'])
 def get_model_info():
     """Get information about the AI model"""
-    return jsonify({
+    return jsonify(model_info_payload())
+
+def model_info_payload():
+    """Model description (shared by the WSGI and ASGI apps)"""
+    return {
         'model_name': 'BlueCarbon MRV Analyzer',
         'model_version': MODEL_VERSION,
-        'model_type': 'Placeholder/Mock',
-        'supported_project_types': [
-            'mangrove_restoration',
-            'seagrass_conservation',
-            'salt_marsh_restoration',
-            'coastal_wetland_protection',
-            'blue_carbon_afforestation'
-        ],
-        'capabilities': [
-            'Satellite imagery analysis',
-            'Vegetation coverage assessment',
-            'Carbon sequestration estimation',
-            'Species identification',
-            'Environmental factor analysis',
-            'Change detection',
-            'Threat assessment'
-        ],
-        'limitations': [
-            'Mock/placeholder implementation',
-            'Requires real AI model integration',
-            'Ground-truth validation recommended',
-            'Seasonal variations not captured',
-            'Resolution limited to satellite imagery'
-        ],
+        'model_type': model.describe()[1],
+        'model_backend': model.describe()[0],
+        'model_ready': model.is_ready(),
+        'supported_project_types': SUPPORTED_PROJECT_TYPES,
+        'capabilities': MODEL_CAPABILITIES,
+        'limitations': MODEL_LIMITATIONS,
         'processing_node_id': PROCESSING_NODE_ID,
         'last_updated': datetime.now().isoformat()
-    })
+    }
 
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({
-        'success': False,
-        'message': 'Endpoint not found',
-        'available_endpoints': [
-            'GET /health',
-            'GET /metrics',
-            'POST /api/mrv/verify',
-            'POST /api/mrv/batch-verify',
-            'GET /api/mrv/model-info'
-        ]
-    }), 404
+def observe_project_ndvi(project_data):
+    """NDVI summary of the project polygon from IMAGERY_DIR, or None (no imagery or unusable polygon)"""
+    if not imagery.imagery_catalog.enabled:
+        return None
+    try:
+        project_polygon = geometry.project_polygons.get(project_data.get('coordinates'))
+    except ValueError as e:
+        logger.warning(f"Skipping imagery for project {project_data.get('project_id')}: {str(e)}")
+        return None
+    
+    # Overlapping active projects share decoded tiles through the tile cache, and
+    # tiles without newer imagery since the last run come from the summary store
+    project_footprints = geometry.project_footprints
+    project_footprints.register(project_data['project_id'], project_polygon.geometry)
+    return imagery.observe_ndvi(
+        imagery.imagery_catalog, project_polygon.geometry, cache=imagery.tile_cache, footprints=project_footprints,
+        store=tile_summaries, project_id=project_data['project_id'], geometry_key=project_polygon.key
+    )
 
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({
-        'success': False,
-        'message': 'Internal server error',
-        'timestamp': datetime.now().isoformat()
-    }), 500
+def record_project_acquisition(project_id, assessment):
+    """Add a re-verification's NDVI and area to the project's time series; returns its change statistics"""
+    image_dates = assessment.get('image_dates') or [datetime.now().strftime('%Y-%m-%d')]
+    ndvi_series.record(project_id, image_dates[0], assessment['current_ndvi'], assessment['current_area_hectares'])
+    return ndvi_series.assess(project_id)
 
-if __name__ == '__main__':
-    port = int(os.getenv('PORT', 5000))
-    debug = os.getenv('FLASK_ENV') == 'development'
-    
-    logger.info(f"Starting BlueCarbon AI Microservice on port {port}")
-    logger.info(f"Model version: {MODEL_VERSION}")
-    logger.info(f"Processing node: {PROCESSING_NODE_ID}")
-    logger.info("Ready to receive AI verification requests...")
-    
-    app.run(host='0.0.0.0', port=port, debug=debug)
-@app.
-route('/api/mrv/reverify', methods=['POST'])
-def reverify_project():
+def with_series_change_detection(project_id, analysis_result):
+    """analysis_result with satellite_analysis.change_detection taken from the project's time series, when it has one"""
+    change = ndvi_series.assess(project_id)
+    if change is None or change['compliance_flag'] is None:
+        return analysis_result
+    satellite_analysis = analysis_result['satellite_analysis']
+    return {
+        **analysis_result,
+        'satellite_analysis': {
+            **satellite_analysis,
+            'change_detection': {
+                'area_change_percent': change['area_change_percent'],
+                'vegetation_change_percent': change['ndvi_change_percent'],
+                'time_series': change
+            }
+        }
+    }
+
+def project_compliance(project_data, ndvi_change_percent, co2_change_percent, area_change_percent, ai_confidence_score):
+    """Compliance status, score and risk of one re-verification under its project type's thresholds"""
+    result, _ = compliance_thresholds.evaluate(record_columns([{
+        'project_id': project_data['project_id'],
+        'project_type': project_data.get('project_type'),
+        'ndvi_change_percent': ndvi_change_percent,
+        'co2_change_percent': co2_change_percent,
+        'area_change_percent': area_change_percent,
+        'ai_confidence_score': ai_confidence_score
+    }]))
+    return compliance_record(result)
+
+def perform_reverification(project_data):
     """
-    AI Re-verification endpoint for compliance monitoring
-    This endpoint is called by the compliance service to re-verify projects
+    Run the AI re-verification for one project and build the response payload
+    Runs either on the request thread or on the job pool
     """
-    # Authenticate request
-    if not authenticate_request():
-        return jsonify({'error': 'Unauthorized'}), 401
+    project_id = project_data['project_id']
+    logger.info(f"Starting AI re-verification for project: {project_id}")
+    timings = new_timings()
     
-    try:
-        # Get request data
-        project_data = request.get_json()
-        
-        if not project_data:
-            return jsonify({
-                'success': False,
-                'message': 'No project data provided'
-            }), 400
+    # Simulate processing time (5-15 seconds for re-verification)
+    processing_start = time.time()
+    with timings.span('inference'):
+        simulate_model_latency(5, 15)
+    processing_end = time.time()
+    
+    actual_processing_time = processing_end - processing_start
+    
+    # Measure NDVI inside the project polygon from local imagery, if any covers it
+    with timings.span('fetch_imagery'):
+        observation = observe_project_ndvi(project_data)
+    
+    # Run the model backend, batched with concurrent requests (see model_backend.py to plug in a real model)
+    rng = analysis_rng(project_data, 'reverify')
+    with timings.span('inference'):
+        assessment = reverify_batcher.submit((project_data, rng, observation)).result()
+    
+    with timings.span('postprocess'):
+        # Once the project's NDVI time series is long enough, its trend and breakpoints
+        # decide the flag and change percentages instead of the single baseline comparison
+        change = record_project_acquisition(project_id, assessment)
+        compliance_flag = assessment['compliance_flag']
+        ndvi_change_percent = assessment['ndvi_change_percent']
+        area_change_percent = assessment['area_change_percent']
+        if change is not None and change['compliance_flag'] is not None:
+            compliance_flag = change['compliance_flag']
+            ndvi_change_percent = change['ndvi_change_percent']
+            area_change_percent = change['area_change_percent']
         
-        # Validate required fields
-        required_fields = ['project_id', 'coordinates', 'project_type']
-        for field in required_fields:
-            if field not in project_data:
-                return jsonify({
-                    'success': False,
-                    'message': f'Missing required field: {field}'
-                }), 400
-        
-        project_id = project_data['project_id']
-        logger.info(f"Starting AI re-verification for project: {project_id}")
-        
-        # Update metrics
-        metrics['total_verifications'] += 1
-        
-        # Simulate processing time (5-15 seconds for re-verification)
-        processing_start = time.time()
-        processing_time = random.uniform(5, 15)
-        time.sleep(processing_time)
-        processing_end = time.time()
-        
-        actual_processing_time = processing_end - processing_start
-        
-        # TODO: Replace this section with your actual AI model for re-verification
-        # ========================================================
-        # Your AI model integration goes here:
-        # 1. Load your trained compliance monitoring model
-        # 2. Process the coordinates and baseline data
-        # 3. Analyze recent satellite imagery
-        # 4. Compare with baseline measurements
-        # 5. Generate compliance assessment and change detection
-        # ========================================================
-        
-        # For now, generate mock re-verification analysis
-        baseline_ndvi = project_data.get('baseline_ndvi', 0.8)
-        baseline_co2_tons = project_data.get('baseline_co2_tons', 100)
-        baseline_area_hectares = project_data.get('baseline_area_hectares', 10)
-        reverification_type = project_data.get('reverification_type', 'SCHEDULED')
-        
-        # Simulate degradation based on reverification type
-        degradation_factor = simulate_degradation(reverification_type)
-        
-        # Calculate current values with degradation
-        current_ndvi = max(0.1, baseline_ndvi * (1 - degradation_factor['ndvi']))
-        current_co2_tons = max(10, baseline_co2_tons * (1 - degradation_factor['co2']))
-        current_area_hectares = max(1, baseline_area_hectares * (1 - degradation_factor['area']))
-        
-        # Calculate percentage changes
-        ndvi_change_percent = ((current_ndvi - baseline_ndvi) / baseline_ndvi) * 100
-        co2_change_percent = ((current_co2_tons - baseline_co2_tons) / baseline_co2_tons) * 100
-        area_change_percent = ((current_area_hectares - baseline_area_hectares) / baseline_area_hectares) * 100
-        
-        # Generate AI confidence score
-        max_degradation = max(abs(ndvi_change_percent), abs(co2_change_percent), abs(area_change_percent))
-        confidence_score = max(0.5, 0.95 - (max_degradation / 100))
-        
-        # Determine compliance flag
-        compliance_flag = 'COMPLIANT'
-        if max_degradation > 25:
-            compliance_flag = 'CRITICAL_DEGRADATION'
-        elif max_degradation > 15:
-            compliance_flag = 'SIGNIFICANT_DEGRADATION'
-        elif max_degradation > 5:
-            compliance_flag = 'MINOR_DEGRADATION'
-        
-        # Generate mock report URL
-        report_url = f"https://ai-reports.bluecarbon.com/{project_id}/compliance-report-{int(time.time())}.pdf"
+        report_id = f"compliance-{int(time.time())}-{str(uuid.uuid4())[:8]}"
         
         # Prepare response
         response_data = {
             'success': True,
             'project_id': project_id,
-            'current_ndvi': round(current_ndvi, 4),
-            'current_co2_tons': round(current_co2_tons, 2),
-            'current_area_hectares': round(current_area_hectares, 2),
-            'ai_confidence_score': round(confidence_score, 4),
+            'current_ndvi': round(assessment['current_ndvi'], 4),
+            'current_co2_tons': round(assessment['current_co2_tons'], 2),
+            'current_area_hectares': round(assessment['current_area_hectares'], 2),
+            'ai_confidence_score': round(assessment['ai_confidence_score'], 4),
             'compliance_flag': compliance_flag,
             'ndvi_change_percent': round(ndvi_change_percent, 2),
-            'co2_change_percent': round(co2_change_percent, 2),
+            'co2_change_percent': round(assessment['co2_change_percent'], 2),
             'area_change_percent': round(area_change_percent, 2),
-            'analysis_report_url': report_url,
+            'change_detection': change,
+            'compliance_evaluation': project_compliance(project_data, ndvi_change_percent,
+                                                        assessment['co2_change_percent'], area_change_percent,
+                                                        assessment['ai_confidence_score']),
+            'analysis_report_url': None,
             'analysis_metadata': {
                 'model_version': MODEL_VERSION,
-                'satellite_data_sources': ['Sentinel-2', 'Landsat-8'],
-                'image_dates': generate_recent_image_dates(),
-                'cloud_coverage_percent': round(random.uniform(5, 20), 1),
+                'satellite_data_sources': SATELLITE_DATA_SOURCES,
+                'ndvi_source': 'imagery' if observation else 'model',
+                'imagery_pixels': observation['pixel_count'] if observation else 0,
+                'imagery_tiles_recomputed': observation['tiles_recomputed'] if observation else 0,
+                'imagery_tiles_reused': observation['tiles_reused'] if observation else 0,
+                'image_dates': assessment['image_dates'],
+                'cloud_coverage_percent': assessment['cloud_coverage_percent'],
                 'resolution_meters': 10,
-                'algorithms_used': ['NDVI Analysis', 'Change Detection', 'Carbon Estimation'],
+                'algorithms_used': REVERIFY_ALGORITHMS,
                 'quality_checks_passed': True,
                 'processing_node_id': PROCESSING_NODE_ID,
-                'confidence_factors': {
-                    'data_quality': round(random.uniform(0.8, 1.0), 3),
-                    'temporal_consistency': round(random.uniform(0.8, 1.0), 3),
-                    'spatial_accuracy': round(random.uniform(0.8, 1.0), 3),
-                    'model_certainty': round(confidence_score, 3)
-                }
+                'confidence_factors': assessment['confidence_factors']
             },
-            'satellite_images_used': [
+            'satellite_images_used': [tile['path'] for tile in observation['tiles']] if observation else [
                 f"https://mock-satellite.com/images/{project_id}/recent-1.tif",
                 f"https://mock-satellite.com/images/{project_id}/recent-2.tif"
             ],
@@ -577,18 +1157,82 @@ def reverify_project():
             'model_version': MODEL_VERSION,
             'timestamp': datetime.now().isoformat()
         }
+    
+    record_stage_timings('reverify', timings)
+    if timings.spans:
+        response_data['timings'] = timings.as_dict()
+    
+    response_data['analysis_report_url'] = report_store.submit(report_id, 'reverify', project_id, dict(response_data))
+    
+    logger.info(f"AI re-verification completed for project: {project_id}, flag: {compliance_flag}")
+    
+    return response_data
+
+@app.route('/api/mrv/reverify', methods=['POST'])
+def reverify_project():
+    """
+    AI Re-verification endpoint for compliance monitoring
+    This endpoint is called by the compliance service to re-verify projects
+    Requests are ordered by priority (1 = highest), reverification_type and scheduled_for,
+    and retried up to max_retries; pass ?async=true to get a job id back immediately
+    ?view=summary (compliance_flag and change percentages) or ?fields=a,b.c trims the result,
+    ?timings=true adds the seconds spent per stage
+    """
+    # Authenticate request
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Response shaping: ?view=summary or ?fields=a,b.c
+    try:
+        fields, view = parse_view(request.args)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    cache_status = 'MISS'
+    try:
+        # Get request data
+        with g.timings.span('decode'):
+            project_data = request.get_json()
         
-        # Update success metrics
-        metrics['successful_verifications'] += 1
-        metrics['total_processing_time'] += actual_processing_time
+        with g.timings.span('validate'):
+            error = project_request_error(project_data, 'reverify')
+        if error:
+            return jsonify({
+                'success': False,
+                'message': error
+            }), 400
         
-        logger.info(f"AI re-verification completed for project: {project_id}, flag: {compliance_flag}")
+        try:
+            with g.timings.span('validate'):
+                future, cache_status, entry = submit_reverification(project_data)
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'message': f'Invalid queue parameters: {str(e)}'
+            }), 400
         
-        return jsonify(response_data)
+        if wants_async_job():
+            job = track_reverification_job(project_data, future, cache_status, entry)
+            return accepted_job_response(job, cache_status)
+        
+        # Synchronous callers still go through the scheduler so priorities and caps apply
+        response_data = future.result()
+        
+        # Update success metrics
+        if cache_status == 'MISS':
+            record_verification_success('reverify', project_data, response_data)
+        
+        payload = with_timings(shape_payload(response_data, 'reverify', fields, view), response_data, g.timings, wants_timings())
+        with g.timings.span('serialize'):
+            return jsonify(payload), 200, {'X-Cache': cache_status}
         
     except Exception as e:
         # Update failure metrics
-        metrics['failed_verifications'] += 1
+        if cache_status == 'MISS':
+            record_verification_failure(e)
         
         logger.error(f"AI re-verification failed: {str(e)}")
         
@@ -599,44 +1243,300 @@ def reverify_project():
             'timestamp': datetime.now().isoformat()
         }), 500
 
-def simulate_degradation(reverification_type):
-    """Simulate degradation scenarios for testing"""
-    # Base degradation rates
-    base_degradation = {
-        'ndvi': random.uniform(0, 0.1),  # 0-10% degradation
-        'co2': random.uniform(0, 0.08),  # 0-8% degradation
-        'area': random.uniform(0, 0.05)  # 0-5% degradation
+@app.route('/api/mrv/results/export', methods=['GET'])
+def export_results():
+    """
+    Stream logged verification results as NDJSON (gzip-compressed when the client accepts it)
+    Filters: project_id, job_type, compliance_flag, since / until (ISO timestamps on recorded_at)
+    """
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    if not results_log.enabled:
+        return jsonify({
+            'success': False,
+            'message': 'Results log is disabled (set RESULTS_LOG_DIR)'
+        }), 404
+    
+    try:
+        filters = results_export_filters(request.args)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    lines, headers = results_export_stream(filters, request.headers.get('Accept-Encoding', ''))
+    return hold_admission(Response(lines, mimetype='application/x-ndjson', headers=headers))
+
+def results_export_filters(args):
+    """Results log filters from the export query string; raises ValueError for bad timestamps"""
+    filters = {}
+    for field in ('project_id', 'job_type', 'compliance_flag'):
+        if args.get(field):
+            filters[field] = args[field]
+    for field in ('since', 'until'):
+        if args.get(field):
+            try:
+                filters[field] = datetime.fromisoformat(args[field]).isoformat()
+            except ValueError:
+                raise ValueError(f'{field} must be an ISO 8601 timestamp')
+    return filters
+
+def results_export_stream(filters, accept_encoding=''):
+    """Matching results log lines (gzip-compressed when accepted) and the export response headers"""
+    lines = results_log.iter_lines(**filters)
+    headers = {'Content-Disposition': 'attachment; filename="mrv-results.ndjson"'}
+    if 'gzip' in accept_encoding:
+        headers['Content-Encoding'] = 'gzip'
+        lines = gzip_stream(lines)
+    return lines, headers
+
+@app.route('/api/mrv/change-detection/observations', methods=['POST'])
+def record_change_observations():
+    """
+    Add NDVI acquisitions to project time series in bulk, as columns:
+    {"project_id": [...], "acquired": ["2026-09-01", ...], "ndvi": [...], "area_hectares": [...]}
+    (area_hectares is optional). A date already held for a project is replaced.
+    """
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        return jsonify(change_observations_payload(request.get_json()))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+def change_observations_payload(data):
+    """Record a bulk acquisitions upload and build its response; raises ValueError for bad input"""
+    if not isinstance(data, dict):
+        raise ValueError('No observation data provided')
+    error = schemas.request_error('change-observations', data)
+    if error:
+        raise ValueError(error)
+    
+    project_ids = data['project_id']
+    area_hectares = data.get('area_hectares')
+    if len(project_ids) > CHANGE_MAX_OBSERVATIONS:
+        raise ValueError(f'Too many observations (max {CHANGE_MAX_OBSERVATIONS} per request)')
+    if any(len(column) != len(project_ids) for column in (data['acquired'], data['ndvi'], area_hectares or project_ids)):
+        raise ValueError('All columns must have the same length')
+    if not all(isinstance(project_id, str) for project_id in project_ids):
+        raise ValueError('project_id values must be strings')
+    
+    try:
+        recorded = ndvi_series.record_many(project_ids, data['acquired'], data['ndvi'], area_hectares)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid observations: {str(e)}')
+    
+    return {
+        'success': True,
+        'recorded': recorded,
+        'projects': len(set(project_ids)),
+        'processing_node_id': PROCESSING_NODE_ID,
+        'timestamp': datetime.now().isoformat()
+    }
+
+@app.route('/api/mrv/change-detection/scan', methods=['GET'])
+def scan_changes():
+    """
+    Change statistics (trend, seasonality-adjusted change, breakpoint, flag) for every
+    project with a time series, or ?project_id=a,b, in one vectorized pass, as columns
+    ?min_flag=SIGNIFICANT_DEGRADATION returns only projects flagged at that level or worse
+    """
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        return jsonify(change_scan_payload(request.args))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+def change_scan_payload(args):
+    """Scan the NDVI time series and build the columnar response; raises ValueError for bad filters"""
+    min_flag = args.get('min_flag')
+    if min_flag and min_flag not in COMPLIANCE_FLAGS:
+        raise ValueError(f"min_flag must be one of {', '.join(COMPLIANCE_FLAGS)}")
+    project_ids = [project_id for project_id in args.get('project_id', '').split(',') if project_id] or None
+    
+    started = time.perf_counter()
+    project_ids, result = ndvi_series.scan(project_ids)
+    scanned = len(project_ids)
+    if min_flag:
+        keep = result['compliance_codes'] >= COMPLIANCE_FLAGS.index(min_flag)
+        project_ids = [project_ids[i] for i in np.flatnonzero(keep)]
+        result = {field: values[keep] for field, values in result.items()}
+    columns = change_columns(project_ids, result)
+    
+    return {
+        'success': True,
+        'projects_scanned': scanned,
+        'projects_returned': len(project_ids),
+        'scan_seconds': round(time.perf_counter() - started, 4),
+        'columns': columns,
+        'processing_node_id': PROCESSING_NODE_ID,
+        'timestamp': datetime.now().isoformat()
+    }
+
+@app.route('/api/mrv/compliance/evaluate', methods=['POST'])
+def evaluate_compliance_records():
+    """
+    Score and classify many compliance records in one call with the per-project-type thresholds
+    Body: {"records": [{"project_id", "project_type", "ndvi_change_percent", "co2_change_percent",
+    "area_change_percent", "ai_confidence_score"}, ...]} or the same fields as {"columns": {field: [...]}}
+    Returns columns (statuses, risk levels and flags as codes into `legend`) and counts per status
+    """
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    try:
+        return jsonify(compliance_evaluation_payload(request.get_json()))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+
+def compliance_evaluation_payload(data):
+    """Evaluate a bulk compliance request and build the columnar response; raises ValueError for bad input"""
+    if not isinstance(data, dict):
+        raise ValueError('No compliance records provided')
+    error = schemas.request_error('compliance-evaluate', data)
+    if error:
+        raise ValueError(error)
+    
+    records, columns = data.get('records'), data.get('columns')
+    source = records if records is not None else columns
+    if records is not None and not all(isinstance(record, dict) for record in records):
+        raise ValueError('records must be objects')
+    count = len(records) if records is not None else max((len(values) for values in columns.values()), default=0)
+    if count > COMPLIANCE_MAX_RECORDS:
+        raise ValueError(f'Too many records (max {COMPLIANCE_MAX_RECORDS} per request)')
+    
+    try:
+        evaluated = record_columns(source)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid compliance records: {str(e)}')
+    
+    started = time.perf_counter()
+    result, table = compliance_thresholds.evaluate(evaluated)
+    status_counts = np.bincount(result['status_codes'], minlength=len(COMPLIANCE_STATUSES)).tolist()
+    
+    return {
+        'success': True,
+        'count': len(result['compliance_score']),
+        'thresholds_version': table.version,
+        'status_counts': dict(zip(COMPLIANCE_STATUSES, status_counts)),
+        'evaluation_seconds': round(time.perf_counter() - started, 4),
+        'legend': COMPLIANCE_LEGEND,
+        'columns': compliance_columns(evaluated['project_id'], result),
+        'processing_node_id': PROCESSING_NODE_ID,
+        'timestamp': datetime.now().isoformat()
     }
+
+@app.route('/api/mrv/compliance/thresholds', methods=['GET'])
+def get_compliance_thresholds():
+    """Thresholds and score weights in use (re-read from COMPLIANCE_THRESHOLDS_PATH when it changes)"""
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    return jsonify(compliance_thresholds.current().describe())
+
+@app.route('/api/mrv/reports/<report_id>', methods=['GET'])
+def get_report(report_id):
+    """
+    Download a rendered MRV or compliance report: ?format=html (default) or json
+    Streams the stored artifact; supports Range requests and If-None-Match (304), 202 while rendering
+    """
+    if not authenticate_request():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    artifact, error = report_lookup(report_id, request.args)
+    if error is not None:
+        payload, status, headers = error
+        return jsonify(payload), status, headers
+    
+    status, headers, byte_range = report_store.conditional(artifact, request.headers)
+    body = report_store.iter_bytes(artifact, *byte_range) if byte_range else b''
+    return hold_admission(Response(body, status=status, headers=headers, content_type=artifact.content_type))
+
+def report_lookup(report_id, args):
+    """(artifact, None) for a stored report, else (None, (payload, status, headers)) (shared by the WSGI and ASGI apps)"""
+    report_format = args.get('format', DEFAULT_REPORT_FORMAT)
+    if report_format not in REPORT_FORMATS:
+        return None, ({
+            'success': False,
+            'message': f"format must be one of {', '.join(REPORT_FORMATS)}"
+        }, 400, {})
+    
+    if not report_store.enabled:
+        return None, ({
+            'success': False,
+            'message': 'Reports are disabled (set REPORT_STORE_DIR)'
+        }, 404, {})
+    
+    artifact = report_store.artifact(report_id, report_format)
+    if artifact is not None:
+        return artifact, None
+    
+    if report_store.pending(report_id):
+        return None, ({
+            'success': True,
+            'report_id': report_id,
+            'status': 'RENDERING',
+            'message': 'Report is being generated, retry shortly'
+        }, 202, {'Retry-After': '1'})
     
-    # Adjust based on reverification type
-    if reverification_type == 'THRESHOLD_BREACH':
-        # Higher degradation for threshold breach scenarios
-        base_degradation['ndvi'] += random.uniform(0, 0.15)
-        base_degradation['co2'] += random.uniform(0, 0.12)
-        base_degradation['area'] += random.uniform(0, 0.08)
-    elif reverification_type == 'ALERT_TRIGGERED':
-        # Moderate degradation for alert scenarios
-        base_degradation['ndvi'] += random.uniform(0, 0.08)
-        base_degradation['co2'] += random.uniform(0, 0.06)
-        base_degradation['area'] += random.uniform(0, 0.04)
-    elif reverification_type == 'MANUAL':
-        # Random degradation for manual checks
-        if random.random() > 0.7:  # 30% chance of significant degradation
-            base_degradation['ndvi'] += random.uniform(0, 0.12)
-            base_degradation['co2'] += random.uniform(0, 0.10)
-            base_degradation['area'] += random.uniform(0, 0.06)
-    
-    return base_degradation
-
-def generate_recent_image_dates():
-    """Generate recent image dates for compliance monitoring"""
-    dates = []
-    now = datetime.now()
-    
-    # Generate 2-4 dates over the past 3 months
-    for i in range(random.randint(2, 4)):
-        days_ago = random.randint(1, 90)  # Past 3 months
-        date = now - timedelta(days=days_ago)
-        dates.append(date.strftime('%Y-%m-%d'))
-    
-    return sorted(dates, reverse=True)  # Most recent first
\ No newline at end of file
+    return None, ({
+        'success': False,
+        'message': f'Report not found: {report_id}'
+    }, 404, {})
+
+
+# Jobs pulled from the shared work queue (WORK_QUEUE_DB_PATH) run the same code as local ones
+work_queue.register('verify', perform_verification)
+work_queue.register('reverify', perform_reverification)
+
+# Request metrics are labelled by endpoint, so they are defined once every route exists
+REQUEST_ENDPOINTS = sorted(app.view_functions)
+metrics_store.counter('requests_total', 'HTTP requests by endpoint and status class',
+                      labels=[('endpoint', REQUEST_ENDPOINTS), ('status', ('2xx', '3xx', '4xx', '5xx'))])
+metrics_store.gauge('requests_in_flight', 'HTTP requests currently being handled',
+                    labels=[('endpoint', REQUEST_ENDPOINTS)])
+metrics_store.histogram('request_duration_seconds', 'HTTP request latency by endpoint',
+                        labels=[('endpoint', REQUEST_ENDPOINTS)])
+
+@app.errorhandler(404)
+def not_found(error):
+    return jsonify({
+        'success': False,
+        'message': 'Endpoint not found',
+        'available_endpoints': AVAILABLE_ENDPOINTS
+    }), 404
+
+@app.errorhandler(500)
+def internal_error(error):
+    return jsonify({
+        'success': False,
+        'message': 'Internal server error',
+        'timestamp': datetime.now().isoformat()
+    }), 500
+
+if __name__ == '__main__':
+    port = int(os.getenv('PORT', 5000))
+    debug = os.getenv('FLASK_ENV') == 'development'
+    
+    logger.info(f"Starting BlueCarbon AI Microservice on port {port}")
+    logger.info(f"Model version: {MODEL_VERSION}")
+    logger.info(f"Processing node: {PROCESSING_NODE_ID}")
+    model.start()
+    work_queue.start()
+    logger.info("Ready to receive AI verification requests...")
+    
+    app.run(host='0.0.0.0', port=port, debug=debug)
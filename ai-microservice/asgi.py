@@ -0,0 +1,751 @@
+# BlueCarbon Ledger - AI Microservice
+# ASGI entry point: the MRV routes with async handlers, so one process can hold thousands of
+# in-flight long-poll and streaming connections. Model work and other blocking calls run on a
+# thread pool; the event loop only waits on their futures.
+# Run with: uvicorn asgi:application --host 0.0.0.0 --port 5000 (any ASGI 3 server works)
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from itertools import islice
+from urllib.parse import parse_qsl
+
+from app import (
+    model, result_cache, metrics_store, AVAILABLE_ENDPOINTS, BATCH_CONCURRENCY,
+    valid_service_key, wants_async_job, wants_ndjson_stream,
+    health_payload, metrics_payload, model_info_payload, refresh_state_gauges,
+    project_request_error, batch_request_error, batch_summary_line,
+    start_verification_job, accepted_job_payload, perform_verification,
+    submit_reverification, track_reverification_job, shared_job,
+    analyze_batch_projects, submit_batch_item, invalid_batch_item_result, batch_item_result,
+    record_verification_success, record_verification_failure,
+    results_export_filters, results_export_stream,
+    STAGE_JOB_TYPES, record_stage_timings, wants_timings, with_timings,
+    admission_client, admission_pool, admission_rejection,
+    change_observations_payload, change_scan_payload, compliance_evaluation_payload, report_lookup
+)
+from admission import AdmissionController, admission
+from profiling import new_timings
+from jobs import (
+    job_manager, create_executor, get_batch_executor, JOB_MAX_WAIT_SECONDS, JOB_STORE_POLL_SECONDS, FINAL_JOB_STATUSES
+)
+from results_log import results_log
+from scheduler import reverification_scheduler
+from work_queue import work_queue
+from compliance import compliance_thresholds
+from reports import report_store
+from serialization import dumps, loads, parse_view, shape_payload
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+ASGI_EXECUTOR_THREADS = int(os.getenv('ASGI_EXECUTOR_THREADS', 64))  # blocking work (analysis, validation, disk)
+ASGI_MAX_BODY_BYTES = int(os.getenv('ASGI_MAX_BODY_BYTES', 64 * 1024 * 1024))
+ASGI_MAX_IN_FLIGHT = int(os.getenv('ASGI_MAX_IN_FLIGHT', 4096))  # requests being handled (waiting ones hold no thread)
+ASGI_ADMISSION_MAX_QUEUE = int(os.getenv('ASGI_ADMISSION_MAX_QUEUE', 1024))
+EXPORT_LINES_PER_CHUNK = 256  # results log lines read per executor hop
+
+_UNPARSED = object()
+
+# Admission here caps coroutines rather than threads, so it gets its own (larger) limits;
+# the per-API-key token buckets are shared with the WSGI app
+asgi_admission = AdmissionController(max_in_flight=ASGI_MAX_IN_FLIGHT, max_queue=ASGI_ADMISSION_MAX_QUEUE,
+                                     long_slots=ASGI_MAX_IN_FLIGHT, limiter=admission.limiter,
+                                     enabled=admission.enabled)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool for blocking work of ASGI handlers (created lazily, like the job pool)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = create_executor('thread', ASGI_EXECUTOR_THREADS, 'mrv-asgi')
+                logger.info(f"Started ASGI executor with {ASGI_EXECUTOR_THREADS} threads")
+    return _executor
+
+
+async def run_blocking(fn, *args):
+    """Run fn(*args) on the ASGI executor and await its result"""
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), fn, *args)
+
+
+async def result_of(future):
+    """
+    Await a concurrent.futures.Future without holding a thread. Shielded, so a
+    cancelled handler does not cancel work other (coalesced) requests wait on.
+    """
+    return await asyncio.shield(asyncio.wrap_future(future))
+
+
+def record_when_done(job_type, project_data, future):
+    """Update success/failure metrics on whichever thread completes future"""
+    def done(f):
+        if f.cancelled():
+            return
+        error = f.exception()
+        if error is None:
+            record_verification_success(job_type, project_data, f.result())
+        else:
+            record_verification_failure(error)
+    future.add_done_callback(done)
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class Headers(dict):
+    """Request headers keyed by lower-cased name, with a case-insensitive get()"""
+
+    def get(self, name, default=None):
+        return super().get(name.lower(), default)
+
+
+class ASGIRequest:
+    """The parts of an HTTP request the handlers use (args and headers mirror flask.request)"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        self.headers = Headers(
+            (name.decode('latin-1').lower(), value.decode('latin-1')) for name, value in scope.get('headers', ())
+        )
+        self.body = body
+        self.timings = new_timings()
+        self._json = _UNPARSED
+
+    def get_json(self):
+        """Decoded JSON body (parsed once), or None when there is none; raises ValueError for malformed JSON"""
+        if self._json is _UNPARSED:
+            self._json = loads(self.body) if self.body else None
+        return self._json
+
+
+class Response:
+    """A response whose body is bytes or an async iterator of byte chunks"""
+
+    def __init__(self, body, status=200, content_type='application/json', headers=None):
+        self.body = body
+        self.status = status
+        self.headers = {'Content-Type': content_type, 'Access-Control-Allow-Origin': '*', **(headers or {})}
+
+    async def send(self, send, receive):
+        await send({
+            'type': 'http.response.start',
+            'status': self.status,
+            'headers': [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+                        for name, value in self.headers.items()]
+        })
+        if isinstance(self.body, bytes):
+            await send({'type': 'http.response.body', 'body': self.body})
+            return
+
+        # Stop producing (and cancel queued work) as soon as the client goes away
+        stream = asyncio.ensure_future(self._stream(send))
+        disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            await asyncio.wait({stream, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (stream, disconnect):
+                task.cancel()
+        if stream.done() and not stream.cancelled() and stream.exception() is not None:
+            raise stream.exception()
+
+    async def _stream(self, send):
+        try:
+            async for chunk in self.body:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(self.body, 'aclose'):
+                await self.body.aclose()
+
+
+def json_response(payload, status=200, headers=None):
+    return Response(dumps(payload), status, 'application/json', headers)
+
+
+def error_response(message, status=400):
+    return json_response({
+        'success': False,
+        'message': message
+    }, status)
+
+
+def unauthorized():
+    return json_response({'error': 'Unauthorized'}, 401)
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return
+
+
+async def read_body(receive, limit=ASGI_MAX_BODY_BYTES):
+    """Read the whole request body; None if it exceeds limit"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def health_check(request):
+    """Health check endpoint - 503 until the model warmup has finished in this process"""
+    payload, status = health_payload()
+    return json_response(payload, status)
+
+
+async def get_metrics(request):
+    """Get AI service metrics"""
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    payload = await run_blocking(metrics_payload)
+    return json_response({**payload, 'admission': asgi_admission.stats()})
+
+
+def prometheus_text():
+    refresh_state_gauges(reverification_scheduler.stats())
+    return metrics_store.prometheus()
+
+
+async def get_prometheus_metrics(request):
+    """Get AI service metrics in the Prometheus text exposition format"""
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    body = await run_blocking(prometheus_text)
+    return Response(body.encode('utf-8'), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def verify_project(request):
+    """
+    Main AI verification endpoint
+    Same contract as the WSGI route: ?async=true for a job id, ?view= / ?fields= to trim the result
+    """
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    # Response shaping: ?view=summary or ?fields=a,b.c
+    try:
+        fields, view = parse_view(request.args)
+    except ValueError as e:
+        return error_response(str(e))
+
+    cache_status = 'MISS'
+    tracked = False
+    try:
+        project_data = request.get_json()
+
+        # Polygon validation can be heavy (up to POLYGON_MAX_VERTICES), so it runs off the loop
+        with request.timings.span('validate'):
+            error = await run_blocking(project_request_error, project_data)
+        if error:
+            return error_response(error)
+
+        if wants_async_job(request.args, request.headers):
+            job, cache_status = await run_blocking(start_verification_job, 'verify', perform_verification, project_data)
+            payload, headers = accepted_job_payload(job, cache_status)
+            return json_response(payload, 202, headers)
+
+        future, cache_status = await run_blocking(
+            result_cache.get_or_submit,
+            'verify', project_data, lambda: get_executor().submit(perform_verification, project_data)
+        )
+
+        # Update metrics (cache hits and coalesced requests are not new verifications)
+        if cache_status == 'MISS':
+            metrics_store.inc('verifications_total')
+            record_when_done('verify', project_data, future)
+            tracked = True
+
+        response_data = await result_of(future)
+
+        payload = with_timings(shape_payload(response_data, 'verify', fields, view), response_data,
+                               request.timings, wants_timings(request.args))
+        with request.timings.span('serialize'):
+            return json_response(payload, 200, {'X-Cache': cache_status})
+
+    except Exception as e:
+        # Failures after the future was tracked are counted by its callback
+        if cache_status == 'MISS' and not tracked:
+            record_verification_failure(e)
+
+        logger.error(f"AI verification failed: {str(e)}")
+
+        return json_response({
+            'success': False,
+            'message': f'AI verification failed: {str(e)}',
+            'error_type': type(e).__name__,
+            'timestamp': datetime.now().isoformat()
+        }, 500)
+
+
+async def get_job(request, job_id):
+    """
+    Fetch the status/result of an async verification job
+    ?wait=<seconds> long-polls on the event loop, so waiting clients do not hold a thread
+    """
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    # Response shaping: ?view=summary or ?fields=a,b.c
+    try:
+        fields, view = parse_view(request.args)
+    except ValueError as e:
+        return error_response(str(e))
+
+    try:
+        wait_seconds = float(request.args.get('wait', 0))
+    except ValueError:
+        return error_response('wait must be a number of seconds')
+
+    timeout = min(max(0, wait_seconds), JOB_MAX_WAIT_SECONDS)
+    future = job_manager.future_for(job_id)
+    if future is not None:
+        if timeout > 0 and not future.done():
+            await asyncio.wait({asyncio.wrap_future(future)}, timeout=timeout)
+        job = job_manager.get(job_id)
+    else:
+        # Accepted by another worker or node: poll its shared view, sleeping on the event loop between reads
+        deadline = time.monotonic() + timeout
+        job = await run_blocking(shared_job, job_id)
+        while job is not None and job['status'] not in FINAL_JOB_STATUSES and time.monotonic() < deadline:
+            await asyncio.sleep(JOB_STORE_POLL_SECONDS)
+            job = await run_blocking(shared_job, job_id)
+
+    if job is None:
+        return error_response(f'Job not found: {job_id}', 404)
+
+    if 'result' in job:
+        job['result'] = with_timings(shape_payload(job['result'], job['job_type'], fields, view),
+                                     job['result'], request.timings, wants_timings(request.args))
+
+    return json_response({
+        'success': True,
+        **job
+    })
+
+
+async def iter_batch_results(projects, seed=None, concurrency=BATCH_CONCURRENCY):
+    """
+    Async counterpart of app.iter_batch_results: items run on the shared batch pool and
+    (index, result) is yielded as each one finishes, at most `concurrency` in flight
+    """
+    executor = get_batch_executor()
+    errors, analyzed = await run_blocking(analyze_batch_projects, projects, seed)
+
+    # Invalid items are answered first and never reach the pool
+    for index, error in errors.items():
+        yield index, invalid_batch_item_result(projects[index], error)
+    items = ((index, projects[index]) for index in analyzed)
+    pending = {}  # wrapped future -> (future, [(index, project_data, cache_status)]); duplicates share one future
+    by_future = {}
+
+    try:
+        while True:
+            for index, project_data in items:
+                future, cache_status = submit_batch_item(executor, project_data, analyzed[index], seed)
+                if future not in by_future:
+                    by_future[future] = asyncio.wrap_future(future)
+                    pending[by_future[future]] = (future, [])
+                pending[by_future[future]][1].append((index, project_data, cache_status))
+                if len(pending) >= concurrency:
+                    break
+
+            if not pending:
+                return
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for wrapped in done:
+                future, waiting = pending.pop(wrapped)
+                del by_future[future]
+                for index, project_data, cache_status in waiting:
+                    yield index, batch_item_result(future, project_data, cache_status)
+    finally:
+        # Client went away or the generator was closed early - drop work that has not started
+        # (items already running still finish and land in the result cache)
+        for future, _ in pending.values():
+            future.cancel()
+
+
+async def stream_batch_results(projects, seed=None):
+    """Yield NDJSON lines, one per project as it completes, then a summary line"""
+    successful = 0
+    async for index, result in iter_batch_results(projects, seed):
+        successful += 1 if result['success'] else 0
+        yield dumps({'index': index, **result}) + b'\n'
+
+    yield batch_summary_line(len(projects), successful)
+
+
+async def batch_verify_projects(request):
+    """
+    Batch verification endpoint for multiple projects
+    ?stream=true (or Accept: application/x-ndjson) streams each result as an NDJSON line
+    """
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    try:
+        batch_data = request.get_json()
+
+        with request.timings.span('validate'):
+            error = batch_request_error(batch_data)
+        if error:
+            return error_response(error)
+
+        projects = batch_data['projects']
+        seed = batch_data.get('seed')  # optional, makes the batch analysis reproducible
+
+        if wants_ndjson_stream(request.args, request.headers):
+            return Response(stream_batch_results(projects, seed), content_type='application/x-ndjson')
+
+        results = [None] * len(projects)
+        with request.timings.span('inference'):
+            async for index, result in iter_batch_results(projects, seed):
+                results[index] = result
+
+        payload = {
+            'success': True,
+            'batch_results': results,
+            'total_processed': len(projects),
+            'successful': len([r for r in results if r['success']]),
+            'failed': len([r for r in results if not r['success']]),
+            'timestamp': datetime.now().isoformat()
+        }
+        if wants_timings(request.args):
+            payload['timings'] = request.timings.as_dict()
+
+        with request.timings.span('serialize'):
+            return json_response(payload)
+
+    except Exception as e:
+        logger.error(f"Batch verification failed: {str(e)}")
+
+        return json_response({
+            'success': False,
+            'message': f'Batch verification failed: {str(e)}',
+            'timestamp': datetime.now().isoformat()
+        }, 500)
+
+
+async def get_model_info(request):
+    """Get information about the AI model"""
+    return json_response(model_info_payload())
+
+
+async def reverify_project(request):
+    """
+    AI Re-verification endpoint for compliance monitoring
+    Same contract as the WSGI route; synchronous callers wait on the scheduler's future without a thread
+    """
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    # Response shaping: ?view=summary or ?fields=a,b.c
+    try:
+        fields, view = parse_view(request.args)
+    except ValueError as e:
+        return error_response(str(e))
+
+    cache_status = 'MISS'
+    tracked = False
+    try:
+        project_data = request.get_json()
+
+        with request.timings.span('validate'):
+            error = await run_blocking(project_request_error, project_data, 'reverify')
+        if error:
+            return error_response(error)
+
+        try:
+            with request.timings.span('validate'):
+                future, cache_status, entry = await run_blocking(submit_reverification, project_data)
+        except (TypeError, ValueError) as e:
+            return error_response(f'Invalid queue parameters: {str(e)}')
+
+        if wants_async_job(request.args, request.headers):
+            job = track_reverification_job(project_data, future, cache_status, entry)
+            payload, headers = accepted_job_payload(job, cache_status)
+            return json_response(payload, 202, headers)
+
+        if cache_status == 'MISS':
+            record_when_done('reverify', project_data, future)
+            tracked = True
+
+        response_data = await result_of(future)
+
+        payload = with_timings(shape_payload(response_data, 'reverify', fields, view), response_data,
+                               request.timings, wants_timings(request.args))
+        with request.timings.span('serialize'):
+            return json_response(payload, 200, {'X-Cache': cache_status})
+
+    except Exception as e:
+        # Failures after the future was tracked are counted by its callback
+        if cache_status == 'MISS' and not tracked:
+            record_verification_failure(e)
+
+        logger.error(f"AI re-verification failed: {str(e)}")
+
+        return json_response({
+            'success': False,
+            'message': f'AI re-verification failed: {str(e)}',
+            'error_type': type(e).__name__,
+            'timestamp': datetime.now().isoformat()
+        }, 500)
+
+
+async def iterate_in_executor(iterator, chunk_size=EXPORT_LINES_PER_CHUNK):
+    """Drain a blocking iterator on the ASGI executor, chunk_size items per hop"""
+    while True:
+        chunk = await run_blocking(lambda: list(islice(iterator, chunk_size)))
+        if not chunk:
+            return
+        yield b''.join(chunk)
+
+
+async def export_results(request):
+    """Stream logged verification results as NDJSON (gzip-compressed when the client accepts it)"""
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    if not results_log.enabled:
+        return error_response('Results log is disabled (set RESULTS_LOG_DIR)', 404)
+
+    try:
+        filters = results_export_filters(request.args)
+    except ValueError as e:
+        return error_response(str(e))
+
+    lines, headers = results_export_stream(filters, request.headers.get('Accept-Encoding', ''))
+    return Response(iterate_in_executor(lines), content_type='application/x-ndjson', headers=headers)
+
+
+async def record_change_observations(request):
+    """Add NDVI acquisitions to project time series in bulk (columns: project_id, acquired, ndvi, area_hectares)"""
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    try:
+        return json_response(await run_blocking(change_observations_payload, request.get_json()))
+    except ValueError as e:
+        return error_response(str(e))
+
+
+async def scan_changes(request):
+    """Change statistics for every project with a time series, as columns (?project_id=, ?min_flag=)"""
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    try:
+        return json_response(await run_blocking(change_scan_payload, request.args))
+    except ValueError as e:
+        return error_response(str(e))
+
+
+async def evaluate_compliance_records(request):
+    """Score and classify many compliance records in one call (records list or columns object)"""
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    try:
+        return json_response(await run_blocking(compliance_evaluation_payload, request.get_json()))
+    except ValueError as e:
+        return error_response(str(e))
+
+
+async def get_compliance_thresholds(request):
+    """Thresholds and score weights in use"""
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    return json_response(compliance_thresholds.current().describe())
+
+
+async def get_report(request, report_id):
+    """Download a rendered report (?format=html or json) with Range and If-None-Match support"""
+    if not valid_service_key(request.headers.get('Authorization')):
+        return unauthorized()
+
+    artifact, error = await run_blocking(report_lookup, report_id, request.args)
+    if error is not None:
+        payload, status, headers = error
+        return json_response(payload, status, headers)
+
+    status, headers, byte_range = report_store.conditional(artifact, request.headers)
+    # One file read per executor hop
+    body = iterate_in_executor(report_store.iter_bytes(artifact, *byte_range), 1) if byte_range else b''
+    return Response(body, status, artifact.content_type, headers)
+
+
+# path -> {method: handler}; handler names match the Flask endpoints, so request metrics line up
+ROUTES = {
+    '/health': {'GET': health_check},
+    '/metrics': {'GET': get_metrics},
+    '/metrics/prometheus': {'GET': get_prometheus_metrics},
+    '/api/mrv/verify': {'POST': verify_project},
+    '/api/mrv/batch-verify': {'POST': batch_verify_projects},
+    '/api/mrv/reverify': {'POST': reverify_project},
+    '/api/mrv/model-info': {'GET': get_model_info},
+    '/api/mrv/results/export': {'GET': export_results},
+    '/api/mrv/change-detection/observations': {'POST': record_change_observations},
+    '/api/mrv/change-detection/scan': {'GET': scan_changes},
+    '/api/mrv/compliance/evaluate': {'POST': evaluate_compliance_records},
+    '/api/mrv/compliance/thresholds': {'GET': get_compliance_thresholds}
+}
+# Routes ending in one path parameter: prefix -> handler
+PARAMETER_ROUTES = {'/api/mrv/jobs/': get_job, '/api/mrv/reports/': get_report}
+
+
+def resolve(path):
+    """Return ({method: handler}, path args) for path, or (None, ()) when nothing is routed there"""
+    if path in ROUTES:
+        return ROUTES[path], ()
+    for prefix, handler in PARAMETER_ROUTES.items():
+        if path.startswith(prefix) and '/' not in path[len(prefix):] and path != prefix:
+            return {'GET': handler}, (path[len(prefix):],)
+    return None, ()
+
+
+def preflight_response(request, methods):
+    """Answer a CORS preflight the way Flask-CORS does for the WSGI app"""
+    return Response(b'', 200, 'text/plain', {
+        'Access-Control-Allow-Methods': ', '.join(sorted(methods | {'OPTIONS'})),
+        'Access-Control-Allow-Headers': request.headers.get('Access-Control-Request-Headers', '*')
+    })
+
+
+async def dispatch(request, methods, path_args):
+    if methods is None:
+        return json_response({
+            'success': False,
+            'message': 'Endpoint not found',
+            'available_endpoints': AVAILABLE_ENDPOINTS
+        }, 404)
+    if request.method == 'OPTIONS':
+        return preflight_response(request, set(methods))
+    handler = methods.get('GET' if request.method == 'HEAD' else request.method)
+    if handler is None:
+        return json_response({
+            'success': False,
+            'message': f'Method {request.method} not allowed'
+        }, 405, {'Allow': ', '.join(sorted(methods))})
+    return await handler(request, *path_args)
+
+
+async def handle_http(scope, receive, send):
+    methods, path_args = resolve(scope['path'])
+    handler = methods.get(scope['method']) if methods else None
+    endpoint = handler.__name__ if handler is not None else None
+
+    # Servers without a lifespan phase warm on the first request
+    if not model.is_ready() and model.load_mode != 'lazy':
+        model.warm_up_in_background()
+
+    if scope['method'] == 'OPTIONS':
+        await serve_http(scope, receive, send, methods, path_args, endpoint)
+        return
+
+    # Rate limit and cap concurrent work (queued requests wait on the loop, not on a thread);
+    # /health and /metrics use their own reserved slots
+    auth_header = next((value.decode('latin-1') for name, value in scope.get('headers', ())
+                        if name.lower() == b'authorization'), None)
+    client = scope.get('client')
+    args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+    ticket, rejection = await asgi_admission.admit_async(
+        admission_client(auth_header, client[0] if client else None), admission_pool(endpoint, args)
+    )
+    if rejection is not None:
+        payload, status, headers = admission_rejection(rejection)
+        metrics_store.inc('requests_total', endpoint=endpoint, status=f'{status // 100}xx')
+        await json_response(payload, status, headers).send(send, receive)
+        return
+
+    # The slot is held until the (possibly streamed) response has been sent
+    try:
+        await serve_http(scope, receive, send, methods, path_args, endpoint)
+    finally:
+        ticket.release()
+
+
+async def serve_http(scope, receive, send, methods, path_args, endpoint):
+    started = time.perf_counter()
+    metrics_store.inc('requests_in_flight', endpoint=endpoint)
+    try:
+        body = await read_body(receive)
+        if body is None:
+            response = error_response(f'Request body exceeds {ASGI_MAX_BODY_BYTES} bytes', 413)
+        else:
+            request = ASGIRequest(scope, body)
+            try:
+                with request.timings.span('decode'):
+                    request.get_json()
+            except ValueError:
+                response = error_response('Request body must be valid JSON')
+            else:
+                response = await dispatch(request, methods, path_args)
+            record_stage_timings(STAGE_JOB_TYPES.get(endpoint), request.timings)
+    except ClientDisconnected:
+        return
+    except Exception as e:
+        logger.error(f"Unhandled error for {scope['method']} {scope['path']}: {str(e)}")
+        response = json_response({
+            'success': False,
+            'message': 'Internal server error',
+            'timestamp': datetime.now().isoformat()
+        }, 500)
+    finally:
+        # Streamed responses are timed to the first byte, like the WSGI app
+        metrics_store.dec('requests_in_flight', endpoint=endpoint)
+        metrics_store.observe('request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+
+    metrics_store.inc('requests_total', endpoint=endpoint, status=f'{response.status // 100}xx')
+    if scope['method'] == 'HEAD':
+        response.body = b''
+    await response.send(send, receive)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            # Like gunicorn's post_worker_init: with MODEL_LOAD=preload accept requests only
+            # once the model is warm, otherwise start at once
+            await run_blocking(model.start)
+            work_queue.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # Close the results log segment so it ends with a complete gzip trailer
+            results_log.close()
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    """ASGI 3 application serving the same MRV API as app:app"""
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] == 'http':
+        await handle_http(scope, receive, send)
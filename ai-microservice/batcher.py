@@ -0,0 +1,134 @@
+# BlueCarbon Ledger - AI Microservice
+# Micro-batcher - groups concurrent single-project model calls into one batched call
+
+import os
+import time
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MICROBATCH_ENABLED = os.getenv('MICROBATCH_ENABLED', 'true').lower() == 'true'
+MICROBATCH_MAX_SIZE = int(os.getenv('MICROBATCH_MAX_SIZE', 32))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv('MICROBATCH_MAX_WAIT_MS', 10))  # latency budget added to the first caller
+
+
+class MicroBatcher:
+    """
+    Callers submit one item each and get a Future back. A collector thread waits
+    until max_batch_size items are queued or the oldest item has waited
+    max_wait_seconds, then calls batch_fn(items) once and hands each caller the
+    result at its position. batch_fn must return one result per item, in order;
+    if it raises, every caller in that batch gets the exception.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size=MICROBATCH_MAX_SIZE,
+                 max_wait_seconds=MICROBATCH_MAX_WAIT_MS / 1000, enabled=MICROBATCH_ENABLED, on_batch=None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0, max_wait_seconds)
+        self.enabled = enabled and self.max_batch_size > 1
+        self.on_batch = on_batch  # called with (name, batch_size, max_batch_size, oldest_wait_seconds)
+
+        self._cond = threading.Condition()
+        self._pending = deque()  # (item, future, enqueued_at)
+        self._thread = None
+        self._pid = None
+        self._counters = {'batches': 0, 'items': 0, 'full_flushes': 0, 'timeout_flushes': 0, 'errors': 0}
+        self._total_wait = 0
+
+    def submit(self, item):
+        """Queue one item; returns a Future for its result"""
+        future = Future()
+
+        if not self.enabled:
+            self._run_batch([(item, future, time.monotonic())], 'direct')
+            return future
+
+        with self._cond:
+            self._ensure_started()
+            self._pending.append((item, future, time.monotonic()))
+            # Wake the collector for the first item (starts the wait) and for a full batch
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch_size:
+                self._cond.notify()
+
+        return future
+
+    def _ensure_started(self):
+        """Start the collector lazily, and again in a forked child (threads do not survive fork)"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pending.clear()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._collect_loop, name=f'microbatch-{self.name}', daemon=True)
+        self._thread.start()
+
+    def _collect_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+                deadline = self._pending[0][2] + self.max_wait_seconds
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                size = min(len(self._pending), self.max_batch_size)
+                batch = [self._pending.popleft() for _ in range(size)]
+
+            self._run_batch(batch, 'full' if size == self.max_batch_size else 'timeout')
+
+    def _run_batch(self, batch, reason):
+        oldest_wait = time.monotonic() - batch[0][2]
+        futures = [future for _, future, _ in batch if future.set_running_or_notify_cancel()]
+
+        try:
+            results = self.batch_fn([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f'{self.name} batch returned {len(results)} results for {len(batch)} items')
+        except Exception as e:
+            logger.error(f"Micro-batch {self.name} of {len(batch)} items failed: {str(e)}")
+            with self._cond:
+                self._counters['errors'] += 1
+            for future in futures:
+                future.set_exception(e)
+            results = None
+        else:
+            for (_, future, _), result in zip(batch, results):
+                if future in futures:
+                    future.set_result(result)
+
+        with self._cond:
+            self._counters['batches'] += 1
+            self._counters['items'] += len(batch)
+            if reason in ('full', 'timeout'):
+                self._counters[f'{reason}_flushes'] += 1
+            self._total_wait += oldest_wait
+
+        if self.on_batch is not None:
+            try:
+                self.on_batch(self.name, len(batch), self.max_batch_size, oldest_wait)
+            except Exception as e:
+                logger.warning(f"Micro-batch {self.name} callback failed: {str(e)}")
+
+    def stats(self):
+        """Batch counts and fill ratio (items per batch / max_batch_size) for /metrics"""
+        with self._cond:
+            batches = self._counters['batches']
+            return {
+                'enabled': self.enabled,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 2),
+                'pending': len(self._pending),
+                'average_batch_size': round(self._counters['items'] / batches, 2) if batches else 0,
+                'fill_ratio': round(self._counters['items'] / (batches * self.max_batch_size), 4) if batches else 0,
+                'average_wait_ms': round(self._total_wait / batches * 1000, 2) if batches else 0,
+                **self._counters
+            }
@@ -0,0 +1,66 @@
+# BlueCarbon Ledger - AI Microservice
+# Micro-benchmark for project polygon validation and geodesic area:
+#   python bench_geometry.py --repeat 20
+
+import time
+import argparse
+
+import numpy as np
+
+from geometry import PolygonCache, build_project_polygon, geodesic_area_hectares
+
+POLYGON_SIZES = {'small': 16, 'medium': 1000, 'large': 50000}
+
+
+def coastline_polygon(vertices, center=(88.95, 21.7), radius=0.05, seed=0):
+    """
+    Valid GeoJSON polygon with the given vertex count: a star-shaped outline whose
+    radius wanders smoothly, like a digitised shoreline
+    """
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    harmonics = np.arange(2, 40)
+    amplitudes = rng.uniform(0, 0.2, len(harmonics)) / harmonics
+    phases = rng.uniform(0, 2 * np.pi, len(harmonics))
+    wobble = (amplitudes[:, None] * np.sin(harmonics[:, None] * angles[None, :] + phases[:, None])).sum(axis=0)
+    radii = radius * (1 + wobble)
+    ring = np.column_stack([center[0] + radii * np.cos(angles), center[1] + radii * np.sin(angles)])
+    ring = np.vstack([ring, ring[:1]])
+    # Requests carry plain JSON lists, so benchmark from those
+    return {'type': 'Polygon', 'coordinates': [ring.tolist()]}
+
+
+def timed(fn, repeat):
+    """Median wall time of fn() over repeat runs, in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def run(repeat):
+    print(f"{'polygon':<8} {'vertices':>9} {'area_ha':>12} {'cold_ms':>9} {'area_ms':>9} {'cached_ms':>10}")
+    for name, vertices in POLYGON_SIZES.items():
+        coordinates = coastline_polygon(vertices)
+        project_polygon = build_project_polygon(coordinates)
+
+        # Cold: parse, validate, build, prepare and measure a polygon not seen before
+        cold_ms = timed(lambda: build_project_polygon(coordinates), repeat)
+        area_ms = timed(lambda: geodesic_area_hectares(project_polygon.geometry), repeat)
+
+        # Warm: the same coordinates again, answered from the polygon cache
+        cache = PolygonCache()
+        cache.get(coordinates)
+        cached_ms = timed(lambda: cache.get(coordinates), repeat)
+
+        print(f'{name:<8} {project_polygon.vertex_count:>9} {project_polygon.area_hectares:>12.2f} '
+              f'{cold_ms:>9.3f} {area_ms:>9.3f} {cached_ms:>10.3f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark polygon validation and area computation')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run(args.repeat)
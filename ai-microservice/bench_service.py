@@ -0,0 +1,276 @@
+# BlueCarbon Ledger - AI Microservice
+# Load test for the MRV endpoints, in-process (Flask test client) or against a running server:
+#   python bench_service.py --requests 200 --concurrency 16 --no-sleep --out bench-v1.json
+#   python bench_service.py --url http://localhost:5000 --endpoints verify,reverify
+#   python bench_service.py --no-sleep --out bench-v2.json --compare bench-v1.json
+
+import os
+import sys
+import json
+import time
+import uuid
+import platform
+import resource
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from analysis import PROJECT_TYPES
+from bench_geometry import POLYGON_SIZES, coastline_polygon
+
+ENDPOINTS = ('verify', 'batch-verify', 'reverify')
+PERCENTILES = (50, 90, 95, 99)
+COMPARED_FIELDS = ('throughput_rps', 'latency_ms.p50', 'latency_ms.p99')
+
+
+class FlaskClient:
+    """Sends requests through the Flask test client (one client per thread)"""
+
+    def __init__(self, app, api_key):
+        self.app = app
+        self.headers = {'Authorization': f'Bearer {api_key}'}
+        self._local = threading.local()
+
+    def post(self, path, payload):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        response = self._local.client.post(path, json=payload, headers=self.headers)
+        return response.status_code, response.get_json()
+
+
+class HTTPClient:
+    """Sends requests to a running server (one keep-alive session per thread)"""
+
+    def __init__(self, url, api_key, timeout):
+        import requests  # only needed for --url
+
+        self.requests = requests
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.headers = {'Authorization': f'Bearer {api_key}'}
+        self._local = threading.local()
+
+    def post(self, path, payload):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self.requests.Session()
+        response = self._local.session.post(self.url + path, json=payload, headers=self.headers, timeout=self.timeout)
+        return response.status_code, response.json()
+
+
+def build_projects(count, project_types, polygon_sizes, variants, run_id):
+    """
+    count project payloads cycling through project types and polygon sizes. Every
+    project_id is unique, so the result cache never answers; `variants` distinct
+    outlines per size bound the memory the payloads take.
+    """
+    polygons = {
+        size: [coastline_polygon(POLYGON_SIZES[size], seed=seed) for seed in range(variants)]
+        for size in polygon_sizes
+    }
+    projects = []
+    for i in range(count):
+        size = polygon_sizes[i % len(polygon_sizes)]
+        projects.append({
+            'project_id': f'bench-{run_id}-{i}',
+            'project_type': project_types[i % len(project_types)],
+            'coordinates': polygons[size][(i // len(polygon_sizes)) % variants],
+            'additional_data': {'project_area_hectares': 100}
+        })
+    return projects
+
+
+def build_requests(endpoint, args, run_id):
+    """(path, payload, items) for every request of one endpoint"""
+    if endpoint != 'batch-verify':
+        projects = build_projects(args.requests, args.project_types, args.polygon_sizes, args.polygon_variants,
+                                  f'{run_id}-{endpoint}')
+        return [(f'/api/mrv/{endpoint}', project, 1) for project in projects]
+
+    batches = []
+    for i in range(args.requests):
+        batch_size = args.batch_sizes[i % len(args.batch_sizes)]
+        projects = build_projects(batch_size, args.project_types, args.polygon_sizes, args.polygon_variants,
+                                  f'{run_id}-batch{i}')
+        batches.append(('/api/mrv/batch-verify', {'projects': projects}, batch_size))
+    return batches
+
+
+def run_endpoint(client, endpoint, requests_to_send, concurrency):
+    """Send every request at the given concurrency and summarise latency and throughput"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def send(request):
+        path, payload, _ = request
+        started = time.perf_counter()
+        try:
+            status, body = client.post(path, payload)
+            error = None if status == 200 and body and body.get('success') else f'HTTP {status}'
+        except Exception as e:
+            error = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if error:
+                errors.append(error)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bench') as executor:
+        list(executor.map(send, requests_to_send))
+    duration = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    items = sum(count for _, _, count in requests_to_send)
+    return {
+        'endpoint': endpoint,
+        'requests': len(requests_to_send),
+        'items': items,
+        'errors': len(errors),
+        'error_kinds': sorted(set(errors)),
+        'concurrency': concurrency,
+        'duration_seconds': round(duration, 4),
+        'throughput_rps': round(len(requests_to_send) / duration, 3),
+        'items_per_second': round(items / duration, 3),
+        'latency_ms': {
+            **{f'p{p}': round(float(np.percentile(latencies_ms, p)), 3) for p in PERCENTILES},
+            'mean': round(float(latencies_ms.mean()), 3),
+            'max': round(float(latencies_ms.max()), 3)
+        }
+    }
+
+
+def max_rss_bytes():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def compare(report, baseline_path, max_regression):
+    """Print each endpoint's change against a baseline report; return the regressions beyond max_regression"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {result['endpoint']: result for result in baseline['results']}
+
+    regressions = []
+    print(f"\nAgainst {baseline_path} ({baseline.get('model_version')}):")
+    for result in report['results']:
+        before = previous.get(result['endpoint'])
+        if before is None:
+            continue
+        for field in COMPARED_FIELDS:
+            old, new = lookup(before, field), lookup(result, field)
+            if not old:
+                continue
+            change = (new - old) / old
+            # Throughput regresses when it drops, latency when it grows
+            worse = -change if field == 'throughput_rps' else change
+            flag = '  REGRESSION' if worse > max_regression else ''
+            print(f"  {result['endpoint']:<13} {field:<16} {old:>12.3f} -> {new:>12.3f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((result['endpoint'], field, change))
+    return regressions
+
+
+def lookup(result, dotted):
+    value = result
+    for key in dotted.split('.'):
+        value = value[key]
+    return value
+
+
+def run(args):
+    run_id = uuid.uuid4().hex[:8]
+
+    if args.url:
+        client = HTTPClient(args.url, args.api_key, args.timeout)
+        model_version = args.model_version or os.getenv('MODEL_VERSION', 'unknown')
+        simulated_latency = None  # decided by the server's SIMULATED_LATENCY
+    else:
+        if args.no_sleep:
+            os.environ['SIMULATED_LATENCY'] = 'false'
+        if not args.admission:
+            os.environ['ADMISSION_ENABLED'] = 'false'  # measure the service, not the rate limits
+        os.environ.setdefault('AI_SERVICE_KEY', args.api_key)
+        from app import app, model, MODEL_VERSION, SIMULATED_LATENCY
+
+        model.warm_up()
+        client = FlaskClient(app, os.environ['AI_SERVICE_KEY'])
+        model_version = MODEL_VERSION
+        simulated_latency = SIMULATED_LATENCY
+
+    report = {
+        'model_version': model_version,
+        'target': args.url or 'flask-test-client',
+        'simulated_latency': simulated_latency,
+        'started_at': datetime.now().isoformat(),
+        'python_version': platform.python_version(),
+        'config': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'project_types': args.project_types,
+            'polygon_sizes': args.polygon_sizes,
+            'polygon_variants': args.polygon_variants,
+            'batch_sizes': args.batch_sizes
+        },
+        'results': []
+    }
+
+    for endpoint in args.endpoints:
+        requests_to_send = build_requests(endpoint, args, run_id)
+        result = run_endpoint(client, endpoint, requests_to_send, args.concurrency)
+        report['results'].append(result)
+        latency = result['latency_ms']
+        print(f"{endpoint:<13} {result['requests']:>6} req {result['errors']:>4} err "
+              f"{result['throughput_rps']:>9.2f} req/s {result['items_per_second']:>9.2f} items/s "
+              f"p50 {latency['p50']:>9.2f} ms  p99 {latency['p99']:>9.2f} ms")
+
+    # In-process runs include the service; against --url this is only the load generator
+    report['max_rss_bytes'] = max_rss_bytes()
+    report['max_rss_scope'] = 'client' if args.url else 'service'
+    print(f"max RSS ({report['max_rss_scope']}): {report['max_rss_bytes'] / 2**20:.1f} MiB")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote {args.out}')
+
+    if args.compare:
+        return 1 if compare(report, args.compare, args.max_regression) else 0
+    return 0
+
+
+def csv_list(choices=None, cast=str):
+    def parse(value):
+        items = [cast(item.strip()) for item in value.split(',') if item.strip()]
+        unknown = [item for item in items if choices is not None and item not in choices]
+        if not items or unknown:
+            raise argparse.ArgumentTypeError(f"expected a comma-separated list of {', '.join(choices or ('values',))}")
+        return items
+    return parse
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the MRV verify, batch-verify and reverify endpoints')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process Flask test client')
+    parser.add_argument('--api-key', default=os.getenv('AI_SERVICE_KEY', 'dev-key-12345'))
+    parser.add_argument('--model-version', help='label for --url runs (in-process runs report MODEL_VERSION)')
+    parser.add_argument('--endpoints', type=csv_list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=50, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--project-types', type=csv_list(PROJECT_TYPES), default=list(PROJECT_TYPES))
+    parser.add_argument('--polygon-sizes', type=csv_list(POLYGON_SIZES), default=['small', 'medium'])
+    parser.add_argument('--polygon-variants', type=int, default=8, help='distinct outlines per polygon size')
+    parser.add_argument('--batch-sizes', type=csv_list(cast=int), default=[10, 100])
+    parser.add_argument('--no-sleep', action='store_true', help='turn the simulated model delays off (in-process only)')
+    parser.add_argument('--admission', action='store_true',
+                        help='keep admission control (rate limits, in-flight cap) on for in-process runs')
+    parser.add_argument('--timeout', type=float, default=120, help='per-request timeout for --url, in seconds')
+    parser.add_argument('--out', help='write the JSON report here')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.10,
+                        help='with --compare, exit 1 when throughput drops or latency grows by more than this')
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,195 @@
+# BlueCarbon Ledger - AI Microservice
+# Startup benchmark: import time, time to the first /health answer and first-request latency
+# per MODEL_LOAD mode, each run in a fresh server process:
+#   python bench_startup.py --runs 5 --no-sleep --out startup.json
+#   python bench_startup.py --modes background,lazy --command "gunicorn -c gunicorn.conf.py app:app"
+
+import os
+import sys
+import json
+import time
+import uuid
+import shlex
+import socket
+import platform
+import argparse
+import subprocess
+import statistics
+import urllib.request
+import urllib.error
+from datetime import datetime
+
+from model_backend import MODEL_LOAD_MODES
+from bench_geometry import POLYGON_SIZES, coastline_polygon
+
+# Modules that are heavy to import; the import probe reports which of them `import app` pulled in
+HEAVY_MODULES = ('numpy', 'pandas', 'shapely', 'geopy', 'PIL', 'jsonschema', 'rasterio', 'torch', 'onnxruntime')
+
+IMPORT_PROBE = f'''
+import sys, json, time
+started = time.perf_counter()
+import app
+print(json.dumps({{
+    'import_seconds': time.perf_counter() - started,
+    'heavy_modules': [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+}}))
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(url, payload=None, api_key=None, timeout=30):
+    """(status, seconds) of one request; status is None when nothing answered"""
+    headers = {'Authorization': f'Bearer {api_key}'} if api_key else {}
+    data = None
+    if payload is not None:
+        data = json.dumps(payload).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        status = None
+    return status, time.perf_counter() - started
+
+
+def probe_import(env):
+    """`import app` in a fresh interpreter"""
+    output = subprocess.run([sys.executable, '-c', IMPORT_PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def run_server(command, env, port, api_key, args):
+    """Start one server process and time its first /health answer, readiness and first requests"""
+    base = f'http://127.0.0.1:{port}'
+    process = subprocess.Popen(shlex.split(command), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    started = time.perf_counter()
+    result = {'first_health_seconds': None, 'first_health_status': None, 'healthy_seconds': None}
+    try:
+        deadline = started + args.timeout
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f'Server exited with status {process.returncode}: {command}')
+            status, _ = request(base + '/health', timeout=1)
+            elapsed = time.perf_counter() - started
+            if status is not None and result['first_health_seconds'] is None:
+                result['first_health_seconds'] = elapsed
+                result['first_health_status'] = status
+            if status == 200:
+                result['healthy_seconds'] = elapsed
+                break
+            time.sleep(args.poll_interval)
+        if result['healthy_seconds'] is None:
+            raise RuntimeError(f'/health did not return 200 within {args.timeout}s')
+
+        _, result['first_model_info_seconds'] = request(base + '/api/mrv/model-info')
+        project = {
+            'project_id': f'startup-{uuid.uuid4().hex[:8]}',
+            'project_type': 'mangrove_restoration',
+            'coordinates': coastline_polygon(POLYGON_SIZES['small'], seed=0),
+            'additional_data': {'project_area_hectares': 100}
+        }
+        status, result['first_verify_seconds'] = request(base + '/api/mrv/verify', project, api_key, timeout=args.timeout)
+        if status != 200:
+            raise RuntimeError(f'First verify returned {status}')
+        project['project_id'] = f'startup-{uuid.uuid4().hex[:8]}'
+        _, result['second_verify_seconds'] = request(base + '/api/mrv/verify', project, api_key, timeout=args.timeout)
+        return result
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def summarize(runs):
+    """Median and max of every timing over the runs, in milliseconds"""
+    summary = {}
+    for field in runs[0]:
+        values = [run[field] for run in runs if isinstance(run[field], float)]
+        if values and field.endswith('_seconds'):
+            summary[field.replace('_seconds', '_ms')] = {
+                'median': round(statistics.median(values) * 1000, 2),
+                'max': round(max(values) * 1000, 2)
+            }
+    return summary
+
+
+def run(args):
+    report = {
+        'command': args.command,
+        'started_at': datetime.now().isoformat(),
+        'python_version': platform.python_version(),
+        'runs': args.runs,
+        'results': []
+    }
+
+    for mode in args.modes:
+        env = {
+            **os.environ,
+            'MODEL_LOAD': mode,
+            'AI_SERVICE_KEY': args.api_key,
+            'ADMISSION_ENABLED': 'false',
+            'PYTHONDONTWRITEBYTECODE': '1'
+        }
+        if args.no_sleep:
+            env['SIMULATED_LATENCY'] = 'false'
+
+        imports = [probe_import(env) for _ in range(args.runs)]
+        runs = []
+        for _ in range(args.runs):
+            port = free_port()
+            runs.append(run_server(args.command, {**env, 'PORT': str(port)}, port, args.api_key, args))
+
+        result = {
+            'model_load': mode,
+            'import_ms': {
+                'median': round(statistics.median(probe['import_seconds'] for probe in imports) * 1000, 2),
+                'max': round(max(probe['import_seconds'] for probe in imports) * 1000, 2)
+            },
+            'heavy_modules_at_import': imports[0]['heavy_modules'],
+            **summarize(runs),
+            'first_health_status': [run['first_health_status'] for run in runs]
+        }
+        report['results'].append(result)
+        print(f"{mode:<10} import {result['import_ms']['median']:>8.1f} ms  "
+              f"first /health {result['first_health_ms']['median']:>8.1f} ms  "
+              f"healthy {result['healthy_ms']['median']:>8.1f} ms  "
+              f"first verify {result['first_verify_ms']['median']:>8.1f} ms  "
+              f"(then {result['second_verify_ms']['median']:.1f} ms)")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote {args.out}')
+    return 0
+
+
+def csv_modes(value):
+    modes = [mode.strip() for mode in value.split(',') if mode.strip()]
+    if not modes or any(mode not in MODEL_LOAD_MODES for mode in modes):
+        raise argparse.ArgumentTypeError(f"expected a comma-separated list of {', '.join(MODEL_LOAD_MODES)}")
+    return modes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark service startup per MODEL_LOAD mode')
+    parser.add_argument('--command', default=f'{sys.executable} app.py',
+                        help='server command; it must listen on $PORT')
+    parser.add_argument('--modes', type=csv_modes, default=list(MODEL_LOAD_MODES))
+    parser.add_argument('--runs', type=int, default=3, help='fresh processes per mode')
+    parser.add_argument('--api-key', default=os.getenv('AI_SERVICE_KEY', 'dev-key-12345'))
+    parser.add_argument('--no-sleep', action='store_true', help='turn the simulated model delays off')
+    parser.add_argument('--poll-interval', type=float, default=0.005, help='seconds between /health polls')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for the server, and per request')
+    parser.add_argument('--out', help='write the JSON report here')
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,252 @@
+# BlueCarbon Ledger - AI Microservice
+# Content-addressed result cache (memory LRU + optional SQLite tier) with single-flight
+
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from analysis import canonical_digest
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 10000))
+RESULT_CACHE_DB_PATH = os.getenv('RESULT_CACHE_DB_PATH', '')  # empty disables the on-disk tier
+RESULT_CACHE_DISK_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_DISK_MAX_ENTRIES', 100000))
+RESULT_CACHE_TTLS = {
+    'verify': int(os.getenv('RESULT_CACHE_TTL_VERIFY', 3600)),
+    'reverify': int(os.getenv('RESULT_CACHE_TTL_REVERIFY', 900)),
+    'batch-verify': int(os.getenv('RESULT_CACHE_TTL_BATCH', 3600))
+}
+
+# Queue-only request fields that do not change the analysis result
+CACHE_IGNORED_FIELDS = ('priority', 'max_retries')
+
+
+def completed_future(fn, *args):
+    """Run fn(*args) on the calling thread and wrap the outcome in a finished Future"""
+    future = Future()
+    future.set_running_or_notify_cancel()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+class ResultCache:
+    """
+    Caches successful results keyed on a canonical hash of (endpoint, request body,
+    MODEL_VERSION). Identical requests that arrive while one is still computing all
+    wait on that computation's future instead of starting their own.
+    """
+
+    def __init__(self, model_version, max_entries=RESULT_CACHE_MAX_ENTRIES, ttls=None,
+                 db_path=RESULT_CACHE_DB_PATH, enabled=RESULT_CACHE_ENABLED):
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.ttls = ttls or dict(RESULT_CACHE_TTLS)
+        self.db_path = db_path
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+        self._counters = {
+            'hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0,
+            'evictions': 0, 'expirations': 0, 'stores': 0, 'errors': 0
+        }
+
+    def key_for(self, endpoint, body):
+        if isinstance(body, dict):
+            body = {field: value for field, value in body.items() if field not in CACHE_IGNORED_FIELDS}
+        return canonical_digest({'endpoint': endpoint, 'model_version': self.model_version, 'body': body})
+
+    def get_or_submit(self, endpoint, body, submit):
+        """
+        Return (future, status) for this request. status is HIT, COALESCED or MISS;
+        on a miss submit() is called once and must return a Future for the result.
+        """
+        if not self.enabled:
+            return submit(), 'MISS'
+
+        key = self.key_for(endpoint, body)
+
+        with self._lock:
+            value = self._memory_get(key)
+            if value is not None:
+                self._counters['hits'] += 1
+                return self._resolved(value), 'HIT'
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self._counters['coalesced'] += 1
+                return inflight, 'COALESCED'
+
+            placeholder = Future()
+            placeholder.set_running_or_notify_cancel()
+            self._inflight[key] = placeholder
+
+        value, expires_at = self._disk_get(key)
+        if value is not None:
+            with self._lock:
+                self._counters['hits'] += 1
+                self._counters['disk_hits'] += 1
+                self._memory_put(key, value, expires_at)
+                self._inflight.pop(key, None)
+            placeholder.set_result(value)
+            return placeholder, 'HIT'
+
+        with self._lock:
+            self._counters['misses'] += 1
+
+        try:
+            inner = submit()
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            placeholder.set_exception(e)
+            raise
+
+        inner.add_done_callback(lambda f: self._complete(key, endpoint, placeholder, f))
+        return placeholder, 'MISS'
+
+    def _complete(self, key, endpoint, placeholder, inner):
+        error = inner.exception()
+        if error is None:
+            value = inner.result()
+            expires_at = time.time() + self.ttls.get(endpoint, 0)
+            with self._lock:
+                self._memory_put(key, value, expires_at)
+                self._counters['stores'] += 1
+                self._inflight.pop(key, None)
+            self._disk_put(key, endpoint, value, expires_at)
+            placeholder.set_result(value)
+        else:
+            # Failures are never cached; the next identical request recomputes
+            with self._lock:
+                self._inflight.pop(key, None)
+            placeholder.set_exception(error)
+
+    @staticmethod
+    def _resolved(value):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        future.set_result(value)
+        return future
+
+    def _memory_get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self._counters['expirations'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _memory_put(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _connection(self):
+        """Open the SQLite tier lazily, once per process (connections must not cross a fork)"""
+        if self._db is None or self._db_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS result_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    endpoint TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS idx_result_cache_expires ON result_cache(expires_at)')
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _disk_get(self, key):
+        """Return (value, expires_at) from the SQLite tier, or (None, None)"""
+        if not self.db_path:
+            return None, None
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    'SELECT value, expires_at FROM result_cache WHERE cache_key = ? AND expires_at > ?',
+                    (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            self._counters['errors'] += 1
+            logger.warning(f"Result cache disk read failed: {str(e)}")
+            return None, None
+
+        if row is None:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def _disk_put(self, key, endpoint, value, expires_at):
+        if not self.db_path:
+            return
+        try:
+            with self._db_lock:
+                db = self._connection()
+                now = time.time()
+                db.execute(
+                    'INSERT OR REPLACE INTO result_cache (cache_key, endpoint, value, expires_at, created_at) VALUES (?, ?, ?, ?, ?)',
+                    (key, endpoint, json.dumps(value), expires_at, now)
+                )
+                if self._counters['stores'] % 1000 == 0:
+                    self._prune_disk(db, now)
+                db.commit()
+        except sqlite3.Error as e:
+            self._counters['errors'] += 1
+            logger.warning(f"Result cache disk write failed: {str(e)}")
+
+    def _prune_disk(self, db, now):
+        db.execute('DELETE FROM result_cache WHERE expires_at <= ?', (now,))
+        db.execute('''
+            DELETE FROM result_cache WHERE cache_key IN (
+                SELECT cache_key FROM result_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (RESULT_CACHE_DISK_MAX_ENTRIES,))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            with self._db_lock:
+                self._connection().execute('DELETE FROM result_cache')
+                self._connection().commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses'] + self._counters['coalesced']
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'inflight': len(self._inflight),
+                'disk_tier': bool(self.db_path),
+                'ttl_seconds': dict(self.ttls),
+                'hit_ratio': round(self._counters['hits'] / lookups, 4) if lookups else 0,
+                **self._counters
+            }
@@ -0,0 +1,383 @@
+# BlueCarbon Ledger - AI Microservice
+# Per-project NDVI/area time series (array-backed ring buffers) and the vectorized
+# change-detection engine behind re-verification flags and registry-wide scans
+
+import os
+import time
+import sqlite3
+import threading
+import logging
+
+import numpy as np
+
+from analysis import COMPLIANCE_FLAGS, compliance_flag_codes
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+CHANGE_SERIES_DB_PATH = os.getenv('CHANGE_SERIES_DB_PATH', '')  # shared by workers/nodes; empty = this process only
+CHANGE_HISTORY_LENGTH = int(os.getenv('CHANGE_HISTORY_LENGTH', 24))  # acquisitions kept per project
+CHANGE_MIN_OBSERVATIONS = int(os.getenv('CHANGE_MIN_OBSERVATIONS', 4))  # fewer: reverify compares with the baseline
+CHANGE_SEASONAL_MIN_OBSERVATIONS = int(os.getenv('CHANGE_SEASONAL_MIN_OBSERVATIONS', 8))  # fit the annual cycle
+CHANGE_SEASONAL_MIN_YEARS = float(os.getenv('CHANGE_SEASONAL_MIN_YEARS', 1.5))  # ... over at least this span
+CHANGE_ROLLING_WINDOW = int(os.getenv('CHANGE_ROLLING_WINDOW', 3))  # acquisitions averaged for the current level
+CHANGE_BREAK_MIN_SEGMENT = int(os.getenv('CHANGE_BREAK_MIN_SEGMENT', 2))  # acquisitions each side of a breakpoint
+CHANGE_BREAK_MIN_T = float(os.getenv('CHANGE_BREAK_MIN_T', 3))  # t-statistic a level shift needs to count
+
+DAYS_PER_YEAR = 365.25
+SERIES_FIELDS = ('ndvi', 'area_hectares')
+INITIAL_CAPACITY = 1024
+NOISE_FLOOR = 1e-3  # smallest residual spread assumed, so flat segments do not make every shift significant
+_RIDGE = 1e-9
+_NO_BREAK = -1
+
+
+def day_dates(days):
+    """ISO dates of an array of day numbers"""
+    return np.asarray(days, dtype=np.int64).astype('datetime64[D]').astype(str)
+
+
+def detect_changes(days, values, min_observations=CHANGE_MIN_OBSERVATIONS,
+                   seasonal_min_observations=CHANGE_SEASONAL_MIN_OBSERVATIONS,
+                   seasonal_min_years=CHANGE_SEASONAL_MIN_YEARS, rolling_window=CHANGE_ROLLING_WINDOW, break_min_segment=CHANGE_BREAK_MIN_SEGMENT,
+                   break_min_t=CHANGE_BREAK_MIN_T):
+    """
+    Change statistics for P projects at once. days is (P, H) acquisition day numbers and
+    values (P, H, 2) NDVI and area, oldest to newest, NaN where a slot is empty.
+
+    Each series is fitted by least squares with a level, a linear trend and, once it
+    has seasonal_min_observations acquisitions spanning seasonal_min_years, an annual
+    harmonic; the change over the window is the trend alone, so a dry-season dip is not
+    read as loss. Over less than a year or so the cos/sin terms can fit any shape and
+    would absorb a real step drop, hence the span requirement. The current
+    level is a rolling mean of the deseasonalized values, and the strongest level shift
+    (cumulative sums over every split point) is a breakpoint when its t-statistic
+    reaches break_min_t. Only losses count as degradation: the flag is the largest of
+    the NDVI trend decline, the area trend decline and a breakpoint drop, on the
+    COMPLIANCE_FLAGS cutoffs. Rows with fewer than min_observations get code -1.
+    Returns a dict of arrays.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values[:, :, 0])
+    weights = valid.astype(np.float64)
+    count = valid.sum(axis=1)
+    has_data = count > 0
+
+    newest = np.where(valid, days, np.iinfo(np.int32).min).max(axis=1)
+    oldest = np.where(valid, days, np.iinfo(np.int32).max).min(axis=1)
+    newest = np.where(has_data, newest, 0)
+    oldest = np.where(has_data, oldest, 0)
+    span_years = (newest - oldest) / DAYS_PER_YEAR
+
+    # Design matrix: level, years before the newest acquisition, annual cos/sin (P, H, 4)
+    years = np.where(valid, (days - newest[:, None]) / DAYS_PER_YEAR, 0.0)
+    phase = 2 * np.pi * np.where(valid, days, 0) / DAYS_PER_YEAR
+    seasonal = (count >= seasonal_min_observations) & (span_years >= seasonal_min_years)
+    seasonal_weights = weights * seasonal[:, None]
+    design = np.stack([weights, years * weights, np.cos(phase) * seasonal_weights,
+                       np.sin(phase) * seasonal_weights], axis=2)
+    observed = np.where(valid[:, :, None], values, 0.0)
+
+    # Batched normal equations; terms without data (slope of one point, harmonics of a short series) are pinned to 0
+    gram = np.einsum('phi,phj->pij', design, design)
+    unused = np.einsum('pii->pi', gram) <= _RIDGE
+    gram += np.eye(4) * (unused[:, :, None] + _RIDGE)
+    coefficients = np.linalg.solve(gram, np.einsum('phi,phk->pik', design, observed))  # (P, 4, 2)
+
+    level_now = coefficients[:, 0, :]
+    slope = coefficients[:, 1, :]
+    level_start = level_now - slope * span_years[:, None]
+    safe_start = np.where(np.abs(level_start) > _RIDGE, level_start, np.nan)
+    change_percent = np.nan_to_num((level_now - level_start) / safe_start * 100)
+
+    # Deseasonalized NDVI, then its rolling mean and the best single level shift
+    seasonal_fit = np.cos(phase) * coefficients[:, 2, None, 0] + np.sin(phase) * coefficients[:, 3, None, 0]
+    adjusted = np.where(valid, observed[:, :, 0] - seasonal_fit * seasonal[:, None], 0.0)
+
+    window = max(1, min(rolling_window, days.shape[1]))
+    sums = np.concatenate([np.zeros((len(days), 1)), np.cumsum(adjusted, axis=1)], axis=1)
+    counts = np.concatenate([np.zeros((len(days), 1)), np.cumsum(weights, axis=1)], axis=1)
+    rolling_counts = counts[:, window:] - counts[:, :-window]
+    rolling = (sums[:, window:] - sums[:, :-window]) / np.maximum(rolling_counts, 1)
+    smoothed_ndvi = np.where(has_data, rolling[:, -1], np.nan)
+
+    squares = np.cumsum(adjusted ** 2, axis=1)
+    before_n = counts[:, 1:-1]  # acquisitions up to and including each split position
+    after_n = count[:, None] - before_n
+    splittable = (before_n >= break_min_segment) & (after_n >= break_min_segment)
+    before_n = np.maximum(before_n, 1)
+    after_n = np.maximum(after_n, 1)
+    before_mean = sums[:, 1:-1] / before_n
+    after_mean = (sums[:, -1:] - sums[:, 1:-1]) / after_n
+    before_var = np.maximum(squares[:, :-1] / before_n - before_mean ** 2, 0)
+    after_var = np.maximum((squares[:, -1:] - squares[:, :-1]) / after_n - after_mean ** 2, 0)
+    pooled_sd = np.maximum(np.sqrt((before_n * before_var + after_n * after_var) /
+                                   np.maximum(count[:, None] - 2, 1)), NOISE_FLOOR)
+    shift = after_mean - before_mean
+    t_stat = np.where(splittable, np.abs(shift) / (pooled_sd * np.sqrt(1 / before_n + 1 / after_n)), 0.0)
+
+    rows = np.arange(len(days))
+    best = t_stat.argmax(axis=1) if t_stat.shape[1] else np.zeros(len(days), dtype=np.int64)
+    best_t = t_stat[rows, best] if t_stat.shape[1] else np.zeros(len(days))
+    has_break = best_t >= break_min_t
+    break_percent = np.where(
+        has_break, shift[rows, best] / np.where(before_mean[rows, best] > 0, before_mean[rows, best], np.nan) * 100, 0.0
+    ) if t_stat.shape[1] else np.zeros(len(days))
+    break_percent = np.nan_to_num(break_percent)
+    break_day = np.where(has_break, days[rows, np.minimum(best + 1, days.shape[1] - 1)], _NO_BREAK)
+
+    degradation_percent = np.maximum.reduce([
+        np.zeros(len(days)), -change_percent[:, 0], -change_percent[:, 1], -break_percent
+    ])
+    sufficient = count >= min_observations
+
+    return {
+        'observations': count,
+        'first_day': oldest,
+        'last_day': newest,
+        'seasonal': seasonal,
+        'ndvi_level': level_now[:, 0],
+        'smoothed_ndvi': smoothed_ndvi,
+        'ndvi_trend_per_year': slope[:, 0],
+        'seasonal_amplitude': np.hypot(coefficients[:, 2, 0], coefficients[:, 3, 0]),
+        'ndvi_change_percent': change_percent[:, 0],
+        'area_change_percent': change_percent[:, 1],
+        'break_day': break_day,
+        'break_t_stat': best_t,
+        'break_change_percent': break_percent,
+        'degradation_percent': degradation_percent,
+        'compliance_codes': np.where(sufficient, compliance_flag_codes(degradation_percent), -1)
+    }
+
+
+def change_columns(project_ids, result):
+    """Columnar (JSON-ready) form of detect_changes output, one list per field"""
+    codes = result['compliance_codes'].tolist()
+    break_days = result['break_day']
+    return {
+        'project_id': list(project_ids),
+        'compliance_flag': [COMPLIANCE_FLAGS[code] if code >= 0 else None for code in codes],
+        'observations': result['observations'].tolist(),
+        'first_date': day_dates(result['first_day']).tolist(),
+        'last_date': day_dates(result['last_day']).tolist(),
+        'ndvi_level': np.round(result['ndvi_level'], 4).tolist(),
+        'smoothed_ndvi': np.round(np.nan_to_num(result['smoothed_ndvi']), 4).tolist(),
+        'ndvi_trend_per_year': np.round(result['ndvi_trend_per_year'], 4).tolist(),
+        'seasonal_amplitude': np.round(result['seasonal_amplitude'], 4).tolist(),
+        'ndvi_change_percent': np.round(result['ndvi_change_percent'], 2).tolist(),
+        'area_change_percent': np.round(result['area_change_percent'], 2).tolist(),
+        'breakpoint_date': [None if day == _NO_BREAK else date
+                            for day, date in zip(break_days.tolist(), day_dates(np.maximum(break_days, 0)).tolist())],
+        'breakpoint_change_percent': np.round(result['break_change_percent'], 2).tolist(),
+        'degradation_percent': np.round(result['degradation_percent'], 2).tolist()
+    }
+
+
+class NDVISeriesStore:
+    """
+    The last `history` acquisitions of every project, as fixed-width ring buffers in
+    (projects x history) arrays so a registry scan is one detect_changes call. With
+    CHANGE_SERIES_DB_PATH the acquisitions are also written to SQLite (one row per
+    project and date) and every process folds in rows added since its last read, so
+    gunicorn workers and nodes see the same history.
+    """
+
+    def __init__(self, history=CHANGE_HISTORY_LENGTH, db_path=CHANGE_SERIES_DB_PATH):
+        self.history = history
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._rows = {}  # project_id -> row
+        self._project_ids = []
+        self._days = np.zeros((INITIAL_CAPACITY, history), dtype=np.int32)
+        self._values = np.full((INITIAL_CAPACITY, history, len(SERIES_FIELDS)), np.nan, dtype=np.float32)
+        self._head = np.zeros(INITIAL_CAPACITY, dtype=np.int32)  # next slot to write
+        self._count = np.zeros(INITIAL_CAPACITY, dtype=np.int32)
+        self._db = None
+        self._db_pid = None
+        self._synced_rowid = 0
+        self._counters = {'observations': 0, 'scans': 0, 'projects_scanned': 0, 'errors': 0}
+
+    @property
+    def persistent(self):
+        return bool(self.db_path)
+
+    def _connection(self):
+        """Open the database lazily, once per process (connections must not cross a fork)"""
+        if self._db is None or self._db_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS ndvi_observations (
+                    project_id TEXT NOT NULL,
+                    acquired_day INTEGER NOT NULL,
+                    ndvi REAL NOT NULL,
+                    area_hectares REAL,
+                    recorded_at REAL NOT NULL,
+                    PRIMARY KEY (project_id, acquired_day)
+                )
+            ''')
+            self._db_pid = os.getpid()
+        return self._db
+
+    # ---- ring buffers (callers hold _lock) ----------------------------------
+
+    def _row(self, project_id):
+        row = self._rows.get(project_id)
+        if row is not None:
+            return row
+        row = len(self._project_ids)
+        if row == len(self._head):
+            self._grow()
+        self._rows[project_id] = row
+        self._project_ids.append(project_id)
+        return row
+
+    def _grow(self):
+        capacity = len(self._head) * 2
+        days = np.zeros((capacity, self.history), dtype=np.int32)
+        values = np.full((capacity, self.history, len(SERIES_FIELDS)), np.nan, dtype=np.float32)
+        days[:len(self._days)] = self._days
+        values[:len(self._values)] = self._values
+        self._days, self._values = days, values
+        self._head = np.concatenate([self._head, np.zeros(capacity - len(self._head), dtype=np.int32)])
+        self._count = np.concatenate([self._count, np.zeros(capacity - len(self._count), dtype=np.int32)])
+
+    def _insert_block(self, project_id, days, values):
+        """Add one project's acquisitions (days ascending, values (k, 2)) to its ring buffer"""
+        row = self._row(project_id)
+        head, count = self._head[row], self._count[row]
+        ascending = len(days) < 2 or bool(np.all(np.diff(days) > 0))
+        if ascending and (count == 0 or days[0] > self._days[row, (head - 1) % self.history]):
+            days, values = days[-self.history:], values[-self.history:]
+            slots = (head + np.arange(len(days))) % self.history
+            self._days[row, slots] = days
+            self._values[row, slots] = values
+            self._head[row] = (head + len(days)) % self.history
+            self._count[row] = min(count + len(days), self.history)
+            return
+
+        # Dates already held or backfilled older ones: rebuild the row in date order (new values win)
+        slots = (head + np.arange(self.history)) % self.history
+        held = {int(self._days[row, slot]): self._values[row, slot].copy()
+                for slot in slots if not np.isnan(self._values[row, slot, 0])}
+        held.update(zip(days.tolist(), values))
+        kept = sorted(held.items())[-self.history:]
+        self._days[row] = 0
+        self._values[row] = np.nan
+        self._days[row, :len(kept)] = [day for day, _ in kept]
+        self._values[row, :len(kept)] = [kept_values for _, kept_values in kept]
+        self._head[row] = len(kept) % self.history
+        self._count[row] = len(kept)
+
+    def _insert_all(self, project_ids, days, values):
+        """Add acquisitions grouped into runs of the same project (one block write per run)"""
+        if not len(days):
+            return
+        starts = np.flatnonzero(np.concatenate([[True], project_ids[1:] != project_ids[:-1]]))
+        ends = np.append(starts[1:], len(days))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            self._insert_block(project_ids[start], days[start:end], values[start:end])
+
+    def _window(self, rows):
+        """(days, values) of rows, oldest to newest"""
+        slots = (self._head[rows, None] + np.arange(self.history)) % self.history
+        return (np.take_along_axis(self._days[rows], slots, axis=1),
+                np.take_along_axis(self._values[rows], slots[:, :, None], axis=1))
+
+    def _sync(self):
+        """Fold in rows other processes wrote since the last read"""
+        rows = self._connection().execute(
+            'SELECT rowid, project_id, acquired_day, ndvi, area_hectares FROM ndvi_observations '
+            'WHERE rowid > ? ORDER BY rowid', (self._synced_rowid,)
+        ).fetchall()
+        if not rows:
+            return
+        _, project_ids, days, ndvi, areas = zip(*rows)
+        values = np.column_stack([np.array(ndvi, dtype=np.float64),
+                                  np.array([np.nan if area is None else area for area in areas], dtype=np.float64)])
+        self._insert_all(np.array(project_ids, dtype=object), np.array(days, dtype=np.int64), values)
+        self._synced_rowid = rows[-1][0]
+
+    # ---- public API ---------------------------------------------------------
+
+    def record_many(self, project_ids, acquired, ndvi, area_hectares=None):
+        """Add acquisitions (parallel sequences; area_hectares optional); raises ValueError on bad dates"""
+        project_ids = np.asarray(project_ids, dtype=object)
+        days = np.asarray(acquired, dtype='datetime64[D]').astype(np.int64)
+        values = np.column_stack([
+            np.asarray(ndvi, dtype=np.float64),
+            np.full(len(days), np.nan) if area_hectares is None else
+            np.array([np.nan if area is None else area for area in area_hectares], dtype=np.float64)
+        ])
+        if not (len(project_ids) == len(days) == len(values)):
+            raise ValueError('project_id, acquired, ndvi and area_hectares must have the same length')
+        order = np.lexsort((days, project_ids.astype(str)))
+        project_ids, days, values = project_ids[order], days[order], values[order]
+
+        with self._lock:
+            if self.persistent:
+                try:
+                    db = self._connection()
+                    now = time.time()
+                    db.executemany(
+                        'INSERT OR REPLACE INTO ndvi_observations (project_id, acquired_day, ndvi, area_hectares, recorded_at) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        zip(project_ids.tolist(), days.tolist(), values[:, 0].tolist(),
+                            [None if np.isnan(area) else area for area in values[:, 1].tolist()], [now] * len(days))
+                    )
+                    db.commit()
+                    self._sync()
+                except sqlite3.Error as e:
+                    self._counters['errors'] += 1
+                    logger.warning(f"NDVI series write failed: {str(e)}")
+                    self._insert_all(project_ids, days, values)
+            else:
+                self._insert_all(project_ids, days, values)
+            self._counters['observations'] += len(days)
+        return len(days)
+
+    def record(self, project_id, acquired, ndvi, area_hectares=None):
+        self.record_many([project_id], [acquired], [ndvi], None if area_hectares is None else [area_hectares])
+
+    def scan(self, project_ids=None):
+        """detect_changes over the given projects (default: all); returns (project_ids, result)"""
+        with self._lock:
+            if self.persistent:
+                try:
+                    self._sync()
+                except sqlite3.Error as e:
+                    self._counters['errors'] += 1
+                    logger.warning(f"NDVI series read failed: {str(e)}")
+            if project_ids is None:
+                project_ids = list(self._project_ids)
+            else:
+                project_ids = [project_id for project_id in project_ids if project_id in self._rows]
+            rows = np.array([self._rows[project_id] for project_id in project_ids], dtype=np.int64)
+            days, values = self._window(rows)
+            self._counters['scans'] += 1
+            self._counters['projects_scanned'] += len(rows)
+        return project_ids, detect_changes(days, values)
+
+    def assess(self, project_id):
+        """One project's change statistics as a dict, or None when it has no acquisitions"""
+        project_ids, result = self.scan([project_id])
+        if not project_ids:
+            return None
+        columns = change_columns(project_ids, result)
+        return {field: values[0] for field, values in columns.items() if field != 'project_id'}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'persistent': self.persistent,
+                'projects': len(self._project_ids),
+                'history_length': self.history,
+                'acquisitions_held': int(self._count[:len(self._project_ids)].sum()),
+                **self._counters
+            }
+
+
+ndvi_series = NDVISeriesStore()
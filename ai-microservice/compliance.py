@@ -0,0 +1,265 @@
+# BlueCarbon Ledger - AI Microservice
+# Compliance thresholds per project type (hot-reloadable) and vectorized bulk evaluation:
+# compliance_score, compliance_status, risk_level and breached metrics for many records at once
+
+import os
+import json
+import threading
+import logging
+
+import numpy as np
+
+from analysis import PROJECT_TYPES, COMPLIANCE_FLAGS, encode_project_types, compliance_flag_codes
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+COMPLIANCE_THRESHOLDS_PATH = os.getenv('COMPLIANCE_THRESHOLDS_PATH', '')  # JSON overrides; re-read when it changes
+COMPLIANCE_MAX_RECORDS = int(os.getenv('COMPLIANCE_MAX_RECORDS', 100000))  # records per evaluate call
+
+# Same columns and seed rows as compliance_thresholds in backend/database/compliance-schema.sql
+THRESHOLD_FIELDS = (
+    'ndvi_warning_drop_percent', 'ndvi_critical_drop_percent',
+    'co2_warning_drop_percent', 'co2_critical_drop_percent',
+    'area_warning_reduction_percent', 'area_critical_reduction_percent',
+    'ai_confidence_minimum', 'ai_confidence_warning',
+    'default_inspection_days', 'high_risk_inspection_days',
+    'auto_freeze_on_critical', 'auto_alert_government'
+)
+DEFAULT_THRESHOLDS = {
+    'ndvi_warning_drop_percent': 10.0, 'ndvi_critical_drop_percent': 20.0,
+    'co2_warning_drop_percent': 15.0, 'co2_critical_drop_percent': 30.0,
+    'area_warning_reduction_percent': 5.0, 'area_critical_reduction_percent': 15.0,
+    'ai_confidence_minimum': 0.70, 'ai_confidence_warning': 0.60,
+    'default_inspection_days': 90, 'high_risk_inspection_days': 30,
+    'auto_freeze_on_critical': False, 'auto_alert_government': True
+}
+PROJECT_TYPE_THRESHOLDS = {
+    'mangrove_restoration': (10.0, 20.0, 15.0, 30.0, 5.0, 15.0),
+    'seagrass_conservation': (15.0, 25.0, 20.0, 35.0, 8.0, 20.0),
+    'salt_marsh_restoration': (12.0, 22.0, 18.0, 32.0, 6.0, 18.0),
+    'coastal_wetland_protection': (8.0, 18.0, 12.0, 25.0, 4.0, 12.0),
+    'blue_carbon_afforestation': (10.0, 20.0, 15.0, 30.0, 5.0, 15.0)
+}
+# calculate_compliance_score: drops weigh 40/30/20%, AI confidence scales the last 10%
+DEFAULT_WEIGHTS = {'ndvi': 0.4, 'co2': 0.3, 'area': 0.2, 'ai_confidence': 0.1}
+
+METRICS = ('ndvi', 'co2', 'area')
+CHANGE_COLUMNS = ('ndvi_change_percent', 'co2_change_percent', 'area_change_percent')
+COMPLIANCE_STATUSES = ('Compliant', 'Review Needed', 'Non-Compliant')
+RISK_LEVELS = ('Low', 'Medium', 'High', 'Critical')
+BREACHES = ('ndvi', 'co2', 'area', 'ai_confidence')  # bit i of breach_mask
+
+
+class ThresholdTable:
+    """Thresholds as arrays indexed by project type code (the last row is for unknown types)"""
+
+    def __init__(self, rows, weights, version):
+        self.rows = rows
+        self.weights = weights
+        self.version = version
+        order = list(PROJECT_TYPES) + [None]
+        self.arrays = {
+            field: np.array([rows.get(project_type, rows[None])[field] for project_type in order],
+                            dtype=np.bool_ if field.startswith('auto_') else np.float64)
+            for field in THRESHOLD_FIELDS
+        }
+        # (types, metric, level) drop limits: level 0 = warning, 1 = critical
+        self.drop_limits = np.stack([
+            np.stack([self.arrays[f'{metric}_warning_{kind}_percent'], self.arrays[f'{metric}_critical_{kind}_percent']], axis=1)
+            for metric, kind in (('ndvi', 'drop'), ('co2', 'drop'), ('area', 'reduction'))
+        ], axis=1)
+
+    @classmethod
+    def from_config(cls, config=None, version='built-in'):
+        """
+        Built-in rows overlaid with config: {"default": {...}, "project_types": {type: {...}},
+        "weights": {...}}; any field left out keeps its built-in value
+        """
+        config = config or {}
+        default = {**DEFAULT_THRESHOLDS, **config.get('default', {})}
+        rows = {None: default}
+        for project_type in set(PROJECT_TYPE_THRESHOLDS) | set(config.get('project_types', {})):
+            built_in = dict(zip(THRESHOLD_FIELDS, PROJECT_TYPE_THRESHOLDS.get(project_type, ())))
+            rows[project_type] = {**default, **built_in, **config.get('project_types', {}).get(project_type, {})}
+
+        unknown = [field for row in rows.values() for field in row if field not in THRESHOLD_FIELDS]
+        if unknown:
+            raise ValueError(f'Unknown threshold field: {unknown[0]}')
+        unknown_weights = [name for name in config.get('weights', {}) if name not in DEFAULT_WEIGHTS]
+        if unknown_weights:
+            raise ValueError(f'Unknown weight: {unknown_weights[0]}')
+        unsupported = [project_type for project_type in rows if project_type is not None and project_type not in PROJECT_TYPES]
+        if unsupported:
+            raise ValueError(f'Unknown project type: {unsupported[0]}')
+        return cls(rows, {**DEFAULT_WEIGHTS, **config.get('weights', {})}, version)
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'weights': self.weights,
+            'default': self.rows[None],
+            'project_types': {project_type: row for project_type, row in self.rows.items() if project_type is not None}
+        }
+
+
+class ComplianceThresholds:
+    """The current ThresholdTable; re-read from COMPLIANCE_THRESHOLDS_PATH when the file changes"""
+
+    def __init__(self, path=COMPLIANCE_THRESHOLDS_PATH):
+        self.path = path
+        self._table = ThresholdTable.from_config()
+        self._loaded_mtime = None
+        self._lock = threading.Lock()
+        self._counters = {'reloads': 0, 'reload_errors': 0, 'evaluations': 0, 'records_evaluated': 0}
+
+    def current(self):
+        if not self.path:
+            return self._table
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return self._table  # keep the last good table while the file is missing
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    self._loaded_mtime = mtime
+                    self._reload(mtime)
+        return self._table
+
+    def _reload(self, mtime):
+        try:
+            with open(self.path) as f:
+                self._table = ThresholdTable.from_config(json.load(f), version=f'{os.path.basename(self.path)}@{int(mtime)}')
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            self._counters['reload_errors'] += 1
+            logger.error(f"Keeping compliance thresholds {self._table.version}: {self.path} is invalid: {str(e)}")
+            return
+        self._counters['reloads'] += 1
+        logger.info(f"Loaded compliance thresholds {self._table.version}")
+
+    def evaluate(self, columns):
+        """evaluate_compliance with the current table; returns (result, table)"""
+        table = self.current()
+        result = evaluate_compliance(columns, table)
+        self._counters['evaluations'] += 1
+        self._counters['records_evaluated'] += len(result['compliance_score'])
+        return result, table
+
+    def stats(self):
+        return {'path': self.path or None, 'version': self._table.version, **self._counters}
+
+
+def record_columns(records):
+    """Columns evaluate_compliance takes, from a list of record dicts or a dict of lists"""
+    if isinstance(records, dict):
+        get = records.get
+        count = len(records.get('project_type') or records.get('project_id') or [])
+        # null entries take the default, as a missing or null field does in a record
+        column = lambda field, default: ([default if value is None else value for value in get(field)]
+                                         if get(field) is not None else [default] * count)
+    else:
+        count = len(records)
+        column = lambda field, default: [default if record.get(field) is None else record.get(field) for record in records]
+
+    columns = {
+        'project_id': column('project_id', None),
+        'type_codes': encode_project_types(column('project_type', None)),
+        'ai_confidence_score': np.array(column('ai_confidence_score', 1.0), dtype=np.float64)
+    }
+    for field in CHANGE_COLUMNS:
+        columns[field] = np.array(column(field, 0.0), dtype=np.float64)
+    if any(len(values) != count for values in columns.values()):
+        raise ValueError('All columns must have the same length')
+    if any(np.isnan(columns[field]).any() for field in (*CHANGE_COLUMNS, 'ai_confidence_score')):
+        raise ValueError('Change percentages and ai_confidence_score must be numbers')
+    return columns
+
+
+def evaluate_compliance(columns, table):
+    """
+    Score and classify N records in one pass with per-project-type thresholds.
+    compliance_score follows calculate_compliance_score. A drop at or past a critical
+    threshold makes a record Non-Compliant (risk Critical); past a warning threshold,
+    or below ai_confidence_minimum, Review Needed (risk High, or Medium for low
+    confidence alone, High below ai_confidence_warning). compliance_flag is the AI
+    service's flag for the same changes (largest absolute change on the 5/15/25% cutoffs).
+    """
+    codes = columns['type_codes']
+    changes = np.stack([columns[field] for field in CHANGE_COLUMNS], axis=1)  # (N, 3)
+    drops = np.maximum(0.0, -changes)
+    confidence = columns['ai_confidence_score']
+    weights = table.weights
+
+    score = 1.0 - drops @ np.array([weights[metric] for metric in METRICS]) / 100.0
+    score = score * ((1 - weights['ai_confidence']) + confidence * weights['ai_confidence'])
+    score = np.clip(score, 0.0, 1.0)
+
+    limits = table.drop_limits[codes]  # (N, 3, 2)
+    warning = drops >= limits[:, :, 0]
+    critical = drops >= limits[:, :, 1]
+    below_minimum = confidence < table.arrays['ai_confidence_minimum'][codes]
+    below_warning = confidence < table.arrays['ai_confidence_warning'][codes]
+
+    any_critical = critical.any(axis=1)
+    any_warning = warning.any(axis=1)
+    status = np.where(any_critical, 2, np.where(any_warning | below_minimum, 1, 0))
+    risk = np.maximum.reduce([
+        np.where(any_critical, 3, np.where(any_warning, 2, 0)),
+        np.where(below_warning, 2, np.where(below_minimum, 1, 0))
+    ])
+    breach_mask = (warning * (1 << np.arange(len(METRICS)))).sum(axis=1) | (below_minimum << len(METRICS))
+
+    return {
+        'compliance_score': score,
+        'status_codes': status,
+        'risk_codes': risk,
+        'breach_mask': breach_mask,
+        'flag_codes': compliance_flag_codes(np.abs(changes).max(axis=1)),
+        'next_inspection_days': np.where(
+            risk >= 2, table.arrays['high_risk_inspection_days'][codes], table.arrays['default_inspection_days'][codes]
+        ).astype(np.int64),
+        'freeze_credits': any_critical & table.arrays['auto_freeze_on_critical'][codes],
+        'alert_government': (status > 0) & table.arrays['auto_alert_government'][codes]
+    }
+
+
+def compliance_columns(project_ids, result):
+    """Compact columnar (JSON-ready) form of evaluate_compliance output; statuses, risks and flags as codes"""
+    return {
+        'project_id': list(project_ids),
+        'compliance_score': np.round(result['compliance_score'], 4).tolist(),
+        'compliance_status': result['status_codes'].tolist(),
+        'risk_level': result['risk_codes'].tolist(),
+        'compliance_flag': result['flag_codes'].tolist(),
+        'breach_mask': result['breach_mask'].tolist(),
+        'next_inspection_days': result['next_inspection_days'].tolist(),
+        'freeze_credits': result['freeze_credits'].tolist(),
+        'alert_government': result['alert_government'].tolist()
+    }
+
+
+# Code -> name for the coded columns of compliance_columns
+COMPLIANCE_LEGEND = {
+    'compliance_status': COMPLIANCE_STATUSES,
+    'risk_level': RISK_LEVELS,
+    'compliance_flag': COMPLIANCE_FLAGS,
+    'breach_mask': BREACHES
+}
+
+
+def compliance_record(result, index=0):
+    """One evaluated record with names instead of codes"""
+    mask = int(result['breach_mask'][index])
+    return {
+        'compliance_score': round(float(result['compliance_score'][index]), 4),
+        'compliance_status': COMPLIANCE_STATUSES[result['status_codes'][index]],
+        'risk_level': RISK_LEVELS[result['risk_codes'][index]],
+        'breaches': [name for bit, name in enumerate(BREACHES) if mask & (1 << bit)],
+        'next_inspection_days': int(result['next_inspection_days'][index]),
+        'freeze_credits': bool(result['freeze_credits'][index]),
+        'alert_government': bool(result['alert_government'][index])
+    }
+
+
+compliance_thresholds = ComplianceThresholds()
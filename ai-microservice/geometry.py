@@ -0,0 +1,279 @@
+# BlueCarbon Ledger - AI Microservice
+# Project footprint geometry helpers (GeoJSON in EPSG:4326, lon/lat order)
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Polygon, MultiPolygon
+
+# Configuration
+PROJECT_FOOTPRINT_MAX_ENTRIES = int(os.getenv('PROJECT_FOOTPRINT_MAX_ENTRIES', 50000))
+POLYGON_MAX_VERTICES = int(os.getenv('POLYGON_MAX_VERTICES', 100000))  # across all rings of one project
+POLYGON_CACHE_ENTRIES = int(os.getenv('POLYGON_CACHE_ENTRIES', 1024))   # validated polygons kept by coordinate hash
+
+# Radius of the sphere with the WGS84 ellipsoid's surface area (authalic radius)
+EARTH_RADIUS_METERS = 6371007.2
+SQUARE_METERS_PER_HECTARE = 10000
+
+
+def geometry_key(geometry):
+    """Stable hash of a polygon (SHA-256 of its normalized WKB)"""
+    return hashlib.sha256(shapely.to_wkb(shapely.normalize(geometry))).hexdigest()
+
+
+def _is_ring_list(coordinates):
+    first = coordinates[0]
+    return isinstance(first, list) and bool(first) and isinstance(first[0], (list, tuple))
+
+
+def polygon_rings(coordinates):
+    """
+    Coordinate arrays of a request's coordinates field as a list of polygons, each a
+    list of (n, 2) float64 lon/lat rings (exterior first).
+    Accepts a GeoJSON Polygon/MultiPolygon object (or Feature), or the bare coordinate
+    arrays: a ring [[lon, lat], ...] or a list of rings [[[lon, lat], ...], ...].
+    Raises ValueError for anything else.
+    """
+    if isinstance(coordinates, dict):
+        if coordinates.get('type') == 'Feature':
+            coordinates = coordinates.get('geometry') or {}
+        geometry_type = coordinates.get('type')
+        if geometry_type not in ('Polygon', 'MultiPolygon'):
+            raise ValueError(f"coordinates must be a Polygon or MultiPolygon, got {geometry_type}")
+        polygons = coordinates.get('coordinates')
+        if geometry_type == 'Polygon':
+            polygons = [polygons]
+    elif isinstance(coordinates, list) and coordinates:
+        polygons = [coordinates if _is_ring_list(coordinates) else [coordinates]]
+    else:
+        raise ValueError('coordinates must be a GeoJSON polygon or a list of [lon, lat] positions')
+
+    if not isinstance(polygons, list) or not polygons:
+        raise ValueError('coordinates do not describe a polygon')
+
+    result = []
+    for polygon in polygons:
+        if not isinstance(polygon, list) or not polygon:
+            raise ValueError('every polygon needs at least an exterior ring')
+        rings = []
+        for ring in polygon:
+            try:
+                ring = np.asarray(ring, dtype=np.float64)
+            except (TypeError, ValueError):
+                raise ValueError('ring positions must be [lon, lat] number pairs')
+            if ring.ndim != 2 or ring.shape[1] not in (2, 3):
+                raise ValueError('ring positions must be [lon, lat] number pairs')
+            rings.append(ring[:, :2])
+        result.append(rings)
+    return result
+
+
+def validate_rings(polygons, max_vertices=POLYGON_MAX_VERTICES):
+    """Check ring structure on the raw arrays (size, closure, coordinate ranges); raises ValueError"""
+    vertex_count = sum(len(ring) for rings in polygons for ring in rings)
+    if vertex_count > max_vertices:
+        raise ValueError(f'polygon has {vertex_count} vertices, the limit is {max_vertices}')
+
+    for rings in polygons:
+        for ring in rings:
+            if len(ring) < 4:
+                raise ValueError('every ring needs at least 4 positions (first and last equal)')
+            if not np.array_equal(ring[0], ring[-1]):
+                raise ValueError(f'ring is not closed: first position {ring[0].tolist()} != last {ring[-1].tolist()}')
+
+    coords = np.concatenate([ring for rings in polygons for ring in rings])
+    if not np.isfinite(coords).all():
+        raise ValueError('coordinates must be finite numbers')
+    if (np.abs(coords[:, 0]) > 180).any() or (np.abs(coords[:, 1]) > 90).any():
+        raise ValueError('coordinates must be [lon, lat] in degrees (EPSG:4326)')
+    return vertex_count
+
+
+def geodesic_area_hectares(geometry):
+    """
+    Area of a lon/lat (Multi)Polygon on the authalic sphere, in hectares.
+    Vectorized over every vertex at once: each ring's area is the sum over its
+    edges of (lon2 - lon1) * (2 + sin(lat1) + sin(lat2)) * R^2 / 2, and holes
+    are subtracted from their exterior.
+    """
+    parts = shapely.get_parts(geometry)
+    rings, polygon_index = shapely.get_rings(parts, return_index=True)
+    coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+    if not len(coords):
+        return 0.0
+
+    lon = np.radians(coords[:, 0])
+    sin_lat = np.sin(np.radians(coords[:, 1]))
+    terms = (lon[1:] - lon[:-1]) * (2 + sin_lat[:-1] + sin_lat[1:])
+    same_ring = ring_index[1:] == ring_index[:-1]
+    ring_areas = np.abs(np.bincount(ring_index[:-1][same_ring], weights=terms[same_ring], minlength=len(rings)))
+    ring_areas *= EARTH_RADIUS_METERS ** 2 / 2
+
+    # get_rings lists each polygon's exterior first, then its holes
+    exterior = np.ones(len(rings), dtype=bool)
+    exterior[1:] = polygon_index[1:] != polygon_index[:-1]
+    area_m2 = ring_areas[exterior].sum() - ring_areas[~exterior].sum()
+    return float(area_m2 / SQUARE_METERS_PER_HECTARE)
+
+
+class ProjectPolygon:
+    """A validated project polygon: prepared shapely geometry, its hash key, area and size"""
+
+    __slots__ = ('geometry', 'key', 'area_hectares', 'vertex_count')
+
+    def __init__(self, geometry, key, area_hectares, vertex_count):
+        self.geometry = geometry
+        self.key = key
+        self.area_hectares = area_hectares
+        self.vertex_count = vertex_count
+
+
+def build_project_polygon(coordinates, max_vertices=POLYGON_MAX_VERTICES):
+    """Parse and fully validate coordinates into a ProjectPolygon; raises ValueError"""
+    return _project_polygon(polygon_rings(coordinates), max_vertices)
+
+
+def _project_polygon(polygons, max_vertices):
+    vertex_count = validate_rings(polygons, max_vertices)
+
+    parts = [Polygon(rings[0], rings[1:]) for rings in polygons]
+    geometry = parts[0] if len(parts) == 1 else MultiPolygon(parts)
+    if geometry.is_empty:
+        raise ValueError('coordinates do not describe a polygon')
+
+    # Self-intersections, bow-ties, overlapping holes, ...
+    reason = shapely.is_valid_reason(geometry)
+    if reason != 'Valid Geometry':
+        raise ValueError(f'invalid polygon: {reason}')
+
+    shapely.prepare(geometry)
+    return ProjectPolygon(geometry, geometry_key(geometry), geodesic_area_hectares(geometry), vertex_count)
+
+
+class PolygonCache:
+    """
+    LRU of validated ProjectPolygons keyed by a hash of the raw coordinate arrays, so
+    re-submitted projects skip validation, construction and preparation. Invalid
+    coordinates are not cached.
+    """
+
+    def __init__(self, max_entries=POLYGON_CACHE_ENTRIES, max_vertices=POLYGON_MAX_VERTICES):
+        self.max_entries = max_entries
+        self.max_vertices = max_vertices
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'invalid': 0}
+
+    def get(self, coordinates):
+        """ProjectPolygon for a request's coordinates field; raises ValueError if invalid"""
+        polygons = polygon_rings(coordinates)
+        digest = hashlib.sha256()
+        for rings in polygons:
+            for ring in rings:
+                digest.update(np.int64(len(ring)).tobytes())
+                digest.update(np.ascontiguousarray(ring).tobytes())
+            digest.update(b'|')
+        cache_key = digest.hexdigest()
+
+        with self._lock:
+            project_polygon = self._entries.get(cache_key)
+            if project_polygon is not None:
+                self._entries.move_to_end(cache_key)
+                self._counters['hits'] += 1
+                return project_polygon
+            self._counters['misses'] += 1
+
+        try:
+            project_polygon = _project_polygon(polygons, self.max_vertices)
+        except ValueError:
+            with self._lock:
+                self._counters['invalid'] += 1
+            raise
+
+        with self._lock:
+            self._entries[cache_key] = project_polygon
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return project_polygon
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'max_vertices': self.max_vertices,
+                'hit_ratio': round(self._counters['hits'] / lookups, 4) if lookups else 0,
+                **self._counters
+            }
+
+
+class FootprintIndex:
+    """
+    Spatial index of active project footprints (the max_entries most recently seen).
+    STRtree is immutable, so new footprints go to a small side list that is
+    scanned linearly and folded into a rebuilt tree once it grows past
+    rebuild_threshold.
+    """
+
+    def __init__(self, max_entries=PROJECT_FOOTPRINT_MAX_ENTRIES, rebuild_threshold=64):
+        self.max_entries = max_entries
+        self.rebuild_threshold = rebuild_threshold
+        self._footprints = OrderedDict()  # project_id -> geometry
+        self._recent = {}
+        self._tree = None
+        self._tree_ids = []
+        self._tree_geometries = []
+        self._lock = threading.Lock()
+
+    def register(self, project_id, geometry):
+        with self._lock:
+            self._footprints[project_id] = geometry
+            self._footprints.move_to_end(project_id)
+            self._recent[project_id] = geometry
+
+            while len(self._footprints) > self.max_entries:
+                oldest, _ = self._footprints.popitem(last=False)
+                self._recent.pop(oldest, None)
+
+            if len(self._recent) > self.rebuild_threshold:
+                self._rebuild()
+
+    def _rebuild(self):
+        self._tree_ids = list(self._footprints)
+        self._tree_geometries = list(self._footprints.values())
+        self._tree = STRtree(self._tree_geometries)
+        self._recent = {}
+
+    def query(self, geometry):
+        """Ids of active projects whose footprint intersects geometry"""
+        with self._lock:
+            matches = set()
+            if self._tree is not None:
+                for index in self._tree.query(geometry, predicate='intersects'):
+                    project_id = self._tree_ids[index]
+                    # Skip entries evicted or re-registered with a new footprint since the rebuild
+                    if self._footprints.get(project_id) is self._tree_geometries[index]:
+                        matches.add(project_id)
+            for project_id, footprint in self._recent.items():
+                if footprint.intersects(geometry):
+                    matches.add(project_id)
+            return matches
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active_projects': len(self._footprints),
+                'max_entries': self.max_entries,
+                'indexed': len(self._tree_ids),
+                'pending_rebuild': len(self._recent)
+            }
+
+
+project_footprints = FootprintIndex()
+project_polygons = PolygonCache()
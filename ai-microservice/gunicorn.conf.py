@@ -0,0 +1,52 @@
+# BlueCarbon Ledger - AI Microservice
+# Gunicorn settings: gunicorn -c gunicorn.conf.py app:app
+
+import os
+import gc
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+# Admission control (admission.py) runs in each worker and counts that worker's threads: by default
+# ADMISSION_MAX_IN_FLIGHT = threads - ADMISSION_MAX_QUEUE - ADMISSION_LONG_SLOTS - ADMISSION_RESERVED_SLOTS
+# = 12 - 2 - 4 - 2 = 4 work requests per worker, so the node admits 4 x workers (8 with the defaults).
+# The other 8 threads keep waiting requests, long-polls/downloads and /health from queueing inside
+# gunicorn where admission cannot see them. Verify work is CPU-bound, so scale it with GUNICORN_WORKERS
+# (up to the core count); raising GUNICORN_THREADS adds work slots that mostly wait on the GIL.
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 12))
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# Import the app (and load the model weights) once in the master; workers share them copy-on-write
+preload_app = True
+
+# A job (?async=true) may be polled on any worker, so with several workers job views go to a
+# database they all read. This file is read before the app is imported, so jobs.py sees the path.
+if workers > 1 and 'JOB_STORE_DB_PATH' not in os.environ and not os.getenv('WORK_QUEUE_DB_PATH'):
+    os.environ['JOB_STORE_DB_PATH'] = os.path.join(tempfile.gettempdir(), f"bluecarbon-jobs-{os.getenv('PORT', 5000)}.db")
+
+
+def on_starting(server):
+    from metrics_store import clear_multiproc_dir
+    clear_multiproc_dir()
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach so gc passes in the
+    # workers do not write to (and un-share) the preloaded pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # With MODEL_LOAD=preload the worker only starts accepting requests (and /health only
+    # answers) after warmup; background warms on a thread while /health answers 'warming'
+    from app import model
+    from work_queue import work_queue
+    model.start()
+    work_queue.start()  # this worker starts claiming shared queue jobs (no-op without WORK_QUEUE_DB_PATH)
+
+
+def worker_exit(server, worker):
+    # Close the worker's results log segment so it ends with a complete gzip trailer
+    from results_log import results_log
+    results_log.close()
@@ -0,0 +1,412 @@
+# BlueCarbon Ledger - AI Microservice
+# Local satellite imagery - memory-mapped tile reads and NDVI inside a project polygon
+#
+# IMAGERY_DIR holds tiles in EPSG:4326, north-up:
+#   <name>.npy + <name>.json   array (bands, rows, cols), sidecar with tile_id, acquired,
+#                              bounds [min_lon, min_lat, max_lon, max_lat], bands, nodata
+#   <tile_id>_<YYYY-MM-DD>.tif GeoTIFF (needs rasterio; red/nir bands from IMAGERY_*_BAND)
+# Several acquisitions of the same tile_id may coexist; the newest one is used.
+# imagery_fixtures.py writes synthetic tiles in this layout for offline runs.
+
+import os
+import re
+import json
+import glob
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import shapely
+from shapely import STRtree, box
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:  # GeoTIFF tiles are optional; .npy tiles need only numpy
+    rasterio = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+IMAGERY_DIR = os.getenv('IMAGERY_DIR', '')  # empty disables imagery-based NDVI
+IMAGERY_CHUNK_ROWS = int(os.getenv('IMAGERY_CHUNK_ROWS', 256))  # rows read per window
+IMAGERY_RED_BAND = int(os.getenv('IMAGERY_RED_BAND', 1))  # GeoTIFF band numbers (1-based)
+IMAGERY_NIR_BAND = int(os.getenv('IMAGERY_NIR_BAND', 2))
+IMAGERY_TILE_CACHE_BYTES = int(os.getenv('IMAGERY_TILE_CACHE_BYTES', 256 * 1024 * 1024))
+IMAGERY_SHARED_TILE_PROJECTS = int(os.getenv('IMAGERY_SHARED_TILE_PROJECTS', 2))  # decode + cache a tile once this many active projects overlap it
+IMAGERY_VEGETATION_NDVI = float(os.getenv('IMAGERY_VEGETATION_NDVI', 0.3))  # pixels above this count as vegetated area
+
+# Metres per degree of latitude, and of longitude at the equator
+METERS_PER_DEGREE_LAT = 110574
+METERS_PER_DEGREE_LON = 111320
+
+GEOTIFF_NAME = re.compile(r'^(?P<tile_id>.+)_(?P<acquired>\d{4}-\d{2}-\d{2})\.tiff?$')
+
+
+class RasterTile:
+    """One acquisition of one tile; subclasses provide windowed red/nir reads"""
+
+    def __init__(self, tile_id, acquired, bounds, rows, cols, path, nodata=None):
+        self.tile_id = tile_id
+        self.acquired = acquired
+        self.bounds = tuple(float(value) for value in bounds)
+        self.rows = rows
+        self.cols = cols
+        self.path = path
+        self.nodata = nodata
+
+        min_x, min_y, max_x, max_y = self.bounds
+        self.pixel_width = (max_x - min_x) / cols
+        self.pixel_height = (max_y - min_y) / rows
+
+    @property
+    def key(self):
+        return (self.tile_id, self.acquired)
+
+    def window_for(self, bounds):
+        """Pixel window (row_start, row_stop, col_start, col_stop) covering bounds, or None"""
+        min_x, min_y, max_x, max_y = self.bounds
+        col_start = max(0, int(np.floor((bounds[0] - min_x) / self.pixel_width)))
+        col_stop = min(self.cols, int(np.ceil((bounds[2] - min_x) / self.pixel_width)))
+        row_start = max(0, int(np.floor((max_y - bounds[3]) / self.pixel_height)))
+        row_stop = min(self.rows, int(np.ceil((max_y - bounds[1]) / self.pixel_height)))
+        if row_start >= row_stop or col_start >= col_stop:
+            return None
+        return row_start, row_stop, col_start, col_stop
+
+    def pixel_centers(self, row_start, row_stop, col_start, col_stop):
+        """Lon/lat of the pixel centres in a window, as 1-D x and y arrays"""
+        min_x, _, _, max_y = self.bounds
+        xs = min_x + (np.arange(col_start, col_stop) + 0.5) * self.pixel_width
+        ys = max_y - (np.arange(row_start, row_stop) + 0.5) * self.pixel_height
+        return xs, ys
+
+    def pixel_area_hectares(self, ys):
+        """Area of one pixel in each row whose centre latitude is in ys"""
+        width_m = self.pixel_width * METERS_PER_DEGREE_LON * np.cos(np.radians(ys))
+        return width_m * self.pixel_height * METERS_PER_DEGREE_LAT / 10000
+
+    def read(self, row_start, row_stop, col_start, col_stop):
+        """Return (red, nir) float32 arrays for the window"""
+        raise NotImplementedError
+
+
+class NumpyTile(RasterTile):
+    """Tile stored as .npy; opened with mmap so a window read only touches its own pages"""
+
+    def __init__(self, path, sidecar):
+        array = np.load(path, mmap_mode='r')
+        bands = sidecar.get('bands', ['red', 'nir'])
+        super().__init__(
+            sidecar['tile_id'], sidecar['acquired'], sidecar['bounds'],
+            array.shape[1], array.shape[2], path, sidecar.get('nodata')
+        )
+        self._array = array
+        self._red = bands.index('red')
+        self._nir = bands.index('nir')
+
+    def read(self, row_start, row_stop, col_start, col_stop):
+        red = np.asarray(self._array[self._red, row_start:row_stop, col_start:col_stop], dtype=np.float32)
+        nir = np.asarray(self._array[self._nir, row_start:row_stop, col_start:col_stop], dtype=np.float32)
+        return red, nir
+
+
+class GeoTiffTile(RasterTile):
+    """GeoTIFF tile read window by window through rasterio"""
+
+    def __init__(self, path, tile_id, acquired):
+        with rasterio.open(path) as dataset:
+            bounds = tuple(dataset.bounds)
+            rows, cols, nodata = dataset.height, dataset.width, dataset.nodata
+        super().__init__(tile_id, acquired, bounds, rows, cols, path, nodata)
+        self._local = threading.local()
+
+    def _dataset(self):
+        # rasterio datasets are not thread-safe; keep one handle per thread
+        dataset = getattr(self._local, 'dataset', None)
+        if dataset is None:
+            dataset = self._local.dataset = rasterio.open(self.path)
+        return dataset
+
+    def read(self, row_start, row_stop, col_start, col_stop):
+        window = Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+        red, nir = self._dataset().read([IMAGERY_RED_BAND, IMAGERY_NIR_BAND], window=window).astype(np.float32)
+        return red, nir
+
+
+class ImageryCatalog:
+    """Scans IMAGERY_DIR for tiles; rescans when the directory changes"""
+
+    def __init__(self, directory=IMAGERY_DIR):
+        self.directory = directory
+        self._snapshot = ([], None)  # (tiles, STRtree over their footprints), swapped atomically
+        self._scanned_mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.directory) and os.path.isdir(self.directory)
+
+    def tiles(self):
+        return self._current()[0]
+
+    def _current(self):
+        if not self.enabled:
+            return [], None
+        mtime = os.stat(self.directory).st_mtime
+        if mtime != self._scanned_mtime:
+            with self._lock:
+                if mtime != self._scanned_mtime:
+                    tiles = self._scan()
+                    self._snapshot = (tiles, STRtree([box(*tile.bounds) for tile in tiles]) if tiles else None)
+                    self._scanned_mtime = mtime
+        return self._snapshot
+
+    def _scan(self):
+        tiles = []
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.npy'))):
+            sidecar_path = os.path.splitext(path)[0] + '.json'
+            try:
+                with open(sidecar_path) as f:
+                    tiles.append(NumpyTile(path, json.load(f)))
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                logger.warning(f"Skipping imagery tile {path}: {str(e)}")
+
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.tif*'))):
+            match = GEOTIFF_NAME.match(os.path.basename(path))
+            if match is None:
+                logger.warning(f"Skipping imagery tile {path}: name must be <tile_id>_<YYYY-MM-DD>.tif")
+            elif rasterio is None:
+                logger.warning(f"Skipping imagery tile {path}: rasterio is not installed")
+            else:
+                tiles.append(GeoTiffTile(path, match.group('tile_id'), match.group('acquired')))
+
+        logger.info(f"Imagery catalog: {len(tiles)} tiles in {self.directory}")
+        return tiles
+
+    def latest_tiles(self, bounds):
+        """Newest acquisition of every tile whose footprint intersects bounds"""
+        tiles, tree = self._current()
+        if tree is None:
+            return []
+
+        latest = {}
+        for index in tree.query(box(*bounds)):
+            tile = tiles[index]
+            current = latest.get(tile.tile_id)
+            if current is None or tile.acquired > current.acquired:
+                latest[tile.tile_id] = tile
+        return list(latest.values())
+
+
+def ndvi_pixels(red, nir, nodata=None):
+    """Per-pixel NDVI as float32, NaN where the pixel is nodata or has no reflectance"""
+    total = nir + red
+    valid = (total > 0) & np.isfinite(total)
+    if nodata is not None:
+        valid &= (red != nodata) & (nir != nodata)
+    ndvi = np.full(red.shape, np.nan, dtype=np.float32)
+    np.divide(nir - red, total, out=ndvi, where=valid)
+    return ndvi
+
+
+def decode_tile(tile, chunk_rows=IMAGERY_CHUNK_ROWS):
+    """NDVI raster for a whole tile, read chunk_rows rows at a time"""
+    ndvi = np.empty((tile.rows, tile.cols), dtype=np.float32)
+    for chunk_start in range(0, tile.rows, chunk_rows):
+        chunk_stop = min(tile.rows, chunk_start + chunk_rows)
+        red, nir = tile.read(chunk_start, chunk_stop, 0, tile.cols)
+        ndvi[chunk_start:chunk_stop] = ndvi_pixels(red, nir, tile.nodata)
+    return ndvi
+
+
+class TileCache:
+    """
+    LRU of decoded NDVI tiles keyed by (tile_id, acquired), bounded by total bytes.
+    Concurrent requests for a tile that is being decoded wait for that decode
+    instead of starting their own.
+    """
+
+    def __init__(self, max_bytes=IMAGERY_TILE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> ndvi array
+        self._inflight = {}
+        self._resident_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'decodes': 0, 'evictions': 0, 'too_large': 0}
+
+    def get(self, tile, decode=False):
+        """Cached NDVI for tile; on a miss decode it when decode is True, otherwise return None"""
+        key = tile.key
+        owner = False
+        with self._lock:
+            ndvi = self._entries.get(key)
+            if ndvi is not None:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return ndvi
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self._counters['hits'] += 1
+            else:
+                self._counters['misses'] += 1
+                if not decode or tile.rows * tile.cols * 4 > self.max_bytes:
+                    self._counters['too_large'] += int(decode)
+                    return None
+                inflight = self._inflight[key] = Future()
+                owner = True
+
+        if not owner:
+            return inflight.result()
+
+        try:
+            ndvi = decode_tile(tile)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._counters['decodes'] += 1
+            self._entries[key] = ndvi
+            self._resident_bytes += ndvi.nbytes
+            while self._resident_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._resident_bytes -= evicted.nbytes
+                self._counters['evictions'] += 1
+        inflight.set_result(ndvi)
+        return ndvi
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'entries': len(self._entries),
+                'resident_bytes': self._resident_bytes,
+                'max_bytes': self.max_bytes,
+                'hit_ratio': round(self._counters['hits'] / lookups, 4) if lookups else 0,
+                **self._counters
+            }
+
+
+def tile_ndvi(tile, geometry, chunk_rows=IMAGERY_CHUNK_ROWS, decoded=None):
+    """
+    Sum NDVI over the tile pixels whose centres fall inside geometry.
+    Uses the decoded NDVI raster when one is given; otherwise the window under the
+    polygon's bounding box is read chunk_rows rows at a time, so memory stays
+    bounded however large the polygon is.
+    """
+    summary = {
+        'tile_id': tile.tile_id,
+        'acquired': tile.acquired,
+        'path': tile.path,
+        'ndvi_sum': 0.0,
+        'pixel_count': 0,
+        'area_hectares': 0.0,
+        'vegetated_area_hectares': 0.0
+    }
+
+    window = tile.window_for(geometry.bounds)
+    if window is None:
+        return summary
+
+    row_start, row_stop, col_start, col_stop = window
+    shapely.prepare(geometry)
+
+    for chunk_start in range(row_start, row_stop, chunk_rows):
+        chunk_stop = min(row_stop, chunk_start + chunk_rows)
+        xs, ys = tile.pixel_centers(chunk_start, chunk_stop, col_start, col_stop)
+        inside = shapely.contains_xy(geometry, xs[None, :], ys[:, None])
+        if not inside.any():
+            continue
+
+        if decoded is not None:
+            ndvi = decoded[chunk_start:chunk_stop, col_start:col_stop]
+        else:
+            ndvi = ndvi_pixels(*tile.read(chunk_start, chunk_stop, col_start, col_stop), tile.nodata)
+        valid = inside & ~np.isnan(ndvi)
+
+        count = int(valid.sum())
+        if count:
+            row_area = tile.pixel_area_hectares(ys)
+            vegetated = valid & (ndvi > IMAGERY_VEGETATION_NDVI)
+            summary['ndvi_sum'] += float(ndvi[valid].sum(dtype=np.float64))
+            summary['pixel_count'] += count
+            summary['area_hectares'] += float(valid.sum(axis=1) @ row_area)
+            summary['vegetated_area_hectares'] += float(vegetated.sum(axis=1) @ row_area)
+
+    return summary
+
+
+def observe_ndvi(catalog, geometry, cache=None, footprints=None, store=None, project_id=None, geometry_key=None):
+    """
+    Mean NDVI and vegetated area inside geometry from the newest imagery of each
+    overlapping tile. Returns None when no imagery covers the polygon.
+
+    Tiles that several active projects overlap (per the footprints index) are
+    decoded once into the cache and shared; others are streamed, but still use
+    the cache if the tile happens to be resident. With a summary store, a tile
+    whose newest acquisition was already summarised for this project is not read
+    again: only tiles with newer imagery are recomputed and merged into the
+    stored per-tile summaries, so cost follows what changed, not project size.
+    """
+    stored, reference = {}, None
+    if store is not None and project_id is not None:
+        stored, reference = store.load(project_id, geometry_key)
+
+    summaries = []
+    changed = []
+    for tile in catalog.latest_tiles(geometry.bounds):
+        previous = stored.get(tile.tile_id)
+        if previous is not None and previous['acquired'] >= tile.acquired:
+            summaries.append(previous)
+            continue
+
+        decoded = None
+        if cache is not None:
+            shared = footprints is not None and \
+                len(footprints.query(box(*tile.bounds))) >= IMAGERY_SHARED_TILE_PROJECTS
+            decoded = cache.get(tile, decode=shared)
+        summary = tile_ndvi(tile, geometry, decoded=decoded)
+        summaries.append(summary)
+        changed.append(summary)
+
+    summaries = [summary for summary in summaries if summary['pixel_count']]
+    if not summaries:
+        return None
+
+    pixel_count = sum(summary['pixel_count'] for summary in summaries)
+    observation = {
+        'ndvi_mean': sum(summary['ndvi_sum'] for summary in summaries) / pixel_count,
+        'pixel_count': pixel_count,
+        'area_hectares': sum(summary['area_hectares'] for summary in summaries),
+        'vegetated_area_hectares': sum(summary['vegetated_area_hectares'] for summary in summaries),
+        'image_dates': sorted({summary['acquired'] for summary in summaries}, reverse=True),
+        'tiles': summaries,
+        'tiles_recomputed': len(changed),
+        'tiles_reused': len(summaries) - len([summary for summary in changed if summary['pixel_count']]),
+        'reference': reference
+    }
+
+    if store is not None and project_id is not None:
+        # The first full observation of a project becomes the reference later ones are compared to
+        new_reference = None
+        if reference is None:
+            new_reference = {
+                'ndvi_mean': observation['ndvi_mean'],
+                'vegetated_area_hectares': observation['vegetated_area_hectares'],
+                'image_date': observation['image_dates'][0]
+            }
+            observation['reference'] = new_reference
+        store.save(project_id, geometry_key, changed, observation['tiles_reused'], new_reference)
+
+    return observation
+
+
+imagery_catalog = ImageryCatalog()
+tile_cache = TileCache()
@@ -0,0 +1,76 @@
+# BlueCarbon Ledger - AI Microservice
+# Writes synthetic red/NIR tiles in the IMAGERY_DIR layout, for running the imagery
+# pipeline offline:
+#   python imagery_fixtures.py --out data/imagery --bounds 88.8 21.5 89.2 21.9 --date 2026-08-01 --date 2026-09-01
+
+import os
+import json
+import argparse
+
+import numpy as np
+
+
+def write_tile(out_dir, tile_id, acquired, bounds, size, base_ndvi, rng):
+    """Write one uint16 (2, size, size) red/nir tile plus its sidecar; returns the .npy path"""
+    # Smooth NDVI field around base_ndvi with a little pixel noise
+    rows, cols = np.mgrid[0:size, 0:size] / size
+    ndvi = base_ndvi + 0.1 * np.sin(rows * np.pi * 2) * np.cos(cols * np.pi * 2) + rng.normal(0, 0.02, (size, size))
+    ndvi = np.clip(ndvi, -0.9, 0.95)
+
+    # Choose reflectances so that (nir - red) / (nir + red) == ndvi
+    red = rng.uniform(400, 900, (size, size))
+    nir = red * (1 + ndvi) / (1 - ndvi)
+
+    array = np.stack([red, nir]).round().clip(1, 65535).astype(np.uint16)
+    name = f'{tile_id}_{acquired}'
+    path = os.path.join(out_dir, f'{name}.npy')
+    np.save(path, array)
+
+    with open(os.path.join(out_dir, f'{name}.json'), 'w') as f:
+        json.dump({
+            'tile_id': tile_id,
+            'acquired': acquired,
+            'bounds': list(bounds),
+            'bands': ['red', 'nir'],
+            'nodata': 0
+        }, f, indent=2)
+
+    return path
+
+
+def write_fixtures(out_dir, bounds, tiles_x, tiles_y, size, dates, base_ndvi, ndvi_step, seed):
+    """Cover bounds with a tiles_x x tiles_y grid, one acquisition per date (NDVI drifts by ndvi_step per date)"""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    min_x, min_y, max_x, max_y = bounds
+    width = (max_x - min_x) / tiles_x
+    height = (max_y - min_y) / tiles_y
+
+    paths = []
+    for date_index, acquired in enumerate(sorted(dates)):
+        for ty in range(tiles_y):
+            for tx in range(tiles_x):
+                tile_bounds = (min_x + tx * width, min_y + ty * height,
+                               min_x + (tx + 1) * width, min_y + (ty + 1) * height)
+                paths.append(write_tile(out_dir, f'x{tx}_y{ty}', acquired, tile_bounds, size,
+                                        base_ndvi + ndvi_step * date_index, rng))
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic imagery tiles for offline runs')
+    parser.add_argument('--out', default='data/imagery')
+    parser.add_argument('--bounds', type=float, nargs=4, default=[0, 0, 1, 1],
+                        metavar=('MIN_LON', 'MIN_LAT', 'MAX_LON', 'MAX_LAT'))
+    parser.add_argument('--tiles-x', type=int, default=2)
+    parser.add_argument('--tiles-y', type=int, default=2)
+    parser.add_argument('--size', type=int, default=512, help='pixels per tile side')
+    parser.add_argument('--date', action='append', dest='dates', help='acquisition date (repeatable)')
+    parser.add_argument('--ndvi', type=float, default=0.75, help='NDVI of the first acquisition')
+    parser.add_argument('--ndvi-step', type=float, default=-0.02, help='NDVI change per later acquisition')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    written = write_fixtures(args.out, args.bounds, args.tiles_x, args.tiles_y, args.size,
+                             args.dates or ['2026-01-01'], args.ndvi, args.ndvi_step, args.seed)
+    print(f'Wrote {len(written)} tiles to {args.out}')
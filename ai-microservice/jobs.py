@@ -0,0 +1,314 @@
+# BlueCarbon Ledger - AI Microservice
+# Asynchronous job manager - runs MRV work on a bounded worker pool
+
+import os
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+JOB_EXECUTOR_TYPE = os.getenv('JOB_EXECUTOR_TYPE', 'thread')  # 'thread' or 'process'
+MAX_CONCURRENT_JOBS = int(os.getenv('MAX_CONCURRENT_JOBS', 4))
+JOB_RESULT_TTL_SECONDS = int(os.getenv('JOB_RESULT_TTL_SECONDS', 3600))
+JOB_MAX_WAIT_SECONDS = int(os.getenv('JOB_MAX_WAIT_SECONDS', 30))
+MAX_TRACKED_JOBS = int(os.getenv('MAX_TRACKED_JOBS', 10000))
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 16))
+# Shared by every worker (and node) that may be polled for a job; defaults to the work queue's database
+JOB_STORE_DB_PATH = os.getenv('JOB_STORE_DB_PATH', os.getenv('WORK_QUEUE_DB_PATH', ''))  # empty = this process only
+JOB_STORE_POLL_SECONDS = float(os.getenv('JOB_STORE_POLL_SECONDS', 0.2))
+
+FINAL_JOB_STATUSES = ('completed', 'failed', 'cancelled')
+STORE_PURGE_INTERVAL_SECONDS = 300
+
+
+def create_executor(executor_type, max_workers, thread_name_prefix='mrv-job'):
+    """Build a thread or process pool for MRV work"""
+    if executor_type == 'process':
+        return ProcessPoolExecutor(max_workers=max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+
+class JobStore:
+    """
+    Public job views (status, timestamps, result or error) in one SQLite table, so a
+    job accepted by one gunicorn worker can be polled on any other. The worker that
+    accepted the job writes its row when the job is queued and again when it finishes.
+    """
+
+    def __init__(self, db_path=JOB_STORE_DB_PATH):
+        self.db_path = db_path
+        self._db = None
+        self._db_pid = None
+        self._lock = threading.Lock()
+        self._last_purge = 0
+
+    @property
+    def enabled(self):
+        return bool(self.db_path)
+
+    def _connection(self):
+        """Open the database lazily, once per process (connections must not cross a fork)"""
+        if self._db is None or self._db_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            self._db_pid = os.getpid()
+        return self._db
+
+    def save(self, description):
+        """Insert or replace the stored view of a job"""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                self._connection().execute(
+                    'INSERT OR REPLACE INTO jobs (job_id, status, description, updated_at) VALUES (?, ?, ?, ?)',
+                    (description['job_id'], description['status'], dumps(description).decode('utf-8'), time.time())
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.error(f"Could not store job {description['job_id']}: {str(e)}")
+
+    def load(self, job_id):
+        """The stored view of a job, or None"""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    'SELECT description FROM jobs WHERE job_id = ?', (job_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Could not read job {job_id}: {str(e)}")
+            return None
+        return loads(row[0]) if row is not None else None
+
+    def purge(self, ttl_seconds=JOB_RESULT_TTL_SECONDS):
+        """Delete finished jobs past their TTL (at most once per STORE_PURGE_INTERVAL_SECONDS)"""
+        now = time.time()
+        if not self.enabled or now - self._last_purge < STORE_PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        try:
+            with self._lock:
+                self._connection().execute(
+                    f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINAL_JOB_STATUSES))}) AND updated_at < ?",
+                    (*FINAL_JOB_STATUSES, now - ttl_seconds)
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Could not purge stored jobs: {str(e)}")
+
+
+class JobManager:
+    """
+    Tracks submitted jobs and the futures running them.
+    Futures live in the process that accepted the job; their public views are also
+    written to the job store, so other workers can answer polls for them.
+    """
+
+    def __init__(self, executor_type=JOB_EXECUTOR_TYPE, max_workers=MAX_CONCURRENT_JOBS, store=None):
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.store = store if store is not None else JobStore()
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """Create the pool on first use so gunicorn forks before any worker starts"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = create_executor(self.executor_type, self.max_workers)
+                    logger.info(f"Started {self.executor_type} job pool with {self.max_workers} workers")
+        return self._executor
+
+    def submit(self, job_type, fn, payload, on_success=None, on_failure=None):
+        """Queue fn(payload) and return the job record without waiting for it"""
+        future = self.executor.submit(fn, payload)
+        return self.track(job_type, payload, future, on_success=on_success, on_failure=on_failure)
+
+    def track(self, job_type, payload, future, on_success=None, on_failure=None, details=None, job_id=None):
+        """
+        Register a future produced elsewhere (e.g. by the re-verification scheduler)
+        details, if given, is called on every read to add scheduler state to the job view;
+        job_id, if given, replaces the generated id (work queue jobs use their queue_id)
+        """
+        self._purge_expired()
+
+        job_id = job_id or f"job-{int(time.time())}-{uuid.uuid4().hex[:12]}"
+        job = {
+            'job_id': job_id,
+            'job_type': job_type,
+            'project_id': payload.get('project_id'),
+            'submitted_at': datetime.now().isoformat(),
+            'started_at': None,
+            'completed_at': None,
+            'future': future,
+            'details': details
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+
+        description = self.describe(job)
+        self.store.save(description)
+
+        future.add_done_callback(lambda f: self._on_done(job, f, on_success, on_failure))
+
+        logger.info(f"Queued {job_type} job {job_id} for project: {job['project_id']}")
+        return description
+
+    def _on_done(self, job, future, on_success, on_failure):
+        job['completed_at'] = job['completed_at'] or datetime.now().isoformat()
+        self.store.save(self.describe(job))
+
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        try:
+            if error is None:
+                if on_success:
+                    on_success(future.result())
+            else:
+                logger.error(f"Job {job['job_id']} failed: {str(error)}")
+                if on_failure:
+                    on_failure(error)
+        except Exception as e:
+            logger.error(f"Job {job['job_id']} completion callback failed: {str(e)}")
+
+    def get(self, job_id, wait_seconds=0):
+        """Return this process's record of a job, optionally blocking until it finishes (long-poll)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+
+        if job is None:
+            return None
+
+        if wait_seconds > 0 and not job['future'].done():
+            wait([job['future']], timeout=min(wait_seconds, JOB_MAX_WAIT_SECONDS))
+
+        return self.describe(job)
+
+    def future_for(self, job_id):
+        """The future behind a job, or None - lets async callers await it instead of blocking in get()"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job['future'] if job is not None else None
+
+    def stored(self, job_id):
+        """The job store's view of a job accepted by another worker, or None"""
+        return self.store.load(job_id)
+
+    def describe(self, job):
+        """Build the public view of a job from its future's current state"""
+        future = job['future']
+
+        if not (future.running() or future.done()):
+            status = 'queued'
+        elif not future.done():
+            status = 'running'
+        elif future.cancelled():
+            status = 'cancelled'
+        elif future.exception() is not None:
+            status = 'failed'
+        else:
+            status = 'completed'
+
+        if status != 'queued' and job['started_at'] is None:
+            job['started_at'] = job['completed_at'] or datetime.now().isoformat()
+        if status in ('completed', 'failed', 'cancelled') and job['completed_at'] is None:
+            job['completed_at'] = datetime.now().isoformat()
+
+        description = {
+            'job_id': job['job_id'],
+            'job_type': job['job_type'],
+            'project_id': job['project_id'],
+            'status': status,
+            'submitted_at': job['submitted_at'],
+            'started_at': job['started_at'],
+            'completed_at': job['completed_at']
+        }
+
+        if job['details'] is not None:
+            description.update(job['details']())
+
+        if status == 'completed':
+            description['result'] = future.result()
+        elif status == 'failed':
+            error = future.exception()
+            description['error'] = str(error)
+            description['error_type'] = type(error).__name__
+
+        return description
+
+    def _purge_expired(self):
+        """Drop finished jobs past their TTL and cap the number of tracked jobs"""
+        self.store.purge()
+        now = datetime.now()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['future'].done() and job['completed_at']
+                and (now - datetime.fromisoformat(job['completed_at'])).total_seconds() > JOB_RESULT_TTL_SECONDS
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+            overflow = len(self._jobs) - MAX_TRACKED_JOBS
+            if overflow > 0:
+                finished = [job_id for job_id, job in self._jobs.items() if job['future'].done()]
+                for job_id in finished[:overflow]:
+                    del self._jobs[job_id]
+
+    def stats(self):
+        """Count tracked jobs by status"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+
+        counts = {'queued': 0, 'running': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+        for job in jobs:
+            counts[self.describe(job)['status']] += 1
+        return counts
+
+    def shutdown(self, wait_for_jobs=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait_for_jobs)
+            self._executor = None
+
+
+job_manager = JobManager()
+
+# Pool shared by every batch request (created lazily, like the job pool)
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+
+def get_batch_executor():
+    global _batch_executor
+    if _batch_executor is None:
+        with _batch_executor_lock:
+            if _batch_executor is None:
+                _batch_executor = create_executor(JOB_EXECUTOR_TYPE, BATCH_MAX_WORKERS, 'mrv-batch')
+                logger.info(f"Started {JOB_EXECUTOR_TYPE} batch pool with {BATCH_MAX_WORKERS} workers")
+    return _batch_executor
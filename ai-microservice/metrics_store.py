@@ -0,0 +1,316 @@
+# BlueCarbon Ledger - AI Microservice
+# Metrics store - per-thread counter shards, fixed-bucket latency histograms,
+# multi-process aggregation through memory-mapped files and Prometheus exposition
+
+import os
+import glob
+import bisect
+import threading
+import weakref
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR', '')  # shared dir for gunicorn workers; empty = single process
+METRICS_MAX_THREAD_SHARDS = int(os.getenv('METRICS_MAX_THREAD_SHARDS', 256))
+METRICS_PREFIX = 'bluecarbon_ai'
+
+# Latency buckets in seconds (upper bounds; a final +Inf bucket is implied)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60)
+
+OTHER_LABEL = 'other'
+
+# Table rows with a fixed role; thread shards start after them
+RETIRED_ROW = 0  # counters folded in from threads that have exited
+GAUGE_ROW = 1    # gauges that are set (not incremented), written under a lock
+FIRST_SHARD_ROW = 2
+
+
+def histogram_percentile(bucket_counts, buckets, fraction):
+    """Estimate a percentile from non-cumulative bucket counts by interpolating inside the bucket"""
+    total = sum(bucket_counts)
+    if total == 0:
+        return 0
+    target = fraction * total
+    cumulative = 0
+    for index, count in enumerate(bucket_counts):
+        if count and cumulative + count >= target:
+            if index >= len(buckets):
+                return buckets[-1]
+            lower = buckets[index - 1] if index > 0 else 0
+            return lower + (buckets[index] - lower) * (target - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _ShardHandle:
+    """Thread-local marker; when its thread exits the finalizer folds the shard into the retired row"""
+    pass
+
+
+class MetricsStore:
+    """
+    Every metric is a slot in a float64 vector. Each thread increments its own row
+    of a (rows x slots) table, so writes need no lock and are never lost; reads sum
+    the rows. With METRICS_MULTIPROC_DIR set the table is a memory-mapped file per
+    process and reads sum every process's file, which aggregates gunicorn workers.
+    Gauges from processes that are no longer alive are ignored on read.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, multiproc_dir=METRICS_MULTIPROC_DIR,
+                 max_thread_shards=METRICS_MAX_THREAD_SHARDS):
+        self.buckets = tuple(buckets)
+        self.multiproc_dir = multiproc_dir
+        self.rows = FIRST_SHARD_ROW + max_thread_shards
+
+        self._definitions = {}  # name -> {'kind', 'help', 'labels': [(label_name, values)]}
+        self._slots = {}        # (name, label_values) -> slot offset
+        self._size = 0
+        self._gauge_mask = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._table = None
+        self._pid = None
+        self._free_rows = []
+
+    # ---- schema -------------------------------------------------------------
+
+    def _define(self, name, kind, help_text, labels, width):
+        if self._table is not None:
+            raise RuntimeError('Metrics must be defined before the first write')
+        label_values = [(label_name, tuple(values) + (OTHER_LABEL,)) for label_name, values in labels]
+        self._definitions[name] = {'kind': kind, 'help': help_text, 'labels': label_values}
+
+        combinations = [()]
+        for _, values in label_values:
+            combinations = [combo + (value,) for combo in combinations for value in values]
+        for combo in combinations:
+            self._slots[(name, combo)] = self._size
+            self._size += width
+
+    def counter(self, name, help_text, labels=()):
+        self._define(name, 'counter', help_text, labels, 1)
+
+    def gauge(self, name, help_text, labels=()):
+        self._define(name, 'gauge', help_text, labels, 1)
+
+    def histogram(self, name, help_text, labels=()):
+        # One slot per bucket (including +Inf) plus one for the running sum
+        self._define(name, 'histogram', help_text, labels, len(self.buckets) + 2)
+
+    # ---- storage ------------------------------------------------------------
+
+    def _ensure_table(self):
+        """Allocate this process's table; re-allocates after a fork so workers never share rows"""
+        if self._table is not None and self._pid == os.getpid():
+            return self._table
+
+        with self._lock:
+            if self._table is not None and self._pid == os.getpid():
+                return self._table
+
+            shape = (self.rows, self._size)
+            if self.multiproc_dir:
+                os.makedirs(self.multiproc_dir, exist_ok=True)
+                path = os.path.join(self.multiproc_dir, f'metrics-{os.getpid()}.bin')
+                table = np.memmap(path, dtype=np.float64, mode='w+', shape=shape)
+            else:
+                table = np.zeros(shape, dtype=np.float64)
+
+            self._gauge_mask = np.zeros(self._size, dtype=bool)
+            for (name, _), offset in self._slots.items():
+                if self._definitions[name]['kind'] == 'gauge':
+                    self._gauge_mask[offset] = True
+
+            self._table = table
+            self._pid = os.getpid()
+            self._free_rows = list(range(self.rows - 1, FIRST_SHARD_ROW - 1, -1))
+            self._local = threading.local()
+            return table
+
+    def _shard(self):
+        """This thread's row, claimed on first use; None when every row is taken"""
+        table = self._ensure_table()
+        row = getattr(self._local, 'row', None)
+        if row is not None and getattr(self._local, 'pid', None) == self._pid:
+            return table[row]
+
+        with self._lock:
+            if not self._free_rows:
+                return None
+            row = self._free_rows.pop()
+
+        handle = _ShardHandle()
+        self._local.row = row
+        self._local.pid = self._pid
+        self._local.handle = handle
+        weakref.finalize(handle, self._retire_row, self._pid, row)
+        return table[row]
+
+    def _retire_row(self, pid, row):
+        if pid != self._pid:
+            return
+        with self._lock:
+            self._table[RETIRED_ROW] += self._table[row]
+            self._table[row] = 0
+            self._free_rows.append(row)
+
+    def _slot(self, name, labels):
+        definition = self._definitions[name]
+        combo = tuple(
+            labels.get(label_name) if labels.get(label_name) in values else OTHER_LABEL
+            for label_name, values in definition['labels']
+        )
+        return self._slots[(name, combo)]
+
+    def _add(self, offset, value):
+        shard = self._shard()
+        if shard is not None:
+            shard[offset] += value
+        else:
+            with self._lock:
+                self._table[RETIRED_ROW, offset] += value
+
+    # ---- write API ----------------------------------------------------------
+
+    def inc(self, name, value=1, **labels):
+        self._add(self._slot(name, labels), value)
+
+    def dec(self, name, value=1, **labels):
+        self._add(self._slot(name, labels), -value)
+
+    def set(self, name, value, **labels):
+        offset = self._slot(name, labels)
+        table = self._ensure_table()
+        with self._lock:
+            # Set-style gauges live in their own row; inc/dec gauges live in the shards
+            table[GAUGE_ROW, offset] = value
+
+    def observe(self, name, value, **labels):
+        offset = self._slot(name, labels)
+        shard = self._shard()
+        bucket = bisect.bisect_left(self.buckets, value)
+        if shard is not None:
+            shard[offset + bucket] += 1
+            shard[offset + len(self.buckets) + 1] += value
+        else:
+            with self._lock:
+                self._table[RETIRED_ROW, offset + bucket] += 1
+                self._table[RETIRED_ROW, offset + len(self.buckets) + 1] += value
+
+    # ---- read API -----------------------------------------------------------
+
+    def totals(self):
+        """Sum of every row of every live table (and counters of exited workers)"""
+        table = self._ensure_table()
+        if not self.multiproc_dir:
+            return table.sum(axis=0)
+
+        total = np.zeros(self._size, dtype=np.float64)
+        for path in glob.glob(os.path.join(self.multiproc_dir, 'metrics-*.bin')):
+            try:
+                pid = int(os.path.basename(path)[len('metrics-'):-len('.bin')])
+                other = np.memmap(path, dtype=np.float64, mode='r')
+            except (ValueError, OSError):
+                continue
+            if other.size != self.rows * self._size:
+                continue  # file from a different build / layout
+            summed = other.reshape(self.rows, self._size).sum(axis=0)
+            if pid != os.getpid() and not _pid_alive(pid):
+                summed[self._gauge_mask] = 0
+            total += summed
+        return total
+
+    def value(self, name, totals=None, **labels):
+        totals = self.totals() if totals is None else totals
+        return float(totals[self._slot(name, labels)])
+
+    def series(self, name, totals):
+        """Yield (labels dict, offset) for every label combination of a metric"""
+        definition = self._definitions[name]
+        label_names = [label_name for label_name, _ in definition['labels']]
+        for (series_name, combo), offset in self._slots.items():
+            if series_name == name:
+                yield dict(zip(label_names, combo)), offset
+
+    def histogram_summary(self, name, totals=None):
+        """Count, average and p50/p95/p99 per label combination that has observations"""
+        totals = self.totals() if totals is None else totals
+        width = len(self.buckets) + 1
+        summary = {}
+        for labels, offset in self.series(name, totals):
+            bucket_counts = totals[offset:offset + width].tolist()
+            count = int(sum(bucket_counts))
+            if count == 0:
+                continue
+            total_seconds = float(totals[offset + width])
+            key = ','.join(labels.values()) or 'all'
+            summary[key] = {
+                'count': count,
+                'average_seconds': round(total_seconds / count, 4),
+                'p50_seconds': round(histogram_percentile(bucket_counts, self.buckets, 0.5), 4),
+                'p95_seconds': round(histogram_percentile(bucket_counts, self.buckets, 0.95), 4),
+                'p99_seconds': round(histogram_percentile(bucket_counts, self.buckets, 0.99), 4)
+            }
+        return summary
+
+    def prometheus(self):
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)"""
+        totals = self.totals()
+        lines = []
+        for name, definition in self._definitions.items():
+            full_name = f'{METRICS_PREFIX}_{name}'
+            lines.append(f'# HELP {full_name} {definition["help"]}')
+            lines.append(f'# TYPE {full_name} {definition["kind"]}')
+
+            for labels, offset in self.series(name, totals):
+                if definition['kind'] != 'histogram':
+                    lines.append(f'{full_name}{_format_labels(labels)} {_format_value(totals[offset])}')
+                    continue
+
+                cumulative = 0
+                for index, upper in enumerate(self.buckets + (float('inf'),)):
+                    cumulative += totals[offset + index]
+                    le = '+Inf' if upper == float('inf') else _format_value(upper)
+                    lines.append(f'{full_name}_bucket{_format_labels({**labels, "le": le})} {_format_value(cumulative)}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(totals[offset + len(self.buckets) + 1])}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {_format_value(cumulative)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def clear_multiproc_dir(directory=METRICS_MULTIPROC_DIR):
+    """Remove per-process metric files; call once in the gunicorn master before workers start"""
+    if not directory:
+        return
+    for path in glob.glob(os.path.join(directory, 'metrics-*.bin')):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove metrics file {path}: {str(e)}")
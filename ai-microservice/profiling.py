@@ -0,0 +1,132 @@
+# BlueCarbon Ledger - AI Microservice
+# Stage timing spans (decode, validate, fetch_imagery, inference, postprocess, serialize)
+# and an on-demand cProfile hook that writes sampled request profiles to PROFILE_DIR
+
+import os
+import time
+import uuid
+import cProfile
+import itertools
+import threading
+import logging
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+STAGE_TIMINGS_ENABLED = os.getenv('STAGE_TIMINGS_ENABLED', 'true').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', '')  # empty = profiler off
+PROFILE_SAMPLE_RATE = int(os.getenv('PROFILE_SAMPLE_RATE', 0))  # profile 1 in N requests; 0 = only on request
+PROFILE_HEADER = 'X-Profile'  # 'X-Profile: 1' profiles that request (authenticated callers only)
+
+STAGES = ('decode', 'validate', 'fetch_imagery', 'inference', 'postprocess', 'serialize')
+
+
+class StageTimings:
+    """Monotonic (perf_counter) spans of one request or computation; repeated stages add up"""
+
+    __slots__ = ('spans',)
+
+    def __init__(self):
+        self.spans = {}
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[stage] = self.spans.get(stage, 0.0) + time.perf_counter() - started
+
+    def as_dict(self):
+        """Seconds per stage, in STAGES order"""
+        return {stage: round(self.spans[stage], 6) for stage in STAGES if stage in self.spans}
+
+
+class _DisabledTimings:
+    """Stand-in when STAGE_TIMINGS_ENABLED is off: spans cost one attribute lookup"""
+
+    __slots__ = ()
+    spans = {}
+    _null_span = nullcontext()
+
+    def span(self, stage):
+        return self._null_span
+
+    def as_dict(self):
+        return {}
+
+
+DISABLED_TIMINGS = _DisabledTimings()
+
+
+def merge_timings(*timings):
+    """Add up {stage: seconds} dicts, in STAGES order"""
+    merged = {}
+    for spans in timings:
+        for stage, seconds in spans.items():
+            merged[stage] = merged.get(stage, 0.0) + seconds
+    return {stage: round(merged[stage], 6) for stage in STAGES if stage in merged}
+
+
+def new_timings(enabled=STAGE_TIMINGS_ENABLED):
+    return StageTimings() if enabled else DISABLED_TIMINGS
+
+
+class RequestProfiler:
+    """
+    Runs cProfile for 1 in `sample_rate` requests, or for requests that ask for it,
+    and writes each profile as <name>-<time>-<id>.prof (open with pstats or snakeviz).
+    One request is profiled at a time; requests arriving meanwhile are not profiled.
+    cProfile only sees the thread it runs on, so work handed to a pool shows as waiting.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.enabled = bool(directory)
+        self._requests = itertools.count(1)
+        self._active = threading.Lock()
+        self._written = 0
+        self._skipped = 0
+
+    def start(self, requested=False):
+        """Return a running cProfile.Profile for this request, or None"""
+        if not self.enabled:
+            return None
+        sampled = self.sample_rate > 0 and next(self._requests) % self.sample_rate == 0
+        if not (requested or sampled):
+            return None
+        if not self._active.acquire(blocking=False):
+            self._skipped += 1
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile, name):
+        """Stop profile and write it out; returns the file path (None if writing failed)"""
+        profile.disable()
+        self._active.release()
+        path = os.path.join(self.directory, f"{name}-{int(time.time())}-{uuid.uuid4().hex[:8]}.prof")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(path)
+        except OSError as e:
+            logger.error(f"Could not write profile {path}: {str(e)}")
+            return None
+        self._written += 1
+        logger.info(f"Wrote request profile {path}")
+        return path
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'directory': self.directory or None,
+            'sample_rate': self.sample_rate,
+            'profiles_written': self._written,
+            'skipped_busy': self._skipped
+        }
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,339 @@
+# BlueCarbon Ledger - AI Microservice
+# MRV and compliance report artifacts: rendered (JSON and HTML) on a background thread into a
+# content-addressed store, and served with ETag / 304 and byte ranges
+#
+# Layout under REPORT_STORE_DIR:
+#   blobs/<aa>/<sha256>         artifact bytes named by their SHA-256 (identical artifacts stored once)
+#   reports/<report_id>.json    manifest: report id, generated_at and the run fields of the result,
+#                               plus {format: {digest, size, content_type}}; written last
+# Artifacts hold only the result's content, never per-run fields (ids, timestamps, node), so
+# identical results (deterministic re-runs, repeat re-verifications) share their blobs.
+# Blobs and manifests are written to a temporary file and renamed, so readers (and other
+# gunicorn workers sharing the directory) never see a partial file.
+
+import os
+import re
+import html
+import json
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+REPORT_STORE_DIR = os.getenv('REPORT_STORE_DIR', '')  # empty disables reports (report_url is null)
+REPORT_BASE_URL = os.getenv('REPORT_BASE_URL', '')  # prefix of report_url, e.g. https://ai.example.org
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 1))
+REPORT_MAX_PENDING = int(os.getenv('REPORT_MAX_PENDING', 1000))  # reports waiting to render; more are dropped
+REPORT_CHUNK_BYTES = int(os.getenv('REPORT_CHUNK_BYTES', 256 * 1024))  # read size when streaming a download
+REPORT_MANIFEST_CACHE_ENTRIES = int(os.getenv('REPORT_MANIFEST_CACHE_ENTRIES', 4096))
+
+REPORT_FORMATS = {'html': 'text/html; charset=utf-8', 'json': 'application/json'}
+DEFAULT_REPORT_FORMAT = 'html'
+REPORT_TITLES = {'verify': 'MRV Verification Report', 'reverify': 'Compliance Re-verification Report'}
+REPORT_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+# Reports never change once written, so clients may keep them for as long as they like
+REPORT_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+# Fields of a verify/reverify result left out of its report
+REPORT_EXCLUDED_FIELDS = ('timings', 'report_url', 'analysis_report_url')
+# Fields that differ on every run: kept in the manifest, out of the artifacts
+REPORT_RUN_FIELDS = ('mrv_id', 'timestamp', 'processing_time_seconds', 'processing_node_id')
+
+Artifact = namedtuple('Artifact', ['path', 'digest', 'size', 'content_type', 'filename'])
+
+
+def render_json(document):
+    return dumps(document)
+
+
+def _html_rows(value, prefix=''):
+    """(dotted field, text) rows for a nested payload; lists of scalars are joined"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _html_rows(item, f'{prefix}.{key}' if prefix else str(key))
+    elif isinstance(value, list) and all(not isinstance(item, (dict, list)) for item in value):
+        yield prefix, ', '.join(str(item) for item in value)
+    elif isinstance(value, list):
+        yield prefix, json.dumps(value, default=str)
+    else:
+        yield prefix, '' if value is None else str(value)
+
+
+def render_html(document):
+    """A self-contained HTML page (prints to PDF from any browser) with one row per result field"""
+    title = REPORT_TITLES.get(document['report_type'], 'Report')
+    rows = ''.join(
+        f'<tr><th>{html.escape(field)}</th><td>{html.escape(text)}</td></tr>\n'
+        for field, text in _html_rows(document['result'])
+    )
+    return (
+        '<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8">'
+        f'<title>{html.escape(title)} - {html.escape(str(document["project_id"]))}</title>'
+        '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}'
+        'th,td{border:1px solid #ccc;padding:4px 8px;text-align:left;vertical-align:top}'
+        'th{background:#f4f4f4;font-weight:normal;white-space:nowrap}</style></head><body>\n'
+        f'<h1>{html.escape(title)}</h1>\n'
+        f'<p>Project {html.escape(str(document["project_id"]))}</p>\n'
+        f'<table>\n{rows}</table>\n</body></html>\n'
+    ).encode('utf-8')
+
+
+RENDERERS = {'html': render_html, 'json': render_json}
+
+
+def parse_range(header, size):
+    """
+    Inclusive (start, end) of a single 'bytes=' Range header, or None to send the whole
+    body (no header, several ranges or a malformed one); raises ValueError when unsatisfiable
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    if not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError('range not satisfiable')
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('range not satisfiable')
+    return start, min(end, size - 1)
+
+
+def etag_matches(header, etag):
+    """If-None-Match check (weak comparison, as RFC 9110 asks for GET)"""
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(candidate.strip().removeprefix('W/') == etag for candidate in header.split(','))
+
+
+class ReportStore:
+    """
+    Renders reports on REPORT_WORKERS background threads and stores every artifact once,
+    under its SHA-256. submit() only enqueues, so it adds nothing to the request that
+    asks for the report; a report id is rendered at most once. Artifacts are rendered from
+    the result without its run fields, so reports of identical results share blobs.
+    """
+
+    def __init__(self, directory=REPORT_STORE_DIR, base_url=REPORT_BASE_URL, workers=REPORT_WORKERS,
+                 max_pending=REPORT_MAX_PENDING, chunk_bytes=REPORT_CHUNK_BYTES,
+                 manifest_cache_entries=REPORT_MANIFEST_CACHE_ENTRIES):
+        self.directory = directory
+        self.base_url = base_url.rstrip('/')
+        self.workers = workers
+        self.max_pending = max_pending
+        self.chunk_bytes = chunk_bytes
+        self.manifest_cache_entries = manifest_cache_entries
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = set()
+        self._manifests = OrderedDict()  # report_id -> manifest (immutable once written)
+        self._counters = {
+            'submitted': 0, 'rendered': 0, 'already_rendered': 0, 'dropped': 0, 'failed': 0,
+            'blobs_written': 0, 'blobs_deduplicated': 0, 'bytes_written': 0,
+            'downloads': 0, 'not_modified': 0, 'partial': 0
+        }
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def url_for(self, report_id):
+        return f'{self.base_url}/api/mrv/reports/{report_id}'
+
+    def submit(self, report_id, report_type, project_id, result):
+        """Queue a report for rendering; returns its URL (None when reports are disabled)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            executor = self._get_executor()
+            if report_id in self._pending:
+                return self.url_for(report_id)
+            if len(self._pending) >= self.max_pending:
+                self._counters['dropped'] += 1
+                logger.warning(f"Report queue full, dropping report {report_id}")
+                return None
+            self._pending.add(report_id)
+            self._counters['submitted'] += 1
+        executor.submit(self._render, report_id, report_type, project_id, result)
+        return self.url_for(report_id)
+
+    def _get_executor(self):
+        # One pool per process: a pool (and pending set) inherited through fork is stale
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report-render')
+            self._pid = os.getpid()
+            self._pending.clear()
+        return self._executor
+
+    def pending(self, report_id):
+        with self._lock:
+            return report_id in self._pending
+
+    def _render(self, report_id, report_type, project_id, result):
+        try:
+            if os.path.exists(self._manifest_path(report_id)):
+                self._count('already_rendered')
+                return
+            content = {field: value for field, value in result.items()
+                       if field not in REPORT_EXCLUDED_FIELDS and field not in REPORT_RUN_FIELDS}
+            document = {'report_type': report_type, 'project_id': project_id, 'result': content}
+            manifest = {
+                'report_id': report_id,
+                'report_type': report_type,
+                'project_id': project_id,
+                'generated_at': datetime.now().isoformat(),
+                'run': {field: result[field] for field in REPORT_RUN_FIELDS if field in result},
+                'formats': {}
+            }
+            for report_format, render in RENDERERS.items():
+                data = render(document)
+                manifest['formats'][report_format] = {
+                    'digest': self._write_blob(data),
+                    'size': len(data),
+                    'content_type': REPORT_FORMATS[report_format]
+                }
+            self._write_atomic(self._manifest_path(report_id), json.dumps(manifest).encode('utf-8'))
+            self._count('rendered')
+        except Exception as e:
+            self._count('failed')
+            logger.error(f"Rendering report {report_id} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending.discard(report_id)
+
+    def _write_blob(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            self._count('blobs_deduplicated')
+        else:
+            self._write_atomic(path, data)
+            self._count('blobs_written')
+            self._count('bytes_written', len(data))
+        return digest
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, 'blobs', digest[:2], digest)
+
+    def _manifest_path(self, report_id):
+        return os.path.join(self.directory, 'reports', f'{report_id}.json')
+
+    def _manifest(self, report_id):
+        with self._lock:
+            manifest = self._manifests.get(report_id)
+            if manifest is not None:
+                self._manifests.move_to_end(report_id)
+                return manifest
+        try:
+            with open(self._manifest_path(report_id), 'rb') as f:
+                manifest = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._manifests[report_id] = manifest
+            if len(self._manifests) > self.manifest_cache_entries:
+                self._manifests.popitem(last=False)
+        return manifest
+
+    def artifact(self, report_id, report_format=DEFAULT_REPORT_FORMAT):
+        """The stored artifact of a report in report_format, or None when there is none (yet)"""
+        if not self.enabled or not REPORT_ID_PATTERN.match(report_id):
+            return None
+        manifest = self._manifest(report_id)
+        if manifest is None or report_format not in manifest['formats']:
+            return None
+        entry = manifest['formats'][report_format]
+        return Artifact(self._blob_path(entry['digest']), entry['digest'], entry['size'], entry['content_type'],
+                        f'{report_id}.{report_format}')
+
+    def conditional(self, artifact, request_headers):
+        """
+        Status, response headers and inclusive byte range (None for no body) of a download:
+        304 when If-None-Match holds the ETag, 206 for a satisfiable Range (unless If-Range
+        names another version), 416 for an unsatisfiable one, 200 otherwise
+        """
+        etag = f'"{artifact.digest}"'
+        headers = {
+            'ETag': etag,
+            'Cache-Control': REPORT_CACHE_CONTROL,
+            'Accept-Ranges': 'bytes',
+            'Content-Disposition': f'inline; filename="{artifact.filename}"'
+        }
+        if etag_matches(request_headers.get('If-None-Match'), etag):
+            self._count('not_modified')
+            return 304, headers, None
+
+        range_header = request_headers.get('Range')
+        if_range = request_headers.get('If-Range')
+        if if_range and if_range.strip() != etag:
+            range_header = None
+        try:
+            byte_range = parse_range(range_header, artifact.size)
+        except ValueError:
+            return 416, {**headers, 'Content-Range': f'bytes */{artifact.size}'}, None
+
+        self._count('downloads')
+        if byte_range is None:
+            return 200, {**headers, 'Content-Length': str(artifact.size)}, (0, artifact.size - 1)
+        start, end = byte_range
+        self._count('partial')
+        return 206, {
+            **headers,
+            'Content-Range': f'bytes {start}-{end}/{artifact.size}',
+            'Content-Length': str(end - start + 1)
+        }, byte_range
+
+    def iter_bytes(self, artifact, start, end):
+        """Stream bytes start..end (inclusive) of an artifact in chunk_bytes reads"""
+        remaining = end - start + 1
+        with open(artifact.path, 'rb') as f:
+            f.seek(start)
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_bytes, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'pending': len(self._pending),
+                'max_pending': self.max_pending,
+                'cached_manifests': len(self._manifests),
+                **self._counters
+            }
+
+
+report_store = ReportStore()
@@ -0,0 +1,232 @@
+# BlueCarbon Ledger - AI Microservice
+# Append-only, segment-rotated log of verification results (gzip NDJSON)
+#
+# Layout under RESULTS_LOG_DIR:
+#   results-<YYYYmmddTHHMMSS>-<pid>-<seq>.ndjson.gz   one segment, written by one process
+#   <segment>.meta.json                               written when the segment is closed:
+#                                                     first/last recorded_at and record count
+# Every line is one flat record with fixed leading columns (recorded_at, job_type,
+# project_id, project_type, compliance_flag, model_version) followed by the full result.
+# Each line is sync-flushed, so readers see it immediately; gzip members stay valid
+# after a crash up to the last complete line.
+
+import os
+import re
+import glob
+import gzip
+import json
+import zlib
+import threading
+import logging
+from datetime import datetime
+
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+RESULTS_LOG_DIR = os.getenv('RESULTS_LOG_DIR', '')  # empty disables the results log and export
+RESULTS_LOG_SEGMENT_BYTES = int(os.getenv('RESULTS_LOG_SEGMENT_BYTES', 64 * 1024 * 1024))  # compressed size before rotating
+RESULTS_LOG_READ_CHUNK_BYTES = int(os.getenv('RESULTS_LOG_READ_CHUNK_BYTES', 256 * 1024))
+
+SEGMENT_PATTERN = re.compile(r'^results-(\d{8}T\d{6})-(\d+)-(\d+)\.ndjson\.gz$')
+RESULT_COLUMNS = ('recorded_at', 'job_type', 'project_id', 'project_type', 'compliance_flag', 'model_version')
+
+
+class ResultsLog:
+    """
+    Appends one record per verification result. Each process writes its own
+    segment (no interleaving between gunicorn workers); a segment is closed and
+    a new one started once it reaches segment_bytes on disk.
+    """
+
+    def __init__(self, directory=RESULTS_LOG_DIR, segment_bytes=RESULTS_LOG_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._file = None
+        self._gzip = None
+        self._path = None
+        self._pid = None
+        self._sequence = 0
+        self._first_recorded_at = None
+        self._last_recorded_at = None
+        self._segment_records = 0
+        self._counters = {'records': 0, 'segments_opened': 0, 'segments_closed': 0, 'errors': 0}
+
+    @property
+    def enabled(self):
+        return bool(self.directory)
+
+    def append(self, job_type, project_id, project_type, result):
+        """
+        Append one result; failures are logged and counted, never raised to the caller.
+        project_id comes from the request: verify results do not carry it.
+        """
+        if not self.enabled:
+            return
+        recorded_at = datetime.now().isoformat()
+        record = {
+            'recorded_at': recorded_at,
+            'job_type': job_type,
+            'project_id': project_id,
+            'project_type': project_type,
+            'compliance_flag': result.get('compliance_flag'),
+            'model_version': result.get('model_version'),
+            'result': result
+        }
+        line = dumps(record) + b'\n'
+
+        with self._lock:
+            try:
+                self._ensure_segment()
+                self._gzip.write(line)
+                # Sync flush: the line is decodable from disk now, without closing the member
+                self._gzip.flush(zlib.Z_SYNC_FLUSH)
+                self._file.flush()
+
+                if self._first_recorded_at is None:
+                    self._first_recorded_at = recorded_at
+                self._last_recorded_at = recorded_at
+                self._segment_records += 1
+                self._counters['records'] += 1
+
+                if self._file.tell() >= self.segment_bytes:
+                    self._close_segment()
+            except OSError as e:
+                self._counters['errors'] += 1
+                logger.warning(f"Results log append failed: {str(e)}")
+
+    def _ensure_segment(self):
+        """Open a segment lazily, and a fresh one in a forked child (handles must not cross a fork)"""
+        if self._gzip is not None and self._pid == os.getpid():
+            return
+        if self._pid != os.getpid():
+            # Inherited from the parent: drop without closing so the parent's segment is untouched
+            self._file = self._gzip = None
+            self._sequence = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._pid = os.getpid()
+        self._sequence += 1
+        name = f"results-{datetime.now().strftime('%Y%m%dT%H%M%S')}-{self._pid}-{self._sequence}.ndjson.gz"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path, 'ab')
+        self._gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self._file)
+        self._first_recorded_at = self._last_recorded_at = None
+        self._segment_records = 0
+        self._counters['segments_opened'] += 1
+
+    def _close_segment(self):
+        self._gzip.close()
+        self._file.close()
+        with open(f'{self._path}.meta.json', 'w') as f:
+            json.dump({
+                'first_recorded_at': self._first_recorded_at,
+                'last_recorded_at': self._last_recorded_at,
+                'records': self._segment_records
+            }, f)
+        self._gzip = self._file = None
+        self._counters['segments_closed'] += 1
+
+    def close(self):
+        with self._lock:
+            if self._gzip is not None and self._pid == os.getpid():
+                self._close_segment()
+
+    def segments(self):
+        """Segment paths, oldest first"""
+        if not self.enabled:
+            return []
+        paths = []
+        for path in glob.glob(os.path.join(self.directory, 'results-*.ndjson.gz')):
+            match = SEGMENT_PATTERN.match(os.path.basename(path))
+            if match:
+                paths.append((match.group(1), int(match.group(2)), int(match.group(3)), path))
+        return [path for *_, path in sorted(paths)]
+
+    def iter_lines(self, project_id=None, job_type=None, compliance_flag=None, since=None, until=None):
+        """
+        Yield matching records as encoded NDJSON lines (bytes), segment by segment and
+        line by line, so memory stays flat however long the history is. since/until
+        are ISO timestamps compared with recorded_at (since inclusive, until exclusive).
+        """
+        filters = {'project_id': project_id, 'job_type': job_type, 'compliance_flag': compliance_flag}
+        filters = {column: value for column, value in filters.items() if value is not None}
+        # Cheap byte test before decoding a line; the decoded record is still checked exactly
+        needles = [dumps({column: value})[1:-1] for column, value in filters.items()]
+
+        for path in self.segments():
+            if not self._segment_in_range(path, since, until):
+                continue
+            for line in self._read_segment(path):
+                if not all(needle in line for needle in needles):
+                    continue
+                record = json.loads(line)
+                if any(record.get(column) != value for column, value in filters.items()):
+                    continue
+                if since is not None and record['recorded_at'] < since:
+                    continue
+                if until is not None and record['recorded_at'] >= until:
+                    continue
+                yield line
+
+    @staticmethod
+    def _segment_in_range(path, since, until):
+        """Skip closed segments whose recorded_at range misses [since, until)"""
+        try:
+            with open(f'{path}.meta.json') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return True  # active or unindexed segment: scan it
+        if since is not None and meta['last_recorded_at'] and meta['last_recorded_at'] < since:
+            return False
+        if until is not None and meta['first_recorded_at'] and meta['first_recorded_at'] >= until:
+            return False
+        return True
+
+    @staticmethod
+    def _read_segment(path):
+        """Complete lines of one segment; tolerates the unterminated gzip member of an active segment"""
+        decompressor = zlib.decompressobj(wbits=47)  # auto-detect gzip header
+        pending = b''
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(RESULTS_LOG_READ_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    data = decompressor.decompress(chunk)
+                    # A closed segment may be followed by more gzip members (appended after reopen)
+                    while decompressor.eof and decompressor.unused_data:
+                        rest = decompressor.unused_data
+                        decompressor = zlib.decompressobj(wbits=47)
+                        data += decompressor.decompress(rest)
+                    lines = (pending + data).split(b'\n')
+                    pending = lines.pop()
+                    for line in lines:
+                        if line:
+                            yield line + b'\n'
+        except (OSError, zlib.error) as e:
+            logger.warning(f"Results log segment {path} unreadable past this point: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'active_segment': os.path.basename(self._path) if self._gzip is not None else None,
+                **self._counters
+            }
+
+
+def gzip_stream(lines, level=6):
+    """Compress an iterable of byte lines into a gzip stream, yielding compressed chunks as they fill"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for line in lines:
+        chunk = compressor.compress(line)
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+results_log = ResultsLog()
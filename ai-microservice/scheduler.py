@@ -0,0 +1,324 @@
+# BlueCarbon Ledger - AI Microservice
+# Priority scheduler for re-verification work, mirroring ai_reverification_queue semantics
+
+import os
+import time
+import heapq
+import itertools
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from jobs import create_executor, JOB_EXECUTOR_TYPE, MAX_CONCURRENT_JOBS
+
+logger = logging.getLogger(__name__)
+
+# Same values as the reverification_type CHECK constraint in compliance-schema.sql
+REVERIFICATION_TYPES = ('THRESHOLD_BREACH', 'ALERT_TRIGGERED', 'MANUAL', 'SCHEDULED')
+
+# Types that are always dispatched ahead of everything else, regardless of aging
+URGENT_REVERIFICATION_TYPES = ('THRESHOLD_BREACH',)
+
+# Configuration
+SCHEDULER_MAX_WORKERS = int(os.getenv('SCHEDULER_MAX_WORKERS', MAX_CONCURRENT_JOBS))
+SCHEDULER_AGING_SECONDS = float(os.getenv('SCHEDULER_AGING_SECONDS', 60))  # wait that raises priority by one level
+SCHEDULER_RETRY_BACKOFF_SECONDS = float(os.getenv('SCHEDULER_RETRY_BACKOFF_SECONDS', 5))
+SCHEDULER_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv('SCHEDULER_RETRY_BACKOFF_MAX_SECONDS', 300))
+SCHEDULER_TYPE_LIMITS = os.getenv('SCHEDULER_TYPE_LIMITS', '')  # e.g. "SCHEDULED=2,MANUAL=3"
+SCHEDULER_WAIT_SAMPLES = int(os.getenv('SCHEDULER_WAIT_SAMPLES', 1000))
+
+DEFAULT_PRIORITY = 5
+DEFAULT_MAX_RETRIES = 3
+
+
+def parse_type_limits(spec, max_workers):
+    """
+    Build per-type concurrency caps from "TYPE=N,..."
+    SCHEDULED defaults to one less than the pool so urgent work always finds a free worker
+    """
+    limits = {reverification_type: max_workers for reverification_type in REVERIFICATION_TYPES}
+    limits['SCHEDULED'] = max(1, max_workers - 1)
+
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        name = name.strip().upper()
+        if name not in limits:
+            raise ValueError(f'Unknown reverification_type in SCHEDULER_TYPE_LIMITS: {name}')
+        limits[name] = max(1, int(value))
+
+    return limits
+
+
+def parse_scheduled_for(value):
+    """Convert an ISO-8601 scheduled_for timestamp into seconds from now"""
+    if not value:
+        return 0
+    scheduled_for = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    now = datetime.now(scheduled_for.tzinfo) if scheduled_for.tzinfo else datetime.now()
+    return max(0, (scheduled_for - now).total_seconds())
+
+
+def normalize_queue_fields(priority, reverification_type, scheduled_for, max_retries):
+    """Validate queue fields; returns (priority, reverification_type, delay_seconds, max_retries)"""
+    if reverification_type not in REVERIFICATION_TYPES:
+        raise ValueError(f'Invalid reverification_type: {reverification_type}')
+
+    priority = int(priority)
+    if priority < 1 or priority > 10:
+        raise ValueError('priority must be between 1 (highest) and 10 (lowest)')
+
+    max_retries = int(max_retries)
+    if max_retries < 0:
+        raise ValueError('max_retries cannot be negative')
+
+    return priority, reverification_type, parse_scheduled_for(scheduled_for), max_retries
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class ScheduledJob:
+    """One queued re-verification, carrying the same bookkeeping as an ai_reverification_queue row"""
+
+    def __init__(self, fn, payload, priority, reverification_type, delay_seconds, max_retries, sequence):
+        now = time.monotonic()
+        self.fn = fn
+        self.payload = payload
+        self.priority = priority
+        self.reverification_type = reverification_type
+        self.max_retries = max_retries
+        self.retry_count = 0
+        self.sequence = sequence
+        self.queued_at = now
+        self.ready_at = now + delay_seconds
+        self.scheduled_for = (datetime.now() + timedelta(seconds=delay_seconds)).isoformat()
+        self.queue_status = 'QUEUED'
+        self.last_error_message = None
+        self.processing_started_at = None
+        self.future = Future()
+
+    def sort_key(self, aging_seconds):
+        """
+        Lower sorts first. Aging lowers the effective priority by one level per
+        aging_seconds waited; because every entry ages at the same rate this folds
+        into a static key (priority + ready_at / aging_seconds), so the heap never
+        needs re-sorting.
+        """
+        tier = 0 if self.reverification_type in URGENT_REVERIFICATION_TYPES else 1
+        return (tier, self.priority + self.ready_at / aging_seconds, self.sequence)
+
+    def snapshot(self):
+        return {
+            'priority': self.priority,
+            'reverification_type': self.reverification_type,
+            'queue_status': self.queue_status,
+            'scheduled_for': self.scheduled_for,
+            'processing_started_at': self.processing_started_at,
+            'retry_count': self.retry_count,
+            'max_retries': self.max_retries,
+            'last_error_message': self.last_error_message
+        }
+
+
+class ReverificationScheduler:
+    """
+    In-process priority queue for re-verification work.
+    Ready jobs sit in one heap per reverification_type so per-type concurrency caps
+    can be honoured without scanning past blocked entries; jobs scheduled for later
+    (or waiting on a retry backoff) sit in a separate heap keyed on ready time.
+    """
+
+    def __init__(self, max_workers=SCHEDULER_MAX_WORKERS, type_limits=None,
+                 aging_seconds=SCHEDULER_AGING_SECONDS, executor_type=JOB_EXECUTOR_TYPE):
+        self.max_workers = max_workers
+        self.type_limits = type_limits or parse_type_limits(SCHEDULER_TYPE_LIMITS, max_workers)
+        self.aging_seconds = aging_seconds
+        self.executor_type = executor_type
+
+        self._cond = threading.Condition()
+        self._ready = {reverification_type: [] for reverification_type in REVERIFICATION_TYPES}
+        self._delayed = []
+        self._running = {reverification_type: 0 for reverification_type in REVERIFICATION_TYPES}
+        self._running_total = 0
+        self._sequence = itertools.count()
+        self._executor = None
+        self._thread = None
+
+        self._wait_samples = {reverification_type: deque(maxlen=SCHEDULER_WAIT_SAMPLES)
+                              for reverification_type in REVERIFICATION_TYPES}
+        self._counters = {'submitted': 0, 'dispatched': 0, 'completed': 0, 'failed': 0, 'retried': 0}
+
+    def submit(self, fn, payload, priority=DEFAULT_PRIORITY, reverification_type='SCHEDULED',
+               scheduled_for=None, max_retries=DEFAULT_MAX_RETRIES):
+        """Queue fn(payload) and return its ScheduledJob; raises ValueError on bad queue fields"""
+        priority, reverification_type, delay_seconds, max_retries = normalize_queue_fields(
+            priority, reverification_type, scheduled_for, max_retries
+        )
+
+        entry = ScheduledJob(
+            fn, payload, priority, reverification_type,
+            delay_seconds, max_retries, next(self._sequence)
+        )
+
+        self._ensure_started()
+        with self._cond:
+            self._counters['submitted'] += 1
+            self._enqueue(entry)
+            self._cond.notify()
+
+        return entry
+
+    def _ensure_started(self):
+        """Start the dispatcher and its pool lazily so gunicorn forks first"""
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is None:
+                self._executor = create_executor(self.executor_type, self.max_workers, 'mrv-reverify')
+                self._thread = threading.Thread(target=self._dispatch_loop, name='reverify-scheduler', daemon=True)
+                self._thread.start()
+                logger.info(f"Re-verification scheduler started with {self.max_workers} workers, limits: {self.type_limits}")
+
+    def _enqueue(self, entry):
+        if entry.ready_at > time.monotonic():
+            heapq.heappush(self._delayed, (entry.ready_at, entry.sequence, entry))
+        else:
+            heapq.heappush(self._ready[entry.reverification_type], (entry.sort_key(self.aging_seconds), entry))
+
+    def _promote_due(self, now):
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, entry = heapq.heappop(self._delayed)
+            heapq.heappush(self._ready[entry.reverification_type], (entry.sort_key(self.aging_seconds), entry))
+
+    def _next_entry(self):
+        """Pop the best-ranked ready job whose type still has concurrency headroom"""
+        best_type = None
+        for reverification_type, heap in self._ready.items():
+            if not heap or self._running[reverification_type] >= self.type_limits[reverification_type]:
+                continue
+            if best_type is None or heap[0][0] < self._ready[best_type][0][0]:
+                best_type = reverification_type
+
+        if best_type is None:
+            return None
+        return heapq.heappop(self._ready[best_type])[1]
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    self._promote_due(now)
+
+                    entry = self._next_entry() if self._running_total < self.max_workers else None
+                    if entry is not None:
+                        break
+
+                    timeout = self._delayed[0][0] - now if self._delayed else None
+                    self._cond.wait(timeout)
+
+                if entry.retry_count == 0 and not entry.future.set_running_or_notify_cancel():
+                    continue
+
+                self._running[entry.reverification_type] += 1
+                self._running_total += 1
+                self._counters['dispatched'] += 1
+                self._wait_samples[entry.reverification_type].append(now - entry.ready_at)
+                entry.queue_status = 'PROCESSING'
+                entry.processing_started_at = datetime.now().isoformat()
+
+            try:
+                inner = self._executor.submit(entry.fn, entry.payload)
+            except Exception as e:
+                self._finish(entry, None, e)
+                continue
+            inner.add_done_callback(lambda f, entry=entry: self._finish(entry, f, None))
+
+    def _finish(self, entry, inner, submit_error):
+        error = submit_error if inner is None else inner.exception()
+
+        with self._cond:
+            self._running[entry.reverification_type] -= 1
+            self._running_total -= 1
+
+            if error is None:
+                entry.queue_status = 'COMPLETED'
+                self._counters['completed'] += 1
+            elif entry.retry_count < entry.max_retries:
+                backoff = min(SCHEDULER_RETRY_BACKOFF_MAX_SECONDS,
+                              SCHEDULER_RETRY_BACKOFF_SECONDS * (2 ** entry.retry_count))
+                entry.retry_count += 1
+                entry.last_error_message = str(error)
+                entry.queue_status = 'RETRY'
+                entry.ready_at = time.monotonic() + backoff
+                entry.scheduled_for = (datetime.now() + timedelta(seconds=backoff)).isoformat()
+                self._counters['retried'] += 1
+                self._enqueue(entry)
+                logger.warning(f"Re-verification for {entry.payload.get('project_id')} failed "
+                               f"(attempt {entry.retry_count}/{entry.max_retries + 1}), retrying in {backoff:.1f}s: {str(error)}")
+            else:
+                entry.queue_status = 'FAILED'
+                entry.last_error_message = str(error)
+                self._counters['failed'] += 1
+
+            self._cond.notify()
+
+        if entry.queue_status == 'COMPLETED':
+            entry.future.set_result(inner.result())
+        elif entry.queue_status == 'FAILED':
+            entry.future.set_exception(error)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._delayed) + sum(len(heap) for heap in self._ready.values())
+
+    def stats(self):
+        """Queue depth, concurrency and wait-time figures for /metrics"""
+        with self._cond:
+            now = time.monotonic()
+            depth_by_type = {reverification_type: len(heap) for reverification_type, heap in self._ready.items()}
+            for _, _, entry in self._delayed:
+                depth_by_type[entry.reverification_type] += 1
+
+            waiting = [entry.queued_at for heap in self._ready.values() for _, entry in heap]
+            oldest_wait = now - min(waiting) if waiting else 0
+
+            wait_times = {}
+            all_samples = []
+            for reverification_type, samples in self._wait_samples.items():
+                ordered = sorted(samples)
+                all_samples.extend(ordered)
+                wait_times[reverification_type] = {
+                    'samples': len(ordered),
+                    'p50_seconds': round(percentile(ordered, 0.5), 3),
+                    'p95_seconds': round(percentile(ordered, 0.95), 3),
+                    'max_seconds': round(ordered[-1], 3) if ordered else 0
+                }
+            all_samples.sort()
+
+            return {
+                'queue_depth': sum(depth_by_type.values()),
+                'queue_depth_by_type': depth_by_type,
+                'delayed': len(self._delayed),
+                'running': self._running_total,
+                'running_by_type': dict(self._running),
+                'max_workers': self.max_workers,
+                'concurrency_limits': dict(self.type_limits),
+                'oldest_queued_seconds': round(oldest_wait, 3),
+                'wait_time_seconds': {
+                    'average': round(sum(all_samples) / len(all_samples), 3) if all_samples else 0,
+                    'p50': round(percentile(all_samples, 0.5), 3),
+                    'p95': round(percentile(all_samples, 0.95), 3),
+                    'by_type': wait_times
+                },
+                **self._counters
+            }
+
+
+reverification_scheduler = ReverificationScheduler()
@@ -0,0 +1,244 @@
+# BlueCarbon Ledger - AI Microservice
+# JSON schemas of the request bodies, compiled once into validators. Bodies are checked before
+# anything is queued or processed; batch items are checked in one pass with an error per item.
+
+from jsonschema import Draft202012Validator
+from jsonschema.exceptions import best_match
+
+from scheduler import REVERIFICATION_TYPES
+
+POSITIVE_NUMBER = {'type': 'number', 'exclusiveMinimum': 0}
+
+# Structure only: ring closure, vertex limits and coordinate ranges are checked on the arrays
+# by geometry.project_polygons, which is much faster for large polygons
+COORDINATES = {
+    'description': 'coordinates must be a GeoJSON polygon or a list of [lon, lat] positions',
+    'anyOf': [
+        {
+            'type': 'object',
+            'required': ['type'],
+            'properties': {'type': {'enum': ['Polygon', 'MultiPolygon', 'Feature']}}
+        },
+        {'type': 'array', 'minItems': 1}
+    ]
+}
+ADDITIONAL_DATA = {
+    'type': ['object', 'null'],
+    'properties': {'project_area_hectares': POSITIVE_NUMBER}
+}
+PROJECT_FIELDS = {
+    'project_id': {'type': 'string', 'minLength': 1},
+    'project_type': {'type': 'string', 'minLength': 1},
+    'coordinates': COORDINATES,
+    'additional_data': ADDITIONAL_DATA
+}
+REQUIRED_PROJECT_FIELDS = ['project_id', 'coordinates', 'project_type']
+
+SCHEMAS = {
+    'verify': {
+        'type': 'object',
+        'required': REQUIRED_PROJECT_FIELDS,
+        'properties': PROJECT_FIELDS
+    },
+    'reverify': {
+        'type': 'object',
+        'required': REQUIRED_PROJECT_FIELDS,
+        'properties': {
+            **PROJECT_FIELDS,
+            'baseline_ndvi': {'type': 'number', 'exclusiveMinimum': 0, 'maximum': 1},
+            'baseline_co2_tons': POSITIVE_NUMBER,
+            'baseline_area_hectares': POSITIVE_NUMBER,
+            'reverification_type': {'enum': list(REVERIFICATION_TYPES)},
+            'priority': {'type': 'integer', 'minimum': 1, 'maximum': 10},
+            'max_retries': {'type': 'integer', 'minimum': 0},
+            'scheduled_for': {'type': ['string', 'null']}
+        }
+    },
+    'batch-verify': {
+        'type': 'object',
+        'required': ['projects'],
+        'properties': {
+            'projects': {'type': 'array', 'minItems': 1, 'description': 'Projects must be a non-empty array'},
+            'seed': {'type': ['integer', 'null'], 'minimum': 0}
+        }
+    },
+    # One entry of batch-verify's projects (scored from its type and area; no polygon needed)
+    'batch-item': {
+        'description': 'Project entry must be an object',
+        'type': 'object',
+        'properties': {
+            'project_id': {'type': 'string', 'minLength': 1},
+            'project_type': {'type': 'string', 'minLength': 1},
+            'coordinates': COORDINATES,
+            'additional_data': ADDITIONAL_DATA
+        }
+    },
+    # Columnar bodies are checked column by column; values are converted (and checked) by numpy
+    'change-observations': {
+        'type': 'object',
+        'required': ['project_id', 'acquired', 'ndvi'],
+        'properties': {
+            'project_id': {'type': 'array'},
+            'acquired': {'type': 'array'},
+            'ndvi': {'type': 'array'},
+            'area_hectares': {'type': ['array', 'null']}
+        }
+    },
+    'compliance-evaluate': {
+        'type': 'object',
+        'description': 'Provide either records (a list of objects) or columns (an object of lists)',
+        'oneOf': [{'required': ['records']}, {'required': ['columns']}],
+        'properties': {
+            'records': {'type': 'array'},
+            'columns': {'type': 'object', 'additionalProperties': {'type': 'array'}}
+        }
+    }
+}
+
+# Keywords compile_schema understands; a schema using anything else fails at import
+COMPILED_KEYWORDS = {
+    'description', 'type', 'enum', 'required', 'properties', 'additionalProperties', 'items',
+    'minimum', 'maximum', 'exclusiveMinimum', 'exclusiveMaximum', 'minLength', 'minItems', 'anyOf', 'oneOf'
+}
+TYPE_CHECKS = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'null': lambda value: value is None,
+    'boolean': lambda value: isinstance(value, bool),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'integer': lambda value: ((isinstance(value, int) and not isinstance(value, bool))
+                              or (isinstance(value, float) and value.is_integer()))
+}
+is_number = TYPE_CHECKS['number']
+
+
+def compile_schema(schema):
+    """
+    Compile a schema into a plain predicate with jsonschema's semantics for the keywords
+    above. It only says valid or not (a few microseconds per item); jsonschema explains
+    the failures.
+    """
+    unknown = set(schema) - COMPILED_KEYWORDS
+    if unknown:
+        raise ValueError(f"Schema keywords not supported by compile_schema: {', '.join(sorted(unknown))}")
+
+    checks = []
+    if 'type' in schema:
+        types = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        type_checks = [TYPE_CHECKS[name] for name in types]
+        checks.append(lambda value: any(check(value) for check in type_checks))
+    if 'enum' in schema:
+        if not all(isinstance(option, str) for option in schema['enum']):
+            raise ValueError('compile_schema only supports string enums')
+        allowed = frozenset(schema['enum'])
+        checks.append(lambda value: isinstance(value, str) and value in allowed)
+
+    bounds = {
+        'minimum': lambda value, bound: value >= bound,
+        'maximum': lambda value, bound: value <= bound,
+        'exclusiveMinimum': lambda value, bound: value > bound,
+        'exclusiveMaximum': lambda value, bound: value < bound
+    }
+    for keyword, within in bounds.items():
+        if keyword in schema:
+            checks.append(lambda value, within=within, bound=schema[keyword]: not is_number(value) or within(value, bound))
+    if 'minLength' in schema:
+        checks.append(lambda value, bound=schema['minLength']: not isinstance(value, str) or len(value) >= bound)
+    if 'minItems' in schema:
+        checks.append(lambda value, bound=schema['minItems']: not isinstance(value, list) or len(value) >= bound)
+    if 'items' in schema:
+        item_valid = compile_schema(schema['items'])
+        checks.append(lambda value: not isinstance(value, list) or all(item_valid(item) for item in value))
+
+    if 'required' in schema:
+        required = schema['required']
+        checks.append(lambda value: not isinstance(value, dict) or all(field in value for field in required))
+    properties = {field: compile_schema(subschema) for field, subschema in schema.get('properties', {}).items()}
+    extra_valid = compile_schema(schema['additionalProperties']) if 'additionalProperties' in schema else None
+    if properties or extra_valid:
+        def check_properties(value):
+            if not isinstance(value, dict):
+                return True
+            for field, field_value in value.items():
+                field_valid = properties.get(field, extra_valid)
+                if field_valid is not None and not field_valid(field_value):
+                    return False
+            return True
+        checks.append(check_properties)
+
+    if 'anyOf' in schema:
+        any_of = [compile_schema(subschema) for subschema in schema['anyOf']]
+        checks.append(lambda value: any(option(value) for option in any_of))
+    if 'oneOf' in schema:
+        one_of = [compile_schema(subschema) for subschema in schema['oneOf']]
+        checks.append(lambda value: sum(1 for option in one_of if option(value)) == 1)
+
+    def is_valid(value):
+        for check in checks:
+            if not check(value):
+                return False
+        return True
+    return is_valid
+
+
+# name -> (compiled predicate, jsonschema validator for the error messages)
+VALIDATORS = {}
+for name, schema in SCHEMAS.items():
+    Draft202012Validator.check_schema(schema)
+    VALIDATORS[name] = (compile_schema(schema), Draft202012Validator(schema))
+
+BOUND_MESSAGES = {
+    'minimum': 'must be at least {}',
+    'maximum': 'must be at most {}',
+    'exclusiveMinimum': 'must be greater than {}',
+    'exclusiveMaximum': 'must be less than {}',
+    'minLength': 'must have at least {} characters',
+    'minItems': 'must have at least {} items'
+}
+
+
+def error_message(error):
+    """One line for a ValidationError: the field and what is wrong with it (never the whole value)"""
+    path = '.'.join(str(part) for part in error.absolute_path)
+    if error.validator == 'required':
+        missing = next(field for field in error.validator_value if field not in error.instance)
+        return f"Missing required field: {path + '.' if path else ''}{missing}"
+
+    if 'description' in error.schema:
+        return error.schema['description']
+    if error.validator == 'type':
+        expected = error.validator_value
+        message = f"must be of type {' or '.join(expected) if isinstance(expected, list) else expected}"
+    elif error.validator == 'enum':
+        message = f"must be one of {', '.join(map(str, error.validator_value))}"
+    elif error.validator in ('minLength', 'minItems') and error.validator_value == 1:
+        message = 'must not be empty'
+    elif error.validator in BOUND_MESSAGES:
+        message = BOUND_MESSAGES[error.validator].format(error.validator_value)
+    else:
+        message = error.message
+    return f'Invalid {path}: {message}' if path else message
+
+
+def explain(validator, body):
+    error = best_match(validator.iter_errors(body))
+    return error_message(error) if error is not None else None
+
+
+def request_error(name, body):
+    """Validation message for a request body against schema `name`, or None when it is valid"""
+    is_valid, validator = VALIDATORS[name]
+    return None if is_valid(body) else explain(validator, body)
+
+
+def item_errors(name, items):
+    """Validate every item in one pass; returns {index: message} for the invalid ones"""
+    is_valid, validator = VALIDATORS[name]
+    errors = {}
+    for index, item in enumerate(items):
+        if not is_valid(item):
+            message = explain(validator, item)
+            if message is not None:
+                errors[index] = message
+    return errors
@@ -0,0 +1,148 @@
+# BlueCarbon Ledger - AI Microservice
+# JSON encoding and response shaping: orjson when installed (stdlib json otherwise),
+# static payload fragments encoded once, and ?fields= / ?view=summary projections
+
+import json
+
+import numpy as np
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder produces the same JSON, only slower
+    orjson = None
+
+# orjson.Fragment (3.9+) embeds already-encoded JSON in a larger document
+_FRAGMENTS = orjson is not None and hasattr(orjson, 'Fragment')
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_SUBCLASS) \
+    if orjson is not None else 0
+
+# Top-level keys returned by ?view=summary, per payload kind
+SUMMARY_VIEWS = {
+    'verify': (
+        'success', 'mrv_id', 'project_id', 'confidence_score', 'estimated_co2_tons',
+        'verified_area_hectares', 'report_url', 'model_version', 'timestamp'
+    ),
+    'reverify': (
+        'success', 'project_id', 'compliance_flag', 'current_ndvi', 'current_co2_tons',
+        'current_area_hectares', 'ai_confidence_score', 'ndvi_change_percent',
+        'co2_change_percent', 'area_change_percent', 'compliance_evaluation', 'model_version', 'timestamp'
+    )
+}
+VIEWS = ('full', 'summary')
+
+
+class StaticList(list):
+    """A list built once at startup and never mutated; its JSON is encoded once too"""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.encoded = orjson.dumps(list(self), option=_ORJSON_OPTIONS) if _FRAGMENTS else None
+
+
+class StaticDict(dict):
+    """A dict built once at startup and never mutated; its JSON is encoded once too"""
+
+    def __init__(self, items):
+        super().__init__(items)
+        self.encoded = orjson.dumps(dict(self), option=_ORJSON_OPTIONS) if _FRAGMENTS else None
+
+
+def _default(value):
+    """Encode what the JSON types do not cover (pre-encoded fragments, numpy, subclasses, anything else as str)"""
+    encoded = getattr(value, 'encoded', None)
+    if encoded is not None:
+        return orjson.Fragment(encoded)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    # OPT_PASSTHROUGH_SUBCLASS sends every dict/list/str/int subclass here, not only the static ones
+    for base in (dict, list, str, int, float):
+        if isinstance(value, base):
+            return base(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return str(value)
+
+
+def dumps(value):
+    """Encode value as compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(value, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider (app.json) backed by dumps/loads above, so jsonify uses the fast path"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Hand Flask the encoded bytes directly (no str round trip)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def parse_view(args):
+    """
+    Read ?fields=a,b.c and ?view=full|summary from request args.
+    Returns (fields, view) with fields a list of dotted paths or None; raises ValueError
+    """
+    view = args.get('view', 'full').lower()
+    if view not in VIEWS:
+        raise ValueError(f"view must be one of: {', '.join(VIEWS)}")
+
+    fields = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+    return fields, view
+
+
+def shape_payload(payload, kind, fields=None, view='full'):
+    """
+    Project a verify/reverify payload down to the requested keys. fields takes
+    dotted paths into nested objects (analysis_metadata.image_dates); view=summary
+    keeps SUMMARY_VIEWS[kind]. 'success' is always kept. Missing paths are skipped.
+    """
+    if not isinstance(payload, dict) or (fields is None and view == 'full'):
+        return payload
+
+    paths = list(SUMMARY_VIEWS.get(kind, ())) if view == 'summary' else []
+    paths.extend(fields or ())
+
+    shaped = {'success': payload['success']} if 'success' in payload else {}
+    for path in paths:
+        keys = path.split('.')
+        if not _has_path(payload, keys):
+            continue
+        source, target = payload, shaped
+        for key in keys[:-1]:
+            source = source[key]
+            if target.get(key) is source:
+                break  # the whole object is already selected
+            target = target.setdefault(key, {})
+        else:
+            target[keys[-1]] = source[keys[-1]]
+    return shaped
+
+
+def _has_path(payload, keys):
+    value = payload
+    for key in keys:
+        if not isinstance(value, dict) or key not in value:
+            return False
+        value = value[key]
+    return True
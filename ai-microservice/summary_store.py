@@ -0,0 +1,148 @@
+# BlueCarbon Ledger - AI Microservice
+# Per-project, per-tile imagery summaries (SQLite) for incremental re-verification
+
+import os
+import time
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+IMAGERY_SUMMARY_DB_PATH = os.getenv('IMAGERY_SUMMARY_DB_PATH', '')  # empty recomputes every tile on each reverify
+
+SUMMARY_FIELDS = ('acquired', 'path', 'ndvi_sum', 'pixel_count', 'area_hectares', 'vegetated_area_hectares')
+
+
+class TileSummaryStore:
+    """
+    Keeps the last summary computed for every (project, tile) plus the project's
+    first full observation, which later observations are compared against.
+    Rows are tied to a hash of the project polygon; a changed polygon starts over.
+    """
+
+    def __init__(self, db_path=IMAGERY_SUMMARY_DB_PATH):
+        self.db_path = db_path
+        self._db = None
+        self._db_pid = None
+        self._lock = threading.Lock()
+        self._counters = {'loads': 0, 'tiles_reused': 0, 'tiles_recomputed': 0, 'resets': 0, 'errors': 0}
+
+    @property
+    def enabled(self):
+        return bool(self.db_path)
+
+    def _connection(self):
+        """Open the database lazily, once per process (connections must not cross a fork)"""
+        if self._db is None or self._db_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS project_tile_summaries (
+                    project_id TEXT NOT NULL,
+                    tile_id TEXT NOT NULL,
+                    geometry_key TEXT NOT NULL,
+                    acquired TEXT NOT NULL,
+                    path TEXT,
+                    ndvi_sum REAL NOT NULL,
+                    pixel_count INTEGER NOT NULL,
+                    area_hectares REAL NOT NULL,
+                    vegetated_area_hectares REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (project_id, tile_id)
+                )
+            ''')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS project_imagery_reference (
+                    project_id TEXT PRIMARY KEY,
+                    geometry_key TEXT NOT NULL,
+                    ndvi_mean REAL NOT NULL,
+                    vegetated_area_hectares REAL NOT NULL,
+                    image_date TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._db_pid = os.getpid()
+        return self._db
+
+    def load(self, project_id, geometry_key):
+        """Return ({tile_id: summary}, reference or None) stored for this project and polygon"""
+        if not self.enabled:
+            return {}, None
+        try:
+            with self._lock:
+                db = self._connection()
+                self._counters['loads'] += 1
+                rows = db.execute(
+                    f'SELECT tile_id, geometry_key, {", ".join(SUMMARY_FIELDS)} FROM project_tile_summaries WHERE project_id = ?',
+                    (project_id,)
+                ).fetchall()
+                reference = db.execute(
+                    'SELECT geometry_key, ndvi_mean, vegetated_area_hectares, image_date FROM project_imagery_reference WHERE project_id = ?',
+                    (project_id,)
+                ).fetchone()
+
+                stale = any(row[1] != geometry_key for row in rows) or (reference and reference[0] != geometry_key)
+                if stale:
+                    # Polygon changed since the last observation - old tiles and reference no longer apply
+                    db.execute('DELETE FROM project_tile_summaries WHERE project_id = ?', (project_id,))
+                    db.execute('DELETE FROM project_imagery_reference WHERE project_id = ?', (project_id,))
+                    db.commit()
+                    self._counters['resets'] += 1
+                    return {}, None
+        except sqlite3.Error as e:
+            self._counters['errors'] += 1
+            logger.warning(f"Tile summary read failed for {project_id}: {str(e)}")
+            return {}, None
+
+        summaries = {
+            row[0]: {'tile_id': row[0], **dict(zip(SUMMARY_FIELDS, row[2:]))}
+            for row in rows
+        }
+        if reference is not None:
+            reference = {'ndvi_mean': reference[1], 'vegetated_area_hectares': reference[2], 'image_date': reference[3]}
+        return summaries, reference
+
+    def save(self, project_id, geometry_key, changed, reused, reference=None):
+        """Upsert the recomputed tile summaries (and the reference on a project's first observation)"""
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                db = self._connection()
+                now = time.time()
+                db.executemany(
+                    f'''INSERT OR REPLACE INTO project_tile_summaries
+                        (project_id, tile_id, geometry_key, {", ".join(SUMMARY_FIELDS)}, updated_at)
+                        VALUES (?, ?, ?, {", ".join("?" for _ in SUMMARY_FIELDS)}, ?)''',
+                    [
+                        (project_id, summary['tile_id'], geometry_key,
+                         *(summary[field] for field in SUMMARY_FIELDS), now)
+                        for summary in changed
+                    ]
+                )
+                if reference is not None:
+                    db.execute(
+                        '''INSERT OR IGNORE INTO project_imagery_reference
+                           (project_id, geometry_key, ndvi_mean, vegetated_area_hectares, image_date, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?)''',
+                        (project_id, geometry_key, reference['ndvi_mean'],
+                         reference['vegetated_area_hectares'], reference['image_date'], now)
+                    )
+                db.commit()
+                self._counters['tiles_recomputed'] += len(changed)
+                self._counters['tiles_reused'] += reused
+        except sqlite3.Error as e:
+            self._counters['errors'] += 1
+            logger.warning(f"Tile summary write failed for {project_id}: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {'enabled': self.enabled, **self._counters}
+
+
+tile_summaries = TileSummaryStore()
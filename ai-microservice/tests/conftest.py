@@ -0,0 +1,53 @@
+# BlueCarbon Ledger - AI Microservice
+# Tests import the service modules directly: python -m pytest ai-microservice/tests
+# Configuration is read at import, so the test environment is set before anything is imported.
+
+import os
+import sys
+import uuid
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEST_DATA_DIR = tempfile.mkdtemp(prefix='mrv-tests-')
+TEST_API_KEY = 'test-key'
+
+os.environ.update({
+    'AI_SERVICE_KEY': TEST_API_KEY,
+    'SIMULATED_LATENCY': 'false',
+    'ADMISSION_ENABLED': 'false',
+    'RESULTS_LOG_DIR': os.path.join(TEST_DATA_DIR, 'results'),
+    'REPORT_STORE_DIR': os.path.join(TEST_DATA_DIR, 'reports')
+})
+
+MANGROVE = [[-80.19, 25.76], [-80.18, 25.76], [-80.18, 25.77], [-80.19, 25.77], [-80.19, 25.76]]
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth():
+    return {'Authorization': f'Bearer {TEST_API_KEY}'}
+
+
+@pytest.fixture
+def project():
+    """A fresh verify request body (a new project_id each time, so results are not cached)"""
+    return {
+        'project_id': f'test-{uuid.uuid4().hex[:8]}',
+        'project_type': 'mangrove_restoration',
+        'coordinates': MANGROVE,
+        'additional_data': {'project_area_hectares': 100}
+    }
@@ -0,0 +1,130 @@
+import threading
+
+import pytest
+
+from admission import AdmissionController, TokenBucketLimiter
+from conftest import TEST_API_KEY
+
+
+def controller(**overrides):
+    options = {'max_in_flight': 1, 'max_queue': 1, 'queue_timeout': 0.05, 'reserved_slots': 1, 'long_slots': 1,
+               'limiter': TokenBucketLimiter(rate=0), 'enabled': True, **overrides}
+    return AdmissionController(**options)
+
+
+def test_work_slots_and_queue():
+    gate = controller()
+    ticket, rejection = gate.admit('a')
+    assert rejection is None
+
+    # The queued request times out while the slot is held
+    _, rejection = gate.admit('a')
+    assert (rejection.status, rejection.reason) == (503, 'queue_timeout')
+
+    # A released slot passes straight to the waiter
+    waiting = {}
+    waiter = threading.Thread(target=lambda: waiting.update(result=gate.admit('a')))
+    gate.queue_timeout = 5
+    waiter.start()
+    while gate.stats()['queued'] == 0:
+        pass
+    ticket.release()
+    waiter.join()
+    next_ticket, rejection = waiting['result']
+    assert rejection is None and gate.stats()['in_flight'] == 1
+    next_ticket.release()
+    next_ticket.release()  # idempotent
+    assert gate.stats()['in_flight'] == 0
+
+
+def test_long_pool_does_not_take_work_slots():
+    gate = controller()
+    long_ticket, rejection = gate.admit('a', 'long')
+    assert rejection is None
+
+    work_ticket, rejection = gate.admit('a')
+    assert rejection is None
+
+    _, rejection = gate.admit('a', 'long')
+    assert (rejection.status, rejection.reason) == (503, 'long_full')
+
+    long_ticket.release()
+    work_ticket.release()
+    stats = gate.stats()
+    assert (stats['in_flight'], stats['long_in_flight'], stats['long_full']) == (0, 0, 1)
+
+
+def test_reserved_pool_skips_rate_limit():
+    gate = controller(limiter=TokenBucketLimiter(rate=0.001, burst=1))
+    gate.admit('a')[0].release()
+    assert gate.admit('a')[1].status == 429
+    ticket, rejection = gate.admit('a', 'reserved')
+    assert rejection is None
+    ticket.release()
+
+
+def test_unknown_pool():
+    with pytest.raises(ValueError):
+        controller().admit('a', 'bulk')
+
+
+@pytest.fixture
+def admission_on(monkeypatch):
+    """Turn the app's admission control on with one slot per pool"""
+    from app import admission
+    for field, value in {'enabled': True, 'max_in_flight': 1, 'max_queue': 0, 'long_slots': 1,
+                         'limiter': TokenBucketLimiter(rate=0)}.items():
+        monkeypatch.setattr(admission, field, value)
+    return admission
+
+
+def test_streamed_export_holds_a_long_slot_until_closed(client, auth, project, admission_on):
+    assert client.post('/api/mrv/verify', json=project, headers=auth).status_code == 200
+
+    response = client.get('/api/mrv/results/export', headers=auth, buffered=False)
+    assert response.status_code == 200
+    assert admission_on.stats()['long_in_flight'] == 1
+
+    # Work requests still get in while the stream is open; a second stream does not
+    assert client.post('/api/mrv/verify', json=dict(project, project_id=project['project_id'] + '-2'),
+                       headers=auth).status_code == 200
+    assert client.get('/api/mrv/results/export', headers=auth).status_code == 503
+
+    b''.join(response.response)
+    response.close()
+    stats = admission_on.stats()
+    assert (stats['long_in_flight'], stats['in_flight']) == (0, 0)
+
+
+def test_job_long_poll_uses_the_long_pool(client, auth, project, admission_on):
+    accepted = client.post('/api/mrv/verify?async=true', json=project, headers=auth)
+    assert accepted.status_code == 202
+    status_url = accepted.get_json()['status_url']
+
+    assert client.get(f'{status_url}?wait=5', headers=auth).get_json()['status'] == 'completed'
+    assert client.get(status_url, headers=auth).status_code == 200
+    stats = admission_on.stats()
+    assert (stats['long_in_flight'], stats['in_flight']) == (0, 0)
+
+
+def test_rate_limit_keys_ignore_unvalidated_tokens(client, auth, admission_on, monkeypatch):
+    monkeypatch.setattr(admission_on, 'limiter', TokenBucketLimiter(rate=0.001, burst=1, max_clients=10))
+
+    # Made-up tokens share the address's bucket instead of getting one each
+    assert client.get('/api/mrv/model-info', headers={'Authorization': 'Bearer made-up-1'}).status_code == 200
+    assert client.get('/api/mrv/model-info', headers={'Authorization': 'Bearer made-up-2'}).status_code == 429
+    assert admission_on.limiter.stats()['tracked_clients'] == 1
+
+    # A valid key has its own bucket
+    assert client.get('/api/mrv/model-info', headers={'Authorization': f'Bearer {TEST_API_KEY}'}).status_code == 200
+    assert admission_on.limiter.stats()['tracked_clients'] == 2
+
+
+def test_admission_pools():
+    from app import admission_pool
+    assert admission_pool('health_check', {}) == 'reserved'
+    assert admission_pool('get_report', {}) == 'long'
+    assert admission_pool('get_job', {'wait': '30'}) == 'long'
+    assert admission_pool('get_job', {}) == 'work'
+    assert admission_pool('get_job', {'wait': 'soon'}) == 'work'
+    assert admission_pool('verify_project', {'wait': '30'}) == 'work'
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+import app as service
+from analysis import (
+    PROJECT_TYPES, HEALTH_LEVELS, COMPLIANCE_FLAGS, REVERIFICATION_TYPE_CODES, ProjectStreams,
+    project_columns, analyze_batch, reverify_batch, analysis_seed
+)
+from model_backend import MockModelBackend
+
+
+class ConstantRng:
+    """Every draw sits at the same point u of its range (and random() returns r), with both the
+    random.Random API the scalar path uses and the numpy Generator API of the batch functions"""
+
+    def __init__(self, u, r=0.0):
+        self.u = u
+        self.r = r
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        value = np.asarray(low) + (np.asarray(high) - np.asarray(low)) * self.u
+        if size is None:
+            return value if value.ndim else float(value)
+        return np.broadcast_to(value, size).astype(np.float64)
+
+    def random(self, size=None):
+        return self.r if size is None else np.full(size, self.r)
+
+    def randint(self, low, high):
+        return low
+
+    def sample(self, population, k):
+        return list(population[:k])
+
+
+def projects(project_type, reverification_type='SCHEDULED'):
+    return [{
+        'project_id': f'p-{index}',
+        'project_type': project_type,
+        'additional_data': {'project_area_hectares': 25.0 * (index + 1)},
+        'baseline_ndvi': 0.8 - index * 0.1,
+        'baseline_co2_tons': 100.0 + index * 50,
+        'baseline_area_hectares': 10.0 + index,
+        'reverification_type': reverification_type
+    } for index in range(3)]
+
+
+@pytest.mark.parametrize('project_type', [*PROJECT_TYPES, 'unlisted_type'])
+@pytest.mark.parametrize('u', [0.0, 0.37, 0.999])
+def test_batch_scoring_matches_the_scalar_analysis(project_type, u):
+    batch = projects(project_type)
+    result = analyze_batch(project_columns(batch)['type_codes'], project_columns(batch)['areas'], ConstantRng(u))
+    backend = MockModelBackend('v1.0.0')
+
+    for index, project_data in enumerate(batch):
+        rng = ConstantRng(u)
+        scalar = backend.generate_analysis(project_data, rng)
+        coverage, carbon = scalar['vegetation_coverage'], scalar['carbon_sequestration']
+        # The scalar path rounds its output; the two paths multiply in a different order, so a
+        # value on a rounding boundary may round either way
+        assert coverage['vegetation_density'] == pytest.approx(result['vegetation_density'][index], abs=1e-4)
+        assert coverage['health_assessment'] == HEALTH_LEVELS[result['health_codes'][index]]
+        for scalar_value, field in ((carbon['estimated_annual_co2_tons'], 'estimated_annual_co2_tons'),
+                                    (carbon['sequestration_rate_per_hectare'], 'sequestration_rate_per_hectare'),
+                                    (carbon['confidence_interval']['lower_bound'], 'co2_lower_bound'),
+                                    (carbon['confidence_interval']['upper_bound'], 'co2_upper_bound')):
+            assert scalar_value == pytest.approx(result[field][index], abs=0.01), field
+        assert rng.uniform(0.7, 0.95) == pytest.approx(result['confidence_score'][index])
+
+
+@pytest.mark.parametrize('reverification_type', list(REVERIFICATION_TYPE_CODES))
+@pytest.mark.parametrize('u, r', [(0.0, 0.0), (0.5, 0.2), (0.9, 0.5), (0.999, 0.99)])
+def test_batch_reverification_matches_the_scalar_path(reverification_type, u, r):
+    batch = projects('mangrove_restoration', reverification_type)
+    columns = project_columns(batch)
+    result = reverify_batch(columns['baseline_ndvi'], columns['baseline_co2_tons'], columns['baseline_area_hectares'],
+                            columns['reverification_codes'], ConstantRng(u, r))
+    backend = MockModelBackend('v1.0.0')
+
+    for index, project_data in enumerate(batch):
+        scalar = backend.reverify(project_data, ConstantRng(u, r))
+        for field in ('current_ndvi', 'current_co2_tons', 'current_area_hectares', 'ndvi_change_percent',
+                      'co2_change_percent', 'area_change_percent', 'ai_confidence_score'):
+            assert scalar[field] == pytest.approx(result[field][index]), field
+        assert scalar['compliance_flag'] == COMPLIANCE_FLAGS[result['compliance_codes'][index]]
+
+
+def test_project_streams_do_not_depend_on_the_batch():
+    seeds = [11, 22, 33]
+    together = ProjectStreams(seeds).uniform(0, 1, size=(3, 4))
+    alone = ProjectStreams([22]).uniform(0, 1, size=(1, 4))
+    assert np.array_equal(together[1], alone[0])
+    assert not np.array_equal(together[0], together[1])
+    with pytest.raises(ValueError):
+        ProjectStreams(seeds).uniform(0, 1, size=(2, 4))
+
+
+def test_analysis_seed_follows_the_inputs():
+    project_data = projects('mangrove_restoration')[0]
+    seed = analysis_seed(project_data, 'v1.0.0', 'verify')
+    assert seed == analysis_seed(dict(reversed(list(project_data.items()))), 'v1.0.0', 'verify')
+    assert seed != analysis_seed(project_data, 'v1.0.1', 'verify')
+    assert seed != analysis_seed(project_data, 'v1.0.0', 'reverify')
+    assert seed != analysis_seed({**project_data, 'additional_data': {'project_area_hectares': 26}}, 'v1.0.0', 'verify')
+
+
+def test_deterministic_batch_scores_a_project_the_same_in_any_batch(monkeypatch):
+    monkeypatch.setattr(service, 'DETERMINISTIC_ANALYSIS', True)
+    batch = [{**project_data, 'coordinates': [[0, 0], [0, 1], [1, 1], [0, 0]]}
+             for project_data in projects('seagrass_conservation')]
+
+    _, together = service.analyze_batch_projects(batch)
+    _, alone = service.analyze_batch_projects(batch[2:])
+    _, again = service.analyze_batch_projects(batch)
+    assert together[2] == alone[0]
+    assert together == again
+
+
+def test_deterministic_scalar_analysis_repeats(monkeypatch):
+    monkeypatch.setattr(service, 'DETERMINISTIC_ANALYSIS', True)
+    project_data = projects('salt_marsh_restoration')[0]
+    backend = MockModelBackend('v1.0.0')
+    first = backend.predict_batch([project_data], [service.analysis_rng(project_data, 'verify')])
+    second = backend.predict_batch([project_data], [service.analysis_rng(project_data, 'verify')])
+    assert first == second
@@ -0,0 +1,117 @@
+import asyncio
+import functools
+import json
+
+import pytest
+
+import asgi
+from conftest import TEST_API_KEY
+
+AUTH = [(b'authorization', f'Bearer {TEST_API_KEY}'.encode())]
+
+
+def call(method, path, body=b'', query=b'', headers=(), chunk_size=None):
+    """Run one request through the ASGI app; returns (status, headers dict, body bytes)"""
+    chunks = [body[start:start + chunk_size] for start in range(0, len(body), chunk_size)] if chunk_size else [body]
+    messages = [{'type': 'http.request', 'body': chunk, 'more_body': index < len(chunks) - 1}
+                for index, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)  # the client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': list(headers), 'client': ('127.0.0.1', 50000)}
+    asyncio.run(asgi.application(scope, receive, send))
+    start = sent[0]
+    response_headers = {name.decode(): value.decode() for name, value in start['headers']}
+    return start['status'], response_headers, b''.join(message.get('body', b'') for message in sent[1:])
+
+
+def test_resolve():
+    assert asgi.resolve('/api/mrv/verify') == (asgi.ROUTES['/api/mrv/verify'], ())
+    assert asgi.resolve('/api/mrv/jobs/job-1') == ({'GET': asgi.get_job}, ('job-1',))
+    assert asgi.resolve('/api/mrv/reports/r-1') == ({'GET': asgi.get_report}, ('r-1',))
+    for path in ('/api/mrv/jobs/', '/api/mrv/jobs/a/b', '/api/mrv/verify/', '/nowhere'):
+        assert asgi.resolve(path) == (None, ())
+
+
+def test_routes_mirror_the_flask_endpoints(app):
+    flask_endpoints = {rule.endpoint for rule in app.url_map.iter_rules()} - {'static'}
+    asgi_endpoints = {handler.__name__ for methods in asgi.ROUTES.values() for handler in methods.values()}
+    asgi_endpoints |= {handler.__name__ for handler in asgi.PARAMETER_ROUTES.values()}
+    assert asgi_endpoints == flask_endpoints
+
+
+def test_get_and_head():
+    status, headers, body = call('GET', '/api/mrv/model-info', headers=AUTH)
+    assert (status, headers['content-type']) == (200, 'application/json')
+    assert json.loads(body)
+
+    status, head_headers, body = call('HEAD', '/api/mrv/model-info', headers=AUTH)
+    assert (status, head_headers['content-type'], body) == (200, 'application/json', b'')
+
+
+def test_options_preflight_needs_no_auth():
+    status, headers, body = call('OPTIONS', '/api/mrv/verify',
+                                 headers=[(b'access-control-request-headers', b'authorization, content-type')])
+    assert (status, body) == (200, b'')
+    assert headers['access-control-allow-methods'] == 'OPTIONS, POST'
+    assert headers['access-control-allow-headers'] == 'authorization, content-type'
+    assert headers['access-control-allow-origin'] == '*'
+
+
+def test_unknown_paths_and_methods():
+    status, _, body = call('GET', '/api/mrv/nowhere', headers=AUTH)
+    assert status == 404
+    assert 'POST /api/mrv/verify' in json.loads(body)['available_endpoints']
+
+    status, headers, _ = call('GET', '/api/mrv/verify', headers=AUTH)
+    assert (status, headers['allow']) == (405, 'POST')
+    assert call('POST', '/api/mrv/model-info', headers=AUTH)[0] == 405
+
+
+def test_auth_and_malformed_json(project):
+    assert call('POST', '/api/mrv/verify', json.dumps(project).encode())[0] == 401
+    status, _, body = call('POST', '/api/mrv/verify', b'{"project_id": ', headers=AUTH)
+    assert (status, json.loads(body)['message']) == (400, 'Request body must be valid JSON')
+
+
+def test_verify_reads_a_chunked_body(project):
+    status, _, body = call('POST', '/api/mrv/verify', json.dumps(project).encode(), headers=AUTH, chunk_size=16)
+    result = json.loads(body)
+    assert (status, result['success'], result['project_id']) == (200, True, project['project_id'])
+
+
+def test_bodies_over_the_limit_get_a_413(project, monkeypatch):
+    monkeypatch.setattr(asgi, 'read_body', functools.partial(asgi.read_body, limit=64))
+    body = json.dumps(project).encode()
+    assert len(body) > 64
+    status, _, response = call('POST', '/api/mrv/verify', body, headers=AUTH, chunk_size=16)
+    assert (status, json.loads(response)['message']) == (413, f'Request body exceeds {asgi.ASGI_MAX_BODY_BYTES} bytes')
+
+
+@pytest.mark.parametrize('size, limit, expected', [(10, 10, b'x' * 10), (11, 10, None), (0, 10, b'')])
+def test_read_body_limit(size, limit, expected):
+    messages = [{'type': 'http.request', 'body': b'x' * size, 'more_body': False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    assert asyncio.run(asgi.read_body(receive, limit)) == expected
+
+
+def test_async_verify_and_job_poll(project):
+    status, headers, body = call('POST', '/api/mrv/verify', json.dumps(project).encode(), query=b'async=true',
+                                 headers=AUTH)
+    job = json.loads(body)
+    assert (status, headers['location']) == (202, job['status_url'])
+
+    status, _, body = call('GET', job['status_url'], query=b'wait=5&view=summary', headers=AUTH)
+    polled = json.loads(body)
+    assert (status, polled['status'], polled['result']['project_id']) == (200, 'completed', project['project_id'])
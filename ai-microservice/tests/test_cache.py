@@ -0,0 +1,96 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from cache import ResultCache
+
+
+def cache(**overrides):
+    return ResultCache('test-model', **{'max_entries': 100, 'ttls': {'verify': 60}, 'db_path': '', 'enabled': True,
+                                        **overrides})
+
+
+def test_concurrent_identical_requests_share_one_computation():
+    results = cache()
+    pending = Future()
+    calls = []
+
+    def submit():
+        calls.append(1)
+        return pending
+
+    first, status = results.get_or_submit('verify', {'project_id': 'p'}, submit)
+    assert status == 'MISS'
+    second, status = results.get_or_submit('verify', {'project_id': 'p'}, submit)
+    assert status == 'COALESCED'
+
+    pending.set_result({'score': 1})
+    assert first.result() == second.result() == {'score': 1}
+    third, status = results.get_or_submit('verify', {'project_id': 'p'}, submit)
+    assert (status, third.result(), len(calls)) == ('HIT', {'score': 1}, 1)
+
+
+def test_queue_only_fields_share_the_entry():
+    results = cache()
+    assert results.key_for('verify', {'project_id': 'p', 'priority': 1}) == results.key_for('verify', {'project_id': 'p'})
+    assert results.key_for('verify', {'project_id': 'p'}) != results.key_for('verify', {'project_id': 'q'})
+    assert results.key_for('verify', {'project_id': 'p'}) != results.key_for('reverify', {'project_id': 'p'})
+
+
+def completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def test_failures_are_not_cached():
+    results = cache()
+    failed = Future()
+    failed.set_exception(RuntimeError('model down'))
+    future, _ = results.get_or_submit('verify', {'project_id': 'p'}, lambda: failed)
+    with pytest.raises(RuntimeError):
+        future.result()
+    future, status = results.get_or_submit('verify', {'project_id': 'p'}, lambda: completed('ok'))
+    assert (status, future.result()) == ('MISS', 'ok')
+
+
+def test_ttl_and_lru_eviction():
+    results = cache(max_entries=2, ttls={'verify': 0.05})
+    for project_id in ('a', 'b', 'c'):
+        results.get_or_submit('verify', {'project_id': project_id}, lambda: completed(project_id))
+    assert results.get_or_submit('verify', {'project_id': 'a'}, lambda: completed('a2'))[1] == 'MISS'
+
+    time.sleep(0.06)
+    assert results.get_or_submit('verify', {'project_id': 'c'}, lambda: completed('c2'))[1] == 'MISS'
+
+
+def test_disk_tier_survives_a_new_process(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    cache(db_path=db_path).get_or_submit('verify', {'project_id': 'p'}, lambda: completed({'score': 2}))
+    future, status = cache(db_path=db_path).get_or_submit('verify', {'project_id': 'p'}, lambda: completed(None))
+    assert (status, future.result()) == ('HIT', {'score': 2})
+
+
+def test_single_flight_under_contention():
+    results = cache()
+    calls = []
+    release = threading.Event()
+
+    def submit():
+        calls.append(1)
+        future = Future()
+        threading.Thread(target=lambda: (release.wait(), future.set_result('done'))).start()
+        return future
+
+    futures = []
+    threads = [threading.Thread(target=lambda: futures.append(results.get_or_submit('verify', {'project_id': 'p'}, submit)[0]))
+               for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    release.set()
+    assert len(calls) == 1
+    assert {future.result(timeout=5) for future in futures} == {'done'}
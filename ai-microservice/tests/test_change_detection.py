@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from change_detection import detect_changes, change_columns
+
+START_DAY = int(np.datetime64('2024-01-15', 'D').astype(np.int64))
+
+
+def monthly_series(ndvi, area=100.0):
+    """One project's days and (NDVI, area) values, one acquisition every 30 days"""
+    days = np.array([[START_DAY + 30 * i for i in range(len(ndvi))]])
+    values = np.stack([np.array([ndvi], dtype=np.float64), np.full((1, len(ndvi)), area)], axis=2)
+    return days, values
+
+
+def scan(ndvi):
+    return change_columns(['p'], detect_changes(*monthly_series(ndvi)))
+
+
+@pytest.mark.parametrize('count', [7, 8, 10, 12, 20, 24])
+def test_step_drop_is_flagged(count):
+    # NDVI collapses from 0.8 to 0.5 halfway through; short series must not fit it away as a season
+    half = count // 2
+    result = scan([0.8] * half + [0.5] * (count - half))
+    assert result['compliance_flag'] == ['CRITICAL_DEGRADATION']
+    assert result['ndvi_change_percent'][0] < -25
+    assert result['breakpoint_date'][0] is not None
+
+
+def test_no_annual_cycle_within_a_year():
+    result = detect_changes(*monthly_series([0.8] * 5 + [0.5] * 5))
+    assert not result['seasonal'][0]
+    assert result['seasonal_amplitude'][0] == 0
+
+
+def test_seasonal_cycle_is_not_degradation():
+    # Two years of a stable canopy with a dry-season dip
+    days, values = monthly_series([0.7] * 24)
+    values[0, :, 0] += 0.1 * np.cos(2 * np.pi * days[0] / 365.25)
+    result = detect_changes(days, values)
+    assert result['seasonal'][0]
+    assert result['seasonal_amplitude'][0] == pytest.approx(0.1, abs=0.01)
+    assert change_columns(['p'], result)['compliance_flag'] == ['COMPLIANT']
+
+
+def test_gradual_decline_and_growth():
+    assert scan(list(np.linspace(0.8, 0.66, 12)))['compliance_flag'] == ['SIGNIFICANT_DEGRADATION']
+    assert scan(list(np.linspace(0.6, 0.8, 12)))['compliance_flag'] == ['COMPLIANT']
+
+
+def test_too_few_observations_have_no_flag():
+    result = scan([0.8, 0.5, 0.5])
+    assert result['compliance_flag'] == [None]
+    assert result['observations'] == [3]
+
+
+def test_projects_are_scanned_independently():
+    stable_days, stable = monthly_series([0.7] * 10)
+    _, dropped = monthly_series([0.8] * 5 + [0.5] * 5)
+    padded = np.full((1, 10, 2), np.nan)
+    padded[0, 6:] = stable[0, :4]
+    days = np.concatenate([stable_days, stable_days, stable_days])
+    values = np.concatenate([stable, dropped, padded])
+    flags = change_columns(['stable', 'dropped', 'short'], detect_changes(days, values))['compliance_flag']
+    assert flags == ['COMPLIANT', 'CRITICAL_DEGRADATION', 'COMPLIANT']
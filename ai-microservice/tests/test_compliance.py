@@ -0,0 +1,210 @@
+import os
+import re
+import json
+
+import numpy as np
+import pytest
+
+import app as service
+from analysis import PROJECT_TYPES
+from compliance import (
+    ComplianceThresholds, ThresholdTable, DEFAULT_THRESHOLDS, PROJECT_TYPE_THRESHOLDS, THRESHOLD_FIELDS,
+    COMPLIANCE_STATUSES, record_columns, evaluate_compliance, compliance_record
+)
+
+SCHEMA_SQL = os.path.join(os.path.dirname(__file__), '..', '..', 'backend', 'database', 'compliance-schema.sql')
+LIMIT_FIELDS = THRESHOLD_FIELDS[:6]
+
+
+def sql_seed_thresholds():
+    """{project_type: six drop limits} from the INSERT INTO compliance_thresholds seed rows"""
+    with open(SCHEMA_SQL) as f:
+        sql = f.read()
+    seed = sql[sql.index('INSERT INTO compliance_thresholds'):]
+    seed = seed[:seed.index(';')]
+    return {
+        match[0]: tuple(float(value) for value in match[1].split(','))
+        for match in re.findall(r"\('(\w+)',\s*([\d.,\s]+)\)", seed)
+    }
+
+
+def sql_column_defaults():
+    """DEFAULT of every threshold column in CREATE TABLE compliance_thresholds"""
+    with open(SCHEMA_SQL) as f:
+        sql = f.read()
+    table = sql[sql.index('CREATE TABLE compliance_thresholds'):]
+    table = table[:table.index(');')]
+    return dict(re.findall(r'(\w+) \w+(?:\([\d,]+\))? DEFAULT (\w+(?:\.\d+)?)', table))
+
+
+def calculate_compliance_score(ndvi_change, co2_change, area_change, ai_confidence):
+    """Line-by-line port of the calculate_compliance_score SQL function"""
+    score = 1.0
+    if ndvi_change < 0:
+        score -= abs(ndvi_change) / 100.0 * 0.4
+    if co2_change < 0:
+        score -= abs(co2_change) / 100.0 * 0.3
+    if area_change < 0:
+        score -= abs(area_change) / 100.0 * 0.2
+    score *= 0.9 + ai_confidence * 0.1
+    return max(0, min(1, score))
+
+
+def scalar_status(row, changes, confidence):
+    """Compliance status of one record, checked threshold by threshold"""
+    drops = [max(0.0, -change) for change in changes]
+    limits = [(row[f'{metric}_warning_{kind}_percent'], row[f'{metric}_critical_{kind}_percent'])
+              for metric, kind in (('ndvi', 'drop'), ('co2', 'drop'), ('area', 'reduction'))]
+    if any(drop >= critical for drop, (_, critical) in zip(drops, limits)):
+        return 'Non-Compliant'
+    if any(drop >= warning for drop, (warning, _) in zip(drops, limits)) or confidence < row['ai_confidence_minimum']:
+        return 'Review Needed'
+    return 'Compliant'
+
+
+def test_built_in_thresholds_match_the_sql_seed_rows():
+    seed = sql_seed_thresholds()
+    assert set(seed) == set(PROJECT_TYPE_THRESHOLDS) == set(PROJECT_TYPES)
+    table = ThresholdTable.from_config()
+    for project_type, limits in seed.items():
+        assert tuple(table.rows[project_type][field] for field in LIMIT_FIELDS) == limits
+
+    defaults = sql_column_defaults()
+    for field, value in DEFAULT_THRESHOLDS.items():
+        expected = defaults[field].lower() == 'true' if isinstance(value, bool) else float(defaults[field])
+        assert value == expected, field
+
+
+@pytest.mark.parametrize('project_type', [*PROJECT_TYPES, 'unlisted_type'])
+def test_vectorized_pass_matches_the_scalar_rules(project_type):
+    rng = np.random.default_rng(len(project_type))
+    count = 500
+    records = [
+        {
+            'project_id': f'p-{index}',
+            'project_type': project_type,
+            'ndvi_change_percent': float(change[0]),
+            'co2_change_percent': float(change[1]),
+            'area_change_percent': float(change[2]),
+            'ai_confidence_score': float(confidence)
+        }
+        for index, (change, confidence) in enumerate(zip(
+            rng.uniform(-40, 10, (count, 3)).round(2), rng.uniform(0.5, 1.0, count).round(2)
+        ))
+    ]
+    table = ThresholdTable.from_config()
+    result = evaluate_compliance(record_columns(records), table)
+    row = table.rows.get(project_type, table.rows[None])
+
+    for index, record in enumerate(records):
+        changes = (record['ndvi_change_percent'], record['co2_change_percent'], record['area_change_percent'])
+        assert result['compliance_score'][index] == pytest.approx(
+            calculate_compliance_score(*changes, record['ai_confidence_score'])
+        )
+        assert COMPLIANCE_STATUSES[result['status_codes'][index]] == scalar_status(
+            row, changes, record['ai_confidence_score']
+        )
+
+
+@pytest.mark.parametrize('project_type', PROJECT_TYPES)
+def test_drops_exactly_at_a_threshold_count(project_type):
+    ndvi_warning, ndvi_critical = PROJECT_TYPE_THRESHOLDS[project_type][:2]
+    columns = record_columns({
+        'project_type': [project_type] * 3,
+        'ndvi_change_percent': [-(ndvi_warning - 0.01), -ndvi_warning, -ndvi_critical]
+    })
+    result = evaluate_compliance(columns, ThresholdTable.from_config())
+    statuses = [compliance_record(result, index)['compliance_status'] for index in range(3)]
+    assert statuses == ['Compliant', 'Review Needed', 'Non-Compliant']
+    assert compliance_record(result, 1)['breaches'] == ['ndvi']
+
+
+def test_each_project_type_uses_its_own_row():
+    columns = record_columns({
+        'project_type': ['coastal_wetland_protection', 'mangrove_restoration', 'seagrass_conservation', 'unlisted'],
+        'ndvi_change_percent': [-12.0] * 4
+    })
+    result = evaluate_compliance(columns, ThresholdTable.from_config(
+        {'project_types': {'seagrass_conservation': {'ndvi_warning_drop_percent': 12.5}}}
+    ))
+    statuses = [COMPLIANCE_STATUSES[code] for code in result['status_codes']]
+    # warning limits 8, 10, 12.5 (overridden) and the default row's 10
+    assert statuses == ['Review Needed', 'Review Needed', 'Compliant', 'Review Needed']
+
+
+def test_config_overrides_are_validated():
+    with pytest.raises(ValueError, match='Unknown threshold field'):
+        ThresholdTable.from_config({'default': {'ndvi_drop': 5}})
+    with pytest.raises(ValueError, match='Unknown weight'):
+        ThresholdTable.from_config({'weights': {'soil': 0.1}})
+    with pytest.raises(ValueError, match='Unknown project type'):
+        ThresholdTable.from_config({'project_types': {'kelp_forest': {}}})
+
+
+def write_config(path, config, mtime):
+    path.write_text(json.dumps(config))
+    os.utime(path, (mtime, mtime))
+
+
+def test_thresholds_reload_when_the_file_changes(tmp_path):
+    path = tmp_path / 'thresholds.json'
+    write_config(path, {'project_types': {'mangrove_restoration': {'ndvi_warning_drop_percent': 12}}}, 1000)
+    thresholds = ComplianceThresholds(str(path))
+    table = thresholds.current()
+    assert (table.version, table.rows['mangrove_restoration']['ndvi_warning_drop_percent']) == ('thresholds.json@1000', 12)
+    assert thresholds.current() is table
+
+    write_config(path, {'weights': {'ndvi': 0.5}}, 2000)
+    table = thresholds.current()
+    assert (table.version, table.weights['ndvi']) == ('thresholds.json@2000', 0.5)
+    assert table.rows['mangrove_restoration']['ndvi_warning_drop_percent'] == 10.0
+
+    # An invalid file (or a missing one) keeps the last good table
+    write_config(path, {'default': {'ndvi_drop': 5}}, 3000)
+    assert thresholds.current() is table
+    os.remove(path)
+    assert thresholds.current() is table
+    assert (thresholds.stats()['reloads'], thresholds.stats()['reload_errors']) == (2, 1)
+
+
+def test_records_and_columns_give_the_same_evaluation():
+    records = [
+        {'project_id': 'a', 'project_type': 'mangrove_restoration', 'ndvi_change_percent': -25, 'ai_confidence_score': 0.9},
+        {'project_id': 'b', 'project_type': 'seagrass_conservation', 'co2_change_percent': -21},
+        {'project_id': 'c', 'project_type': 'salt_marsh_restoration', 'area_change_percent': 2, 'ai_confidence_score': 0.65}
+    ]
+    columns = {field: [record.get(field) for record in records] for field in
+               ('project_id', 'project_type', 'ndvi_change_percent', 'co2_change_percent',
+                'area_change_percent', 'ai_confidence_score')}
+    from_records = service.compliance_evaluation_payload({'records': records})
+    from_columns = service.compliance_evaluation_payload({'columns': columns})
+    assert from_records['columns'] == from_columns['columns']
+    assert from_records['columns']['compliance_status'] == [2, 1, 1]
+    assert from_records['status_counts'] == {'Compliant': 0, 'Review Needed': 2, 'Non-Compliant': 1}
+
+
+@pytest.mark.parametrize('body, message', [
+    (None, 'No compliance records provided'),
+    ({}, 'Provide either records (a list of objects) or columns (an object of lists)'),
+    ({'records': [], 'columns': {}}, 'Provide either records (a list of objects) or columns (an object of lists)'),
+    ({'records': 'x'}, 'Invalid records: must be of type array'),
+    ({'records': [1]}, 'records must be objects'),
+    ({'records': [{'ndvi_change_percent': 'x'}]}, 'Invalid compliance records: could not convert'),
+    ({'columns': {'ndvi_change_percent': 3}}, 'Invalid columns.ndvi_change_percent: must be of type array'),
+    ({'columns': {'project_type': ['a', 'b'], 'ndvi_change_percent': [1]}},
+     'Invalid compliance records: All columns must have the same length'),
+    ({'columns': {'project_id': ['a'], 'ai_confidence_score': [float('nan')]}},
+     'Invalid compliance records: Change percentages and ai_confidence_score must be numbers')
+])
+def test_payload_validation(body, message):
+    with pytest.raises(ValueError) as error:
+        service.compliance_evaluation_payload(body)
+    assert str(error.value).startswith(message)
+
+
+def test_record_limit_applies_to_both_inputs(monkeypatch):
+    monkeypatch.setattr(service, 'COMPLIANCE_MAX_RECORDS', 2)
+    with pytest.raises(ValueError, match='Too many records'):
+        service.compliance_evaluation_payload({'records': [{}] * 3})
+    with pytest.raises(ValueError, match='Too many records'):
+        service.compliance_evaluation_payload({'columns': {'project_id': ['a', 'b', 'c']}})
@@ -0,0 +1,89 @@
+import math
+
+import pytest
+
+from geometry import (
+    EARTH_RADIUS_METERS, SQUARE_METERS_PER_HECTARE, PolygonCache, build_project_polygon, geodesic_area_hectares
+)
+
+
+def box(west, south, east, north):
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+
+def cell_hectares(west, south, east, north):
+    """Exact area of a lon/lat rectangle on the sphere: R^2 * dlon * (sin(north) - sin(south))"""
+    return (EARTH_RADIUS_METERS ** 2 * math.radians(east - west)
+            * (math.sin(math.radians(north)) - math.sin(math.radians(south))) / SQUARE_METERS_PER_HECTARE)
+
+
+@pytest.mark.parametrize('cell', [(0, 0, 1, 1), (-80.19, 25.76, -80.18, 25.77), (10, 60, 12, 61), (170, -45, 171, -44)])
+def test_area_of_a_lon_lat_cell(cell):
+    assert build_project_polygon(box(*cell)).area_hectares == pytest.approx(cell_hectares(*cell), rel=1e-9)
+
+
+def test_area_ignores_ring_orientation():
+    ring = box(-80.19, 25.76, -80.18, 25.77)
+    assert build_project_polygon(ring[::-1]).area_hectares == pytest.approx(build_project_polygon(ring).area_hectares)
+
+
+def test_holes_are_subtracted_and_parts_added():
+    outer, hole, other = (0, 0, 2, 2), (0.5, 0.5, 1.5, 1.5), (5, 5, 6, 6)
+    with_hole = build_project_polygon({'type': 'Polygon', 'coordinates': [box(*outer), box(*hole)]})
+    assert with_hole.area_hectares == pytest.approx(cell_hectares(*outer) - cell_hectares(*hole), rel=1e-9)
+
+    multi = build_project_polygon({'type': 'MultiPolygon', 'coordinates': [[box(*outer), box(*hole)], [box(*other)]]})
+    assert multi.area_hectares == pytest.approx(with_hole.area_hectares + cell_hectares(*other), rel=1e-9)
+    assert geodesic_area_hectares(multi.geometry) == multi.area_hectares
+
+
+def test_accepted_coordinate_forms_agree():
+    ring = box(0, 0, 1, 1)
+    forms = [
+        ring,
+        [ring],
+        [[lon, lat, 3.0] for lon, lat in ring],
+        {'type': 'Polygon', 'coordinates': [ring]},
+        {'type': 'Feature', 'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+    ]
+    keys = {build_project_polygon(coordinates).key for coordinates in forms}
+    assert len(keys) == 1
+
+
+@pytest.mark.parametrize('coordinates, message', [
+    ('here', 'coordinates must be a GeoJSON polygon or a list of [lon, lat] positions'),
+    ([], 'coordinates must be a GeoJSON polygon or a list of [lon, lat] positions'),
+    ({'type': 'Point', 'coordinates': [0, 0]}, 'coordinates must be a Polygon or MultiPolygon, got Point'),
+    ({'type': 'MultiPolygon', 'coordinates': []}, 'coordinates do not describe a polygon'),
+    ({'type': 'Polygon', 'coordinates': []}, 'every polygon needs at least an exterior ring'),
+    ([[0, 0], [0, 'a'], [1, 1], [0, 0]], 'ring positions must be [lon, lat] number pairs'),
+    ([[0, 0], [1, 1], [0, 0]], 'every ring needs at least 4 positions'),
+    ([[0, 0], [0, 1], [1, 1], [1, 0]], 'ring is not closed'),
+    ([[0, 0], [0, float('nan')], [1, 1], [0, 0]], 'coordinates must be finite numbers'),
+    ([[-80.19, 125.76], [-80.18, 125.76], [-80.18, 125.77], [-80.19, 125.76]],
+     'coordinates must be [lon, lat] in degrees'),
+    ([[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]], 'invalid polygon: Self-intersection')
+])
+def test_polygon_validation(coordinates, message):
+    with pytest.raises(ValueError) as error:
+        build_project_polygon(coordinates)
+    assert str(error.value).startswith(message)
+
+
+def test_vertex_limit_counts_every_ring():
+    rings = {'type': 'Polygon', 'coordinates': [box(0, 0, 2, 2), box(0.5, 0.5, 1.5, 1.5)]}
+    assert build_project_polygon(rings, max_vertices=10).vertex_count == 10
+    with pytest.raises(ValueError, match='polygon has 10 vertices, the limit is 9'):
+        build_project_polygon(rings, max_vertices=9)
+
+
+def test_polygon_cache_reuses_valid_polygons_only():
+    cache = PolygonCache(max_entries=1)
+    first = cache.get(box(0, 0, 1, 1))
+    assert cache.get([box(0, 0, 1, 1)]) is first
+    with pytest.raises(ValueError):
+        cache.get([[0, 0], [1, 1], [1, 0], [0, 1], [0, 0]])
+    cache.get(box(1, 1, 2, 2))
+    assert cache.get(box(0, 0, 1, 1)) is not first  # evicted by the newer polygon
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['invalid'], stats['entries']) == (1, 4, 1, 1)
@@ -0,0 +1,97 @@
+from concurrent.futures import Future
+
+from jobs import JobManager, JobStore
+
+
+def worker(db_path):
+    """A JobManager as one gunicorn worker would have it, sharing the job store at db_path"""
+    return JobManager(executor_type='thread', max_workers=1, store=JobStore(str(db_path)))
+
+
+def test_another_worker_sees_a_job_finish(tmp_path):
+    accepting, other = worker(tmp_path / 'jobs.db'), worker(tmp_path / 'jobs.db')
+    future = Future()
+    job = accepting.track('verify', {'project_id': 'p'}, future)
+
+    assert other.get(job['job_id']) is None
+    assert other.stored(job['job_id'])['status'] == 'queued'
+
+    future.set_running_or_notify_cancel()
+    future.set_result({'project_id': 'p', 'confidence_score': 0.9})
+    stored = other.stored(job['job_id'])
+    assert (stored['status'], stored['project_id']) == ('completed', 'p')
+    assert stored['result'] == {'project_id': 'p', 'confidence_score': 0.9}
+    assert stored['completed_at'] is not None
+
+
+def test_failed_jobs_keep_their_error(tmp_path):
+    accepting, other = worker(tmp_path / 'jobs.db'), worker(tmp_path / 'jobs.db')
+    future = Future()
+    job = accepting.track('reverify', {'project_id': 'p'}, future)
+    future.set_running_or_notify_cancel()
+    future.set_exception(ValueError('no imagery'))
+
+    stored = other.stored(job['job_id'])
+    assert (stored['status'], stored['error'], stored['error_type']) == ('failed', 'no imagery', 'ValueError')
+
+
+def test_without_a_path_jobs_stay_in_the_process():
+    manager = JobManager(executor_type='thread', max_workers=1, store=JobStore(''))
+    future = Future()
+    future.set_result({'project_id': 'p'})
+    job = manager.track('verify', {'project_id': 'p'}, future)
+    assert manager.get(job['job_id'])['status'] == 'completed'
+    assert manager.stored(job['job_id']) is None
+
+
+def test_job_api_answers_for_another_workers_job(client, auth, tmp_path, monkeypatch):
+    from app import job_manager
+
+    other = worker(tmp_path / 'jobs.db')
+    monkeypatch.setattr(job_manager, 'store', JobStore(str(tmp_path / 'jobs.db')))
+    future = Future()
+    job = other.track('verify', {'project_id': 'p'}, future)
+
+    response = client.get(f"/api/mrv/jobs/{job['job_id']}", headers=auth)
+    assert (response.status_code, response.get_json()['status']) == (200, 'queued')
+
+    future.set_result({'project_id': 'p', 'success': True, 'confidence_score': 0.9, 'model_version': 'v1'})
+    body = client.get(f"/api/mrv/jobs/{job['job_id']}?wait=5&view=summary", headers=auth).get_json()
+    assert (body['status'], body['result']['confidence_score']) == ('completed', 0.9)
+
+    assert client.get('/api/mrv/jobs/job-unknown', headers=auth).status_code == 404
+
+
+def test_async_verify_returns_a_job_to_poll(client, auth, project):
+    response = client.post('/api/mrv/verify?async=true', json=project, headers=auth)
+    accepted = response.get_json()
+    assert response.status_code == 202
+    assert response.headers['Location'] == accepted['status_url'] == f"/api/mrv/jobs/{accepted['job_id']}"
+    assert (accepted['job_type'], response.headers['X-Cache']) == ('verify', 'MISS')
+
+    job = client.get(f"{accepted['status_url']}?wait=5", headers=auth).get_json()
+    assert (job['status'], job['project_id'], job['result']['project_id']) == ('completed', project['project_id'],
+                                                                              project['project_id'])
+    assert job['started_at'] and job['completed_at']
+
+    # The same request again is answered from the cache, still as a job
+    again = client.post('/api/mrv/verify', json=project, headers={**auth, 'Prefer': 'respond-async'})
+    assert (again.status_code, again.headers['X-Cache']) == (202, 'HIT')
+    assert client.get(again.get_json()['status_url'], headers=auth).get_json()['status'] == 'completed'
+
+
+def test_async_reverify(client, auth, project):
+    response = client.post('/api/mrv/reverify?async=true', json={**project, 'reverification_type': 'MANUAL'},
+                           headers=auth)
+    assert response.status_code == 202
+    job = client.get(f"{response.get_json()['status_url']}?wait=5&fields=project_id,compliance_flag",
+                     headers=auth).get_json()
+    assert job['status'] == 'completed'
+    assert set(job['result']) == {'success', 'project_id', 'compliance_flag'}
+
+
+def test_job_api_errors(client, auth, project):
+    job_id = client.post('/api/mrv/verify?async=true', json=project, headers=auth).get_json()['job_id']
+    assert client.get(f'/api/mrv/jobs/{job_id}').status_code == 401
+    assert client.get(f'/api/mrv/jobs/{job_id}?wait=soon', headers=auth).status_code == 400
+    assert client.get(f'/api/mrv/jobs/{job_id}?view=everything', headers=auth).status_code == 400
@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from metrics_store import MetricsStore, histogram_percentile, clear_multiproc_dir
+
+
+def define(store):
+    store.counter('requests_total', 'Requests', labels=[('status', ('2xx', '5xx'))])
+    store.gauge('queue_depth', 'Jobs waiting')
+    store.histogram('latency_seconds', 'Latency', labels=[('endpoint', ('verify',))])
+    return store
+
+
+def test_counters_gauges_and_labels():
+    store = define(MetricsStore(buckets=(0.1, 1, 10)))
+    store.inc('requests_total', status='2xx')
+    store.inc('requests_total', 2, status='2xx')
+    store.inc('requests_total', status='418')  # unknown label values share the 'other' series
+    store.set('queue_depth', 7)
+    store.set('queue_depth', 3)
+
+    totals = store.totals()
+    assert store.value('requests_total', totals, status='2xx') == 3
+    assert store.value('requests_total', totals, status='other') == 1
+    assert store.value('requests_total', totals, status='5xx') == 0
+    assert store.value('queue_depth', totals) == 3
+
+    with pytest.raises(RuntimeError):
+        store.counter('late_total', 'Defined after the first write')
+
+
+def test_counts_from_many_threads_are_not_lost():
+    store = define(MetricsStore(max_thread_shards=4))
+
+    def work():
+        for _ in range(1000):
+            store.inc('requests_total', status='2xx')
+
+    # More threads than shards: the overflow goes to the locked retired row
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.value('requests_total', status='2xx') == 8000
+
+
+def test_histogram_summary_and_percentiles():
+    store = define(MetricsStore(buckets=(0.1, 1, 10)))
+    for value in (0.05, 0.5, 0.5, 5):
+        store.observe('latency_seconds', value, endpoint='verify')
+
+    summary = store.histogram_summary('latency_seconds')
+    assert list(summary) == ['verify']
+    assert (summary['verify']['count'], summary['verify']['average_seconds']) == (4, 1.5125)
+    assert summary['verify']['p50_seconds'] == 0.55
+    assert histogram_percentile([0, 0, 0, 0], (0.1, 1, 10), 0.5) == 0
+    assert histogram_percentile([0, 0, 0, 2], (0.1, 1, 10), 0.99) == 10
+
+
+def test_prometheus_exposition():
+    store = define(MetricsStore(buckets=(0.1, 1)))
+    store.inc('requests_total', status='2xx')
+    store.observe('latency_seconds', 0.5, endpoint='verify')
+    text = store.prometheus()
+    assert '# TYPE bluecarbon_ai_requests_total counter' in text
+    assert 'bluecarbon_ai_requests_total{status="2xx"} 1' in text
+    assert 'bluecarbon_ai_latency_seconds_bucket{endpoint="verify",le="0.1"} 0' in text
+    assert 'bluecarbon_ai_latency_seconds_bucket{endpoint="verify",le="1"} 1' in text
+    assert 'bluecarbon_ai_latency_seconds_bucket{endpoint="verify",le="+Inf"} 1' in text
+    assert 'bluecarbon_ai_latency_seconds_sum{endpoint="verify"} 0.5' in text
+    assert text.endswith('\n')
+
+
+def worker_file(tmp_path, name, requests, queue_depth):
+    """Metrics file a worker would leave behind (written under this pid, returned for renaming)"""
+    directory = tmp_path / name
+    store = define(MetricsStore(multiproc_dir=str(directory)))
+    store.inc('requests_total', requests, status='2xx')
+    store.set('queue_depth', queue_depth)
+    store.totals()
+    return directory / f'metrics-{os.getpid()}.bin'
+
+
+def test_workers_are_summed_and_dead_workers_keep_only_counters(tmp_path):
+    shared = tmp_path / 'shared'
+    store = define(MetricsStore(multiproc_dir=str(shared)))
+    store.inc('requests_total', status='2xx')
+    store.set('queue_depth', 1)
+
+    exited = subprocess.Popen(['true'])
+    exited.wait()
+    shutil.copy(worker_file(tmp_path, 'live', 10, 5), shared / f'metrics-{os.getppid()}.bin')
+    shutil.copy(worker_file(tmp_path, 'dead', 100, 50), shared / f'metrics-{exited.pid}.bin')
+    (shared / 'metrics-999999.bin').write_bytes(b'\0' * 16)  # another layout: skipped
+
+    totals = store.totals()
+    assert store.value('requests_total', totals, status='2xx') == 111
+    assert store.value('queue_depth', totals) == 6
+
+    clear_multiproc_dir(str(shared))
+    assert not list(shared.glob('metrics-*.bin'))
@@ -0,0 +1,44 @@
+import time
+
+import model_backend
+from model_backend import ModelBackend, ModelHolder
+
+
+class FlakyBackend(ModelBackend):
+    """Fails the first `failures` warmups, then warms up like the base backend"""
+
+    name = 'flaky'
+    failures = 2
+
+    def warmup(self):
+        if FlakyBackend.failures > 0:
+            FlakyBackend.failures -= 1
+            raise RuntimeError('weights not mounted yet')
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_failed_warmup_is_retried_until_ready(monkeypatch):
+    monkeypatch.setattr(model_backend, 'MODEL_WARMUP_RETRY_SECONDS', 0.01)
+    holder = ModelHolder('v1.0.0', load_mode='background')
+    holder._backend_class = FlakyBackend
+
+    holder.start()
+    assert wait_until(holder.is_ready)
+    assert (holder.serving(), holder.warmup_error, FlakyBackend.failures) == (True, None, 0)
+
+
+def test_preload_keeps_retrying_after_a_failed_warmup(monkeypatch):
+    monkeypatch.setattr(model_backend, 'MODEL_WARMUP_RETRY_SECONDS', 0.01)
+    FlakyBackend.failures = 1
+    holder = ModelHolder('v1.0.0', load_mode='preload')
+    holder._backend_class = FlakyBackend
+
+    holder.start()
+    assert wait_until(holder.is_ready)
+    assert holder.warmup_error is None
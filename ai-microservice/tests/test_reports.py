@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from reports import ReportStore, parse_range, etag_matches
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('', None),
+    ('bytes=0-99', (0, 99)),
+    ('bytes=100-', (100, 999)),
+    ('bytes=-100', (900, 999)),
+    ('bytes=-5000', (0, 999)),
+    ('bytes=990-5000', (990, 999)),
+    ('bytes=999-999', (999, 999)),
+    ('bytes=0-1,5-6', None),  # several ranges: whole body
+    ('items=0-1', None),
+    ('bytes=a-b', None),
+    ('bytes=-', None)
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize('header', ['bytes=1000-', 'bytes=1000-1001', 'bytes=-0', 'bytes=50-10'])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+def test_etag_matches():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"x", "abc"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('', etag)
+
+
+RESULT = {'success': True, 'confidence_score': 0.91, 'analysis_result': {'ndvi': 0.72, 'sources': ['s2', 'l8']}}
+
+
+def rendered(store, report_id, run):
+    url = store.submit(report_id, 'verify', 'p1', {**RESULT, **run})
+    deadline = time.monotonic() + 5
+    while store.pending(report_id) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return url
+
+
+def test_identical_results_share_blobs(tmp_path):
+    store = ReportStore(str(tmp_path))
+    assert rendered(store, 'mrv-1', {'mrv_id': 'mrv-1', 'timestamp': '2026-01-01T00:00:00'}) == '/api/mrv/reports/mrv-1'
+    rendered(store, 'mrv-2', {'mrv_id': 'mrv-2', 'timestamp': '2026-01-02T00:00:00'})
+
+    stats = store.stats()
+    assert (stats['rendered'], stats['blobs_written'], stats['blobs_deduplicated']) == (2, 2, 2)
+    first, second = store.artifact('mrv-1', 'json'), store.artifact('mrv-2', 'json')
+    assert first.digest == second.digest
+    assert (first.filename, second.filename) == ('mrv-1.json', 'mrv-2.json')
+
+    # The run fields stay with the report, not in the shared artifact
+    assert b'mrv-1' not in open(first.path, 'rb').read()
+    assert store._manifest('mrv-2')['run'] == {'mrv_id': 'mrv-2', 'timestamp': '2026-01-02T00:00:00'}
+
+
+def test_conditional_download(tmp_path):
+    store = ReportStore(str(tmp_path), chunk_bytes=64)
+    rendered(store, 'mrv-1', {'mrv_id': 'mrv-1'})
+    artifact = store.artifact('mrv-1')
+    body = open(artifact.path, 'rb').read()
+    etag = f'"{artifact.digest}"'
+
+    status, headers, byte_range = store.conditional(artifact, {})
+    assert (status, headers['ETag'], headers['Content-Length']) == (200, etag, str(len(body)))
+    assert b''.join(store.iter_bytes(artifact, *byte_range)) == body
+
+    status, headers, byte_range = store.conditional(artifact, {'Range': 'bytes=10-199'})
+    assert (status, headers['Content-Range']) == (206, f'bytes 10-199/{len(body)}')
+    assert b''.join(store.iter_bytes(artifact, *byte_range)) == body[10:200]
+
+    assert store.conditional(artifact, {'If-None-Match': etag})[0] == 304
+    assert store.conditional(artifact, {'Range': f'bytes={len(body)}-'})[0] == 416
+    # If-Range naming another version: the whole (current) body
+    assert store.conditional(artifact, {'Range': 'bytes=0-9', 'If-Range': '"old"'})[0] == 200
+
+
+def test_unknown_and_disabled(tmp_path):
+    assert ReportStore('').submit('mrv-1', 'verify', 'p1', RESULT) is None
+    store = ReportStore(str(tmp_path))
+    assert store.artifact('missing') is None
+    assert store.artifact('../etc/passwd') is None
+
+
+def test_report_endpoint(client, auth, project):
+    url = client.post('/api/mrv/verify', json=project, headers=auth).get_json()['report_url']
+    deadline = time.monotonic() + 5
+    response = client.get(url, headers=auth)
+    while response.status_code == 202 and time.monotonic() < deadline:
+        time.sleep(0.01)
+        response = client.get(url, headers=auth)
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/html')
+
+    ranged = client.get(url, headers={**auth, 'Range': 'bytes=0-14'})
+    assert (ranged.status_code, ranged.data) == (206, response.data[:15])
+    assert client.get(url, headers={**auth, 'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get(url, query_string={'format': 'json'}, headers=auth).get_json()['project_id'] == project['project_id']
+    assert client.get(url, query_string={'format': 'pdf'}, headers=auth).status_code == 400
+    assert client.get('/api/mrv/reports/mrv-missing', headers=auth).status_code == 404
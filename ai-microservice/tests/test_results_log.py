@@ -0,0 +1,62 @@
+import gzip
+import json
+
+from results_log import ResultsLog
+
+
+def exported(client, auth, **params):
+    response = client.get('/api/mrv/results/export', query_string=params, headers=auth)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.data.splitlines()]
+
+
+def test_export_filters_by_project_id(client, auth, project):
+    other = dict(project, project_id=project['project_id'] + '-other')
+    for body in (project, other):
+        assert client.post('/api/mrv/verify', json=body, headers=auth).status_code == 200
+
+    records = exported(client, auth, project_id=project['project_id'])
+    assert len(records) == 1
+    assert records[0]['project_id'] == project['project_id']
+    assert records[0]['job_type'] == 'verify'
+    assert records[0]['project_type'] == 'mangrove_restoration'
+    assert records[0]['result']['mrv_id'].startswith('mrv-')
+
+
+def test_export_filters_reverify_by_compliance_flag(client, auth, project):
+    assert client.post('/api/mrv/reverify', json=project, headers=auth).status_code == 200
+    [record] = exported(client, auth, project_id=project['project_id'], job_type='reverify')
+    assert record['project_id'] == project['project_id']
+
+    flag = record['compliance_flag']
+    assert exported(client, auth, project_id=project['project_id'], compliance_flag=flag) == [record]
+    assert exported(client, auth, project_id=project['project_id'], job_type='verify') == []
+
+
+def test_export_gzip(client, auth, project):
+    assert client.post('/api/mrv/verify', json=project, headers=auth).status_code == 200
+    response = client.get('/api/mrv/results/export', query_string={'project_id': project['project_id']},
+                          headers={**auth, 'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    [record] = [json.loads(line) for line in gzip.decompress(response.data).splitlines()]
+    assert record['project_id'] == project['project_id']
+
+
+def test_export_rejects_bad_timestamp(client, auth):
+    response = client.get('/api/mrv/results/export', query_string={'since': 'yesterday'}, headers=auth)
+    assert response.status_code == 400
+
+
+def test_time_window_and_rotation(tmp_path):
+    log = ResultsLog(str(tmp_path), segment_bytes=1)  # every record closes its segment
+    for index in range(3):
+        log.append('verify', f'p{index}', 'seagrass_conservation', {'compliance_flag': None})
+    log.close()
+
+    assert len(log.segments()) == 3
+    records = [json.loads(line) for line in log.iter_lines()]
+    assert [record['project_id'] for record in records] == ['p0', 'p1', 'p2']
+
+    since = records[1]['recorded_at']
+    assert [json.loads(line)['project_id'] for line in log.iter_lines(since=since)] == ['p1', 'p2']
+    assert [json.loads(line)['project_id'] for line in log.iter_lines(until=since)] == ['p0']
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+import scheduler
+from scheduler import ReverificationScheduler, normalize_queue_fields, parse_type_limits
+
+
+def test_queue_field_validation():
+    assert normalize_queue_fields(3, 'MANUAL', None, 2) == (3, 'MANUAL', 0, 2)
+    for fields in [(0, 'MANUAL', None, 0), (11, 'MANUAL', None, 0), (5, 'SOMETIME', None, 0), (5, 'MANUAL', None, -1)]:
+        with pytest.raises(ValueError):
+            normalize_queue_fields(*fields)
+
+
+def test_type_limits_leave_room_for_urgent_work():
+    limits = parse_type_limits('MANUAL=2', 4)
+    assert (limits['SCHEDULED'], limits['MANUAL'], limits['THRESHOLD_BREACH']) == (3, 2, 4)
+    with pytest.raises(ValueError):
+        parse_type_limits('WEEKLY=1', 4)
+
+
+def test_dispatch_order():
+    queue = ReverificationScheduler(max_workers=1, executor_type='thread')
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def blocker(payload):
+        started.set()
+        release.wait(5)
+
+    def record(payload):
+        order.append(payload['project_id'])
+
+    queue.submit(blocker, {'project_id': 'blocker'}, reverification_type='MANUAL')
+    assert started.wait(5)
+    jobs = [
+        queue.submit(record, {'project_id': 'low'}, priority=9),
+        queue.submit(record, {'project_id': 'high'}, priority=1),
+        queue.submit(record, {'project_id': 'breach'}, priority=10, reverification_type='THRESHOLD_BREACH')
+    ]
+    release.set()
+    for job in jobs:
+        job.future.result(timeout=5)
+    # Threshold breaches jump the queue, then priority order
+    assert order == ['breach', 'high', 'low']
+
+
+def test_failed_jobs_are_retried(monkeypatch):
+    monkeypatch.setattr(scheduler, 'SCHEDULER_RETRY_BACKOFF_SECONDS', 0.01)
+    queue = ReverificationScheduler(max_workers=1, executor_type='thread')
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError('imagery unavailable')
+        return 'ok'
+
+    job = queue.submit(flaky, {'project_id': 'p'}, max_retries=3)
+    assert job.future.result(timeout=5) == 'ok'
+    assert (job.retry_count, job.queue_status, job.last_error_message) == (2, 'COMPLETED', 'imagery unavailable')
+
+    doomed = queue.submit(lambda payload: 1 / 0, {'project_id': 'q'}, max_retries=1)
+    with pytest.raises(ZeroDivisionError):
+        doomed.future.result(timeout=5)
+    assert (doomed.retry_count, doomed.queue_status) == (1, 'FAILED')
@@ -0,0 +1,47 @@
+import pytest
+
+from schemas import VALIDATORS, request_error, item_errors
+
+RING = [[0, 0], [0, 1], [1, 1], [0, 0]]
+VERIFY = {'project_id': 'p', 'project_type': 'mangrove_restoration', 'coordinates': RING}
+
+
+@pytest.mark.parametrize('body, message', [
+    (VERIFY, None),
+    ({**VERIFY, 'coordinates': {'type': 'Polygon', 'coordinates': [RING]}}, None),
+    ({**VERIFY, 'additional_data': None}, None),
+    ({'project_type': 'x', 'coordinates': RING}, 'Missing required field: project_id'),
+    ({**VERIFY, 'project_id': ''}, 'Invalid project_id: must not be empty'),
+    ({**VERIFY, 'project_id': 7}, 'Invalid project_id: must be of type string'),
+    ({**VERIFY, 'coordinates': 'here'}, 'coordinates must be a GeoJSON polygon or a list of [lon, lat] positions'),
+    ({**VERIFY, 'additional_data': {'project_area_hectares': 0}},
+     'Invalid additional_data.project_area_hectares: must be greater than 0'),
+    ([VERIFY], 'must be of type object')
+])
+def test_verify_messages(body, message):
+    assert request_error('verify', body) == message
+
+
+@pytest.mark.parametrize('field, value', [
+    ('priority', 0), ('priority', 11), ('priority', 2.5), ('baseline_ndvi', 1.2),
+    ('reverification_type', 'WEEKLY'), ('max_retries', -1)
+])
+def test_reverify_queue_fields(field, value):
+    assert request_error('reverify', {**VERIFY, field: value}).startswith(f'Invalid {field}: ')
+
+
+@pytest.mark.parametrize('name, body', [
+    ('verify', VERIFY), ('verify', {**VERIFY, 'project_type': None}), ('verify', {'coordinates': []}),
+    ('reverify', {**VERIFY, 'priority': 3, 'baseline_ndvi': 1}), ('reverify', {**VERIFY, 'priority': True}),
+    ('batch-verify', {'projects': []}), ('batch-verify', {'projects': [{}], 'seed': 3}),
+    ('compliance-evaluate', {'records': [], 'columns': {}}), ('compliance-evaluate', {'columns': {'a': [1]}}),
+    ('compliance-evaluate', {'columns': {'a': 1}})
+])
+def test_compiled_predicates_agree_with_jsonschema(name, body):
+    is_valid, validator = VALIDATORS[name]
+    assert is_valid(body) == validator.is_valid(body)
+
+
+def test_batch_items_fail_alone():
+    errors = item_errors('batch-item', [VERIFY, 'p2', {'project_id': ''}, {'project_type': 'seagrass_conservation'}])
+    assert errors == {1: 'Project entry must be an object', 2: 'Invalid project_id: must not be empty'}
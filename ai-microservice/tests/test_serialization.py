@@ -0,0 +1,36 @@
+from serialization import SUMMARY_VIEWS
+
+
+def test_verify_summary_keeps_project_id(client, auth, project):
+    full = client.post('/api/mrv/verify', json=project, headers=auth).get_json()
+    assert full['project_id'] == project['project_id']
+    assert set(SUMMARY_VIEWS['verify']) <= set(full)
+
+    summary = client.post('/api/mrv/verify?view=summary', json=project, headers=auth).get_json()
+    assert set(summary) == set(SUMMARY_VIEWS['verify'])
+    assert summary['project_id'] == project['project_id']
+
+
+def test_reverify_summary_fields_exist(client, auth, project):
+    full = client.post('/api/mrv/reverify', json=project, headers=auth).get_json()
+    assert set(SUMMARY_VIEWS['reverify']) <= set(full)
+
+
+def test_fields_projection(client, auth, project):
+    shaped = client.post('/api/mrv/verify?fields=project_id,analysis_result.carbon_sequestration',
+                         json=project, headers=auth).get_json()
+    assert shaped['project_id'] == project['project_id']
+    assert set(shaped['analysis_result']) == {'carbon_sequestration'}
+
+
+def test_reverify_summary_keeps_compliance_evaluation(client, auth, project):
+    # The backend's job poll asks for ?view=summary and applies this evaluation
+    summary = client.post('/api/mrv/reverify?view=summary', json=project, headers=auth).get_json()
+    evaluation = summary['compliance_evaluation']
+    assert {'compliance_status', 'risk_level', 'compliance_score'} <= set(evaluation)
+
+    accepted = client.post('/api/mrv/reverify?async=true', json=dict(project, project_id=project['project_id'] + '-job'),
+                           headers=auth).get_json()
+    job = client.get(f"{accepted['status_url']}?wait=5&view=summary", headers=auth).get_json()
+    assert job['status'] == 'completed'
+    assert {'compliance_status', 'risk_level', 'compliance_score'} <= set(job['result']['compliance_evaluation'])
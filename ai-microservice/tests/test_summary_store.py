@@ -0,0 +1,44 @@
+from summary_store import TileSummaryStore
+
+
+def summary(tile_id, ndvi_sum=50.0):
+    return {'tile_id': tile_id, 'acquired': '2026-01-01', 'path': f'/tiles/{tile_id}.tif', 'ndvi_sum': ndvi_sum,
+            'pixel_count': 100, 'area_hectares': 1.0, 'vegetated_area_hectares': 0.6}
+
+
+REFERENCE = {'ndvi_mean': 0.5, 'vegetated_area_hectares': 1.2, 'image_date': '2026-01-01'}
+
+
+def test_summaries_and_reference_round_trip(tmp_path):
+    store = TileSummaryStore(str(tmp_path / 'summaries.db'))
+    assert store.load('p', 'geometry-a') == ({}, None)
+
+    store.save('p', 'geometry-a', [summary('t1'), summary('t2')], reused=0, reference=REFERENCE)
+    store.save('p', 'geometry-a', [summary('t2', ndvi_sum=40.0)], reused=1,
+               reference={**REFERENCE, 'ndvi_mean': 0.1})
+
+    # Another process (a fresh store on the same file) sees the same rows
+    summaries, reference = TileSummaryStore(str(tmp_path / 'summaries.db')).load('p', 'geometry-a')
+    assert summaries == {'t1': summary('t1'), 't2': summary('t2', ndvi_sum=40.0)}
+    assert reference == REFERENCE  # the first observation stays the reference
+    assert store.stats() == {'enabled': True, 'loads': 1, 'tiles_reused': 1, 'tiles_recomputed': 3,
+                             'resets': 0, 'errors': 0}
+
+
+def test_a_changed_polygon_starts_over(tmp_path):
+    store = TileSummaryStore(str(tmp_path / 'summaries.db'))
+    store.save('p', 'geometry-a', [summary('t1')], reused=0, reference=REFERENCE)
+    store.save('q', 'geometry-q', [summary('t1')], reused=0, reference=REFERENCE)
+
+    assert store.load('p', 'geometry-b') == ({}, None)
+    assert store.load('p', 'geometry-a') == ({}, None)
+    assert store.stats()['resets'] == 1
+    assert store.load('q', 'geometry-q')[1] == REFERENCE
+
+
+def test_disabled_without_a_path():
+    store = TileSummaryStore('')
+    store.save('p', 'geometry-a', [summary('t1')], reused=0, reference=REFERENCE)
+    assert store.load('p', 'geometry-a') == ({}, None)
+    assert store.stats() == {'enabled': False, 'loads': 0, 'tiles_reused': 0, 'tiles_recomputed': 0,
+                             'resets': 0, 'errors': 0}
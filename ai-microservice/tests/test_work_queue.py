@@ -0,0 +1,82 @@
+import time
+
+from work_queue import WorkQueue
+
+
+def queue(db_path, node_id, **overrides):
+    return WorkQueue(str(db_path), node_id=node_id, **{'max_workers': 1, 'poll_seconds': 0.01, **overrides})
+
+
+def test_jobs_run_and_resolve(tmp_path):
+    node = queue(tmp_path / 'queue.db', 'node-a')
+    node.register('verify', lambda payload: {'project_id': payload['project_id'], 'score': 1})
+    job = node.submit('verify', {'project_id': 'p'}, 5, 'MANUAL', dedup_key='k')
+    assert job.future.result(timeout=5) == {'project_id': 'p', 'score': 1}
+    snapshot = job.snapshot()
+    assert (snapshot['queue_status'], snapshot['assigned_worker'].split(':')[0]) == ('COMPLETED', 'node-a')
+
+
+def test_identical_active_jobs_share_a_row(tmp_path):
+    producer = queue(tmp_path / 'queue.db', 'producer', max_workers=0)
+    first = producer.submit('verify', {'project_id': 'p'}, 5, 'MANUAL', dedup_key='k')
+    second = producer.submit('verify', {'project_id': 'p'}, 5, 'MANUAL', dedup_key='k')
+    assert first.queue_id == second.queue_id
+    assert producer.stats()['deduplicated'] == 1
+
+
+def test_another_node_finishes_a_job_whose_lease_expired(tmp_path):
+    db_path = tmp_path / 'queue.db'
+    producer = queue(db_path, 'producer', max_workers=0)
+    job = producer.submit('reverify', {'project_id': 'p'}, 5, 'MANUAL', max_retries=2)
+
+    # node-a claims the job and then stops heartbeating (never started, so nothing renews its lease)
+    crashed = queue(db_path, 'node-a', lease_seconds=0.05)
+    row = crashed._claim([])
+    assert row['queue_id'] == job.queue_id
+    time.sleep(0.1)
+
+    survivor = queue(db_path, 'node-b')
+    survivor.register('reverify', lambda payload: 'recovered')
+    survivor.start()
+    assert job.future.result(timeout=5) == 'recovered'
+    snapshot = job.snapshot()
+    assert (snapshot['retry_count'], snapshot['assigned_worker'].split(':')[0]) == (1, 'node-b')
+    assert snapshot['last_error_message'].startswith('Lease expired')
+
+    # The crashed node coming back cannot overwrite the result
+    crashed._complete(row, 'stale', time.time())
+    assert crashed.stats()['lost_leases'] == 1
+    assert job.snapshot()['queue_status'] == 'COMPLETED'
+
+
+def test_describe_gives_the_job_view_of_a_row(tmp_path):
+    producer = queue(tmp_path / 'queue.db', 'producer', max_workers=0)
+    job = producer.submit('verify', {'project_id': 'p'}, 5, 'MANUAL')
+    view = producer.describe(job.queue_id)
+    assert (view['job_id'], view['job_type'], view['project_id'], view['status']) == (job.queue_id, 'verify', 'p', 'queued')
+    assert 'result' not in view
+    assert producer.describe('no-such-row') is None
+
+    node = queue(tmp_path / 'queue.db', 'node-a')
+    node.register('verify', lambda payload: {'project_id': payload['project_id'], 'score': 1})
+    node.start()
+    assert job.future.result(timeout=5) == {'project_id': 'p', 'score': 1}
+    view = producer.describe(job.queue_id)
+    assert (view['status'], view['result'], view['queue_status']) == ('completed', {'project_id': 'p', 'score': 1}, 'COMPLETED')
+
+
+def test_job_api_falls_back_to_the_queue_row(client, auth, tmp_path, monkeypatch):
+    import app as service
+
+    producer = queue(tmp_path / 'queue.db', 'node-b', max_workers=0)
+    job = producer.submit('verify', {'project_id': 'p'}, 5, 'MANUAL')
+    node = queue(tmp_path / 'queue.db', 'node-a')
+    monkeypatch.setattr(service, 'work_queue', node)
+
+    body = client.get(f'/api/mrv/jobs/{job.queue_id}', headers=auth).get_json()
+    assert (body['job_id'], body['status'], body['queue_status']) == (job.queue_id, 'queued', 'QUEUED')
+
+    node.register('verify', lambda payload: {'project_id': payload['project_id'], 'success': True})
+    node.start()
+    body = client.get(f'/api/mrv/jobs/{job.queue_id}?wait=5', headers=auth).get_json()
+    assert (body['status'], body['result']) == ('completed', {'project_id': 'p', 'success': True})
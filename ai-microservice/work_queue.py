@@ -0,0 +1,520 @@
+# BlueCarbon Ledger - AI Microservice
+# Shared durable work queue (SQLite, WAL) so several service processes or nodes pull MRV jobs
+# from one place, with leases renewed by heartbeat so a dead node's jobs are issued again
+
+import os
+import time
+import uuid
+import sqlite3
+import threading
+import logging
+from concurrent.futures import Future
+from datetime import datetime
+
+from jobs import create_executor
+from scheduler import (
+    URGENT_REVERIFICATION_TYPES, SCHEDULER_MAX_WORKERS, SCHEDULER_TYPE_LIMITS, SCHEDULER_AGING_SECONDS,
+    SCHEDULER_RETRY_BACKOFF_SECONDS, SCHEDULER_RETRY_BACKOFF_MAX_SECONDS,
+    normalize_queue_fields, parse_type_limits
+)
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+WORK_QUEUE_DB_PATH = os.getenv('WORK_QUEUE_DB_PATH', '')  # shared by every node; empty = in-process scheduler only
+WORK_QUEUE_WORKERS = int(os.getenv('WORK_QUEUE_WORKERS', SCHEDULER_MAX_WORKERS))  # 0 = submit only, claim nothing
+WORK_QUEUE_LEASE_SECONDS = float(os.getenv('WORK_QUEUE_LEASE_SECONDS', 30))  # job is re-issued if not renewed
+WORK_QUEUE_POLL_SECONDS = float(os.getenv('WORK_QUEUE_POLL_SECONDS', 0.2))
+WORK_QUEUE_RETENTION_SECONDS = float(os.getenv('WORK_QUEUE_RETENTION_SECONDS', 86400))  # finished rows kept
+WORK_QUEUE_BUSY_TIMEOUT_SECONDS = float(os.getenv('WORK_QUEUE_BUSY_TIMEOUT_SECONDS', 10))
+
+ACTIVE_STATUSES = ('QUEUED', 'RETRY', 'PROCESSING')
+FINAL_STATUSES = ('COMPLETED', 'FAILED', 'CANCELLED')
+PURGE_INTERVAL_SECONDS = 300
+
+# queue_status -> the job API's status (a row waiting out a retry backoff is queued again)
+JOB_STATUSES = {'QUEUED': 'queued', 'RETRY': 'queued', 'PROCESSING': 'running',
+                'COMPLETED': 'completed', 'FAILED': 'failed', 'CANCELLED': 'cancelled'}
+
+
+def iso(timestamp):
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class QueuedJob:
+    """Local handle on a queue row: a future for its result and a snapshot of its bookkeeping"""
+
+    def __init__(self, queue, queue_id, future):
+        self.queue = queue
+        self.queue_id = queue_id
+        self.future = future
+
+    def snapshot(self):
+        return self.queue.snapshot(self.queue_id)
+
+
+class WorkQueue:
+    """
+    Jobs live in one SQLite table shaped like ai_reverification_queue (queue_status,
+    assigned_worker, processing_started_at, retry_count, ...) plus a lease. Every
+    process claims ready rows in priority order (THRESHOLD_BREACH first, then
+    priority aged by wait time, as in the in-process scheduler) inside a
+    BEGIN IMMEDIATE transaction, so a row is only handed out once. Held leases are
+    renewed by a heartbeat; a row whose lease ran out is claimed again by anyone,
+    counting as a retry. Identical active jobs (same dedup key) share one row.
+    """
+
+    def __init__(self, db_path=WORK_QUEUE_DB_PATH, node_id=None, max_workers=WORK_QUEUE_WORKERS,
+                 type_limits=None, lease_seconds=WORK_QUEUE_LEASE_SECONDS, poll_seconds=WORK_QUEUE_POLL_SECONDS,
+                 aging_seconds=SCHEDULER_AGING_SECONDS):
+        self.db_path = db_path
+        self.node_id = node_id or os.getenv('PROCESSING_NODE_ID', 'node-1')
+        self.max_workers = max_workers
+        self.type_limits = type_limits or parse_type_limits(SCHEDULER_TYPE_LIMITS, max(1, max_workers))
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.aging_seconds = aging_seconds
+
+        self._handlers = {}
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._held = {}  # queue_id -> reverification_type of rows this process is running
+        self._waiters = {}  # queue_id -> [Future] of requests in this process waiting on a row
+        self._executor = None
+        self._threads = None
+        self._started_pid = None
+        self._last_heartbeat = 0
+        self._last_purge = 0
+        self._counters = {'submitted': 0, 'deduplicated': 0, 'claimed': 0, 'completed': 0,
+                          'failed': 0, 'retried': 0, 'reissued': 0, 'lost_leases': 0}
+
+    @property
+    def enabled(self):
+        return bool(self.db_path)
+
+    @property
+    def worker_id(self):
+        """assigned_worker value: the node, plus the pid since gunicorn runs several workers per node"""
+        return f'{self.node_id}:{os.getpid()}'
+
+    def register(self, job_type, fn):
+        """Set the function that runs jobs of job_type (fn(payload) -> JSON-serializable result)"""
+        self._handlers[job_type] = fn
+
+    # ---- storage ------------------------------------------------------------
+
+    def _connection(self):
+        """Open the database lazily, once per process (connections must not cross a fork)"""
+        if self._db is None or self._db_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, timeout=WORK_QUEUE_BUSY_TIMEOUT_SECONDS,
+                                       isolation_level=None, check_same_thread=False)
+            self._db.row_factory = sqlite3.Row
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS work_queue (
+                    queue_id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    project_id TEXT,
+                    dedup_key TEXT,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    priority INTEGER NOT NULL,
+                    reverification_type TEXT NOT NULL,
+                    tier INTEGER NOT NULL,
+                    rank REAL NOT NULL,
+                    queue_status TEXT NOT NULL,
+                    assigned_worker TEXT,
+                    lease_expires_at REAL,
+                    heartbeat_at REAL,
+                    processing_started_at REAL,
+                    processing_completed_at REAL,
+                    processing_duration_seconds INTEGER,
+                    retry_count INTEGER NOT NULL DEFAULT 0,
+                    max_retries INTEGER NOT NULL,
+                    last_error_message TEXT,
+                    submitted_by TEXT,
+                    queued_at REAL NOT NULL,
+                    ready_at REAL NOT NULL
+                )
+            ''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS idx_work_queue_claim ON work_queue(queue_status, tier, rank)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS idx_work_queue_dedup ON work_queue(dedup_key, queue_status)')
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _rank(self, priority, ready_at):
+        # Same aging rule as ScheduledJob.sort_key: one priority level per aging_seconds waited
+        return priority + ready_at / self.aging_seconds
+
+    # ---- producers ----------------------------------------------------------
+
+    def submit(self, job_type, payload, priority, reverification_type, scheduled_for=None, max_retries=3,
+               dedup_key=None):
+        """Add a job (or join an identical active one) and return its QueuedJob; raises ValueError on bad fields"""
+        priority, reverification_type, delay_seconds, max_retries = normalize_queue_fields(
+            priority, reverification_type, scheduled_for, max_retries
+        )
+        self.start()
+
+        now = time.time()
+        ready_at = now + delay_seconds
+        queue_id = str(uuid.uuid4())
+        future = Future()
+        future.set_running_or_notify_cancel()
+
+        with self._db_lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                existing = None
+                if dedup_key is not None:
+                    existing = db.execute(
+                        f"SELECT queue_id FROM work_queue WHERE dedup_key = ? "
+                        f"AND queue_status IN ({','.join('?' * len(ACTIVE_STATUSES))}) LIMIT 1",
+                        (dedup_key, *ACTIVE_STATUSES)
+                    ).fetchone()
+                if existing is not None:
+                    queue_id = existing['queue_id']
+                    self._counters['deduplicated'] += 1
+                else:
+                    db.execute(
+                        'INSERT INTO work_queue (queue_id, job_type, project_id, dedup_key, payload, priority, '
+                        'reverification_type, tier, rank, queue_status, retry_count, max_retries, submitted_by, '
+                        'queued_at, ready_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?)',
+                        (queue_id, job_type, payload.get('project_id'), dedup_key, dumps(payload).decode('utf-8'),
+                         priority, reverification_type, 0 if reverification_type in URGENT_REVERIFICATION_TYPES else 1,
+                         self._rank(priority, ready_at), 'QUEUED', max_retries, self.worker_id, now, ready_at)
+                    )
+                    self._counters['submitted'] += 1
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+
+        with self._cond:
+            self._waiters.setdefault(queue_id, []).append(future)
+            self._cond.notify_all()
+
+        return QueuedJob(self, queue_id, future)
+
+    def snapshot(self, queue_id):
+        """ai_reverification_queue-style bookkeeping of one row (empty if it was purged)"""
+        with self._db_lock:
+            row = self._connection().execute(
+                'SELECT priority, reverification_type, queue_status, assigned_worker, ready_at, '
+                'processing_started_at, processing_completed_at, retry_count, max_retries, last_error_message '
+                'FROM work_queue WHERE queue_id = ?', (queue_id,)
+            ).fetchone()
+        if row is None:
+            return {}
+        return self._snapshot(queue_id, row)
+
+    def describe(self, queue_id):
+        """
+        Job API view of a row (as JobManager.describe builds it, plus the snapshot), so a job
+        can be polled on a node that did not accept it; None if there is no such row
+        """
+        with self._db_lock:
+            row = self._connection().execute(
+                'SELECT job_type, project_id, result, queued_at, priority, reverification_type, queue_status, '
+                'assigned_worker, ready_at, processing_started_at, processing_completed_at, retry_count, '
+                'max_retries, last_error_message FROM work_queue WHERE queue_id = ?', (queue_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status = JOB_STATUSES[row['queue_status']]
+        description = {
+            'job_id': queue_id,
+            'job_type': row['job_type'],
+            'project_id': row['project_id'],
+            'status': status,
+            'submitted_at': iso(row['queued_at']),
+            'started_at': iso(row['processing_started_at']),
+            'completed_at': iso(row['processing_completed_at']),
+            **self._snapshot(queue_id, row)
+        }
+        if status == 'completed':
+            description['result'] = loads(row['result']) if row['result'] else None
+        elif status == 'failed':
+            # Local waiters see the same failure as a RuntimeError (see _resolve)
+            description['error'] = row['last_error_message']
+            description['error_type'] = 'RuntimeError'
+        return description
+
+    @staticmethod
+    def _snapshot(queue_id, row):
+        return {
+            'queue_id': queue_id,
+            'priority': row['priority'],
+            'reverification_type': row['reverification_type'],
+            'queue_status': row['queue_status'],
+            'assigned_worker': row['assigned_worker'],
+            'scheduled_for': iso(row['ready_at']),
+            'processing_started_at': iso(row['processing_started_at']),
+            'processing_completed_at': iso(row['processing_completed_at']),
+            'retry_count': row['retry_count'],
+            'max_retries': row['max_retries'],
+            'last_error_message': row['last_error_message']
+        }
+
+    # ---- consumers ----------------------------------------------------------
+
+    def start(self):
+        """Start this process's claim loop, heartbeat and worker pool (idempotent; call after fork)"""
+        if not self.enabled or self._started_pid == os.getpid():
+            return
+        with self._cond:
+            if self._started_pid == os.getpid():
+                return
+            self._held = {}
+            self._threads = [threading.Thread(target=self._maintenance_loop, name='work-queue-heartbeat', daemon=True)]
+            if self.max_workers > 0:
+                self._executor = create_executor('thread', self.max_workers, 'mrv-queue')
+                self._threads.append(threading.Thread(target=self._claim_loop, name='work-queue-claim', daemon=True))
+            for thread in self._threads:
+                thread.start()
+            self._started_pid = os.getpid()
+        logger.info(f"Work queue consumer {self.worker_id} started with {self.max_workers} workers on {self.db_path}")
+
+    def _claim_loop(self):
+        while True:
+            with self._cond:
+                while len(self._held) >= self.max_workers:
+                    self._cond.wait()
+                saturated = [reverification_type for reverification_type, limit in self.type_limits.items()
+                             if list(self._held.values()).count(reverification_type) >= limit]
+            try:
+                row = self._claim(saturated)
+            except sqlite3.Error as e:
+                logger.error(f"Work queue claim failed: {str(e)}")
+                row = None
+
+            if row is None:
+                with self._cond:
+                    self._cond.wait(self.poll_seconds)
+                continue
+
+            self._executor.submit(self._run, row)
+
+    def _claim(self, saturated_types):
+        """Take the best ready row (or one whose lease expired) for this process; returns the row or None"""
+        now = time.time()
+        type_filter = ''
+        if saturated_types:
+            type_filter = f"AND (job_type != 'reverify' OR reverification_type NOT IN ({','.join('?' * len(saturated_types))}))"
+
+        with self._db_lock:
+            db = self._connection()
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                while True:
+                    row = db.execute(
+                        'SELECT queue_id, job_type, payload, reverification_type, queue_status, assigned_worker, '
+                        'retry_count, max_retries FROM work_queue '
+                        "WHERE ((queue_status IN ('QUEUED', 'RETRY') AND ready_at <= ?) "
+                        "OR (queue_status = 'PROCESSING' AND lease_expires_at < ?)) "
+                        f'{type_filter} ORDER BY tier, rank LIMIT 1',
+                        (now, now, *saturated_types)
+                    ).fetchone()
+                    if row is None:
+                        db.execute('COMMIT')
+                        return None
+
+                    retry_count = row['retry_count']
+                    last_error = None
+                    if row['queue_status'] == 'PROCESSING':
+                        # The worker holding it stopped renewing its lease (crashed or hung)
+                        retry_count += 1
+                        last_error = f"Lease expired on {row['assigned_worker']}"
+                        self._counters['reissued'] += 1
+                        if retry_count > row['max_retries']:
+                            db.execute(
+                                "UPDATE work_queue SET queue_status = 'FAILED', retry_count = ?, "
+                                'last_error_message = ?, processing_completed_at = ? WHERE queue_id = ?',
+                                (retry_count, last_error, now, row['queue_id'])
+                            )
+                            continue
+
+                    db.execute(
+                        "UPDATE work_queue SET queue_status = 'PROCESSING', assigned_worker = ?, "
+                        'processing_started_at = ?, lease_expires_at = ?, heartbeat_at = ?, retry_count = ?, '
+                        'last_error_message = COALESCE(?, last_error_message) WHERE queue_id = ?',
+                        (self.worker_id, now, now + self.lease_seconds, now, retry_count, last_error, row['queue_id'])
+                    )
+                    db.execute('COMMIT')
+                    break
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+
+        with self._cond:
+            self._held[row['queue_id']] = row['reverification_type']
+            self._counters['claimed'] += 1
+        return row
+
+    def _run(self, row):
+        queue_id = row['queue_id']
+        started = time.time()
+        try:
+            handler = self._handlers.get(row['job_type'])
+            if handler is None:
+                raise ValueError(f"No handler registered for job type {row['job_type']}")
+            result = handler(loads(row['payload']))
+        except Exception as e:
+            self._fail(row, e, started)
+        else:
+            self._complete(row, result, started)
+        finally:
+            with self._cond:
+                self._held.pop(queue_id, None)
+                self._cond.notify_all()
+
+    def _complete(self, row, result, started):
+        now = time.time()
+        encoded = dumps(result).decode('utf-8')
+        with self._db_lock:
+            updated = self._connection().execute(
+                "UPDATE work_queue SET queue_status = 'COMPLETED', result = ?, processing_completed_at = ?, "
+                'processing_duration_seconds = ?, lease_expires_at = NULL WHERE queue_id = ? AND assigned_worker = ? '
+                "AND queue_status = 'PROCESSING'",
+                (encoded, now, int(round(now - started)), row['queue_id'], self.worker_id)
+            ).rowcount
+        if not updated:
+            # Our lease ran out and someone else took the row over; their run decides the outcome
+            self._counters['lost_leases'] += 1
+            logger.warning(f"Lost the lease on {row['queue_id']} before it completed")
+            return
+        self._counters['completed'] += 1
+        self._resolve(row['queue_id'], 'COMPLETED', loads(encoded), None)
+
+    def _fail(self, row, error, started):
+        now = time.time()
+        retry = row['retry_count'] < row['max_retries']
+        if retry:
+            backoff = min(SCHEDULER_RETRY_BACKOFF_MAX_SECONDS, SCHEDULER_RETRY_BACKOFF_SECONDS * (2 ** row['retry_count']))
+            ready_at = now + backoff
+        with self._db_lock:
+            db = self._connection()
+            if retry:
+                priority = db.execute('SELECT priority FROM work_queue WHERE queue_id = ?',
+                                      (row['queue_id'],)).fetchone()['priority']
+                updated = db.execute(
+                    "UPDATE work_queue SET queue_status = 'RETRY', retry_count = retry_count + 1, "
+                    'last_error_message = ?, ready_at = ?, rank = ?, lease_expires_at = NULL '
+                    "WHERE queue_id = ? AND assigned_worker = ? AND queue_status = 'PROCESSING'",
+                    (str(error), ready_at, self._rank(priority, ready_at), row['queue_id'], self.worker_id)
+                ).rowcount
+            else:
+                updated = db.execute(
+                    "UPDATE work_queue SET queue_status = 'FAILED', last_error_message = ?, "
+                    'processing_completed_at = ?, processing_duration_seconds = ?, lease_expires_at = NULL '
+                    "WHERE queue_id = ? AND assigned_worker = ? AND queue_status = 'PROCESSING'",
+                    (str(error), now, int(round(now - started)), row['queue_id'], self.worker_id)
+                ).rowcount
+        if not updated:
+            self._counters['lost_leases'] += 1
+            return
+        if retry:
+            self._counters['retried'] += 1
+            logger.warning(f"Queued {row['job_type']} {row['queue_id']} failed "
+                           f"(attempt {row['retry_count'] + 1}/{row['max_retries'] + 1}), retrying in {backoff:.1f}s: {str(error)}")
+        else:
+            self._counters['failed'] += 1
+            self._resolve(row['queue_id'], 'FAILED', None, str(error))
+
+    def _resolve(self, queue_id, status, result, error_message):
+        """Settle the futures of requests in this process waiting on queue_id"""
+        with self._cond:
+            futures = self._waiters.pop(queue_id, [])
+        for future in futures:
+            if status == 'COMPLETED':
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(error_message or f'Job {status.lower()}'))
+
+    def _maintenance_loop(self):
+        """Renew held leases, pick up results finished by other processes, purge old rows"""
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                now = time.time()
+                if now - self._last_heartbeat >= self.lease_seconds / 3:
+                    self._heartbeat(now)
+                self._poll_waiters()
+                if now - self._last_purge >= PURGE_INTERVAL_SECONDS:
+                    self._purge(now)
+            except sqlite3.Error as e:
+                logger.error(f"Work queue maintenance failed: {str(e)}")
+
+    def _heartbeat(self, now):
+        self._last_heartbeat = now
+        with self._cond:
+            held = list(self._held)
+        if not held:
+            return
+        with self._db_lock:
+            self._connection().execute(
+                f"UPDATE work_queue SET lease_expires_at = ?, heartbeat_at = ? WHERE assigned_worker = ? "
+                f"AND queue_status = 'PROCESSING' AND queue_id IN ({','.join('?' * len(held))})",
+                (now + self.lease_seconds, now, self.worker_id, *held)
+            )
+
+    def _poll_waiters(self):
+        with self._cond:
+            waiting = list(self._waiters)
+        for start in range(0, len(waiting), 500):
+            chunk = waiting[start:start + 500]
+            with self._db_lock:
+                rows = self._connection().execute(
+                    f"SELECT queue_id, queue_status, result, last_error_message FROM work_queue "
+                    f"WHERE queue_id IN ({','.join('?' * len(chunk))}) "
+                    f"AND queue_status IN ({','.join('?' * len(FINAL_STATUSES))})",
+                    (*chunk, *FINAL_STATUSES)
+                ).fetchall()
+            for row in rows:
+                result = loads(row['result']) if row['result'] else None
+                self._resolve(row['queue_id'], row['queue_status'], result, row['last_error_message'])
+
+    def _purge(self, now):
+        self._last_purge = now
+        with self._db_lock:
+            self._connection().execute(
+                f"DELETE FROM work_queue WHERE queue_status IN ({','.join('?' * len(FINAL_STATUSES))}) "
+                'AND processing_completed_at < ?',
+                (*FINAL_STATUSES, now - WORK_QUEUE_RETENTION_SECONDS)
+            )
+
+    def stats(self):
+        """Shared queue depth by status plus this process's claims and counters, for /metrics"""
+        if not self.enabled:
+            return {'enabled': False}
+        with self._db_lock:
+            db = self._connection()
+            by_status = dict(db.execute('SELECT queue_status, COUNT(*) FROM work_queue GROUP BY queue_status').fetchall())
+            workers = db.execute(
+                "SELECT assigned_worker, COUNT(*) FROM work_queue WHERE queue_status = 'PROCESSING' "
+                'GROUP BY assigned_worker'
+            ).fetchall()
+        with self._cond:
+            held = len(self._held)
+            waiting = len(self._waiters)
+        return {
+            'enabled': True,
+            'worker_id': self.worker_id,
+            'depth_by_status': by_status,
+            'processing_by_worker': dict(workers),
+            'held': held,
+            'max_workers': self.max_workers,
+            'waiting_requests': waiting,
+            **self._counters
+        }
+
+
+work_queue = WorkQueue()